@@ -0,0 +1,364 @@
+"""
+Benchmarks for the ring buffer, DSP, inference and offline cache paths.
+
+    python benchmarks/run_benchmarks.py -o results.json
+    python benchmarks/run_benchmarks.py -o new.json --compare results.json
+
+Each case reports seconds per operation (median and min over rounds).
+With --compare, cases whose median is more than --threshold slower than the
+baseline are listed and the exit status is 1, so CI can gate on it. Compare
+runs from the same machine only. --full adds the 1M-row cache cases.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import Future
+from pathlib import Path
+from types import SimpleNamespace
+from typing import TYPE_CHECKING, Any
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from birdwatch import analyzer as analyzer_mod  # noqa: E402
+from birdwatch import mqtt_client  # noqa: E402
+from birdwatch.analyzer import (  # noqa: E402
+    INPUT_SAMPLES,
+    N_MELS,
+    AnalyzerPool,
+    BirdNETAnalyzer,
+    MelFrontend,
+    postprocess_logits,
+    preprocess_audio,
+)
+from birdwatch.mqtt_client import DetectionPayload, MQTTClient  # noqa: E402
+from birdwatch.offline_cache import OfflineCache  # noqa: E402
+from birdwatch.wire import encode_row  # noqa: E402
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+N_CLASSES = 6522  # BirdNET GLOBAL 6K V2.4
+BLOCK_SIZES = (480, 4800, 48000)  # 10 ms, 100 ms, 1 s at 48 kHz
+CACHE_ROWS = (10_000, 100_000)
+CACHE_ROWS_FULL = (*CACHE_ROWS, 1_000_000)
+
+
+def measure(
+    fn: Callable[[], object], rounds: int = 7, min_round_sec: float = 0.05
+) -> dict[str, float]:
+    """Time fn: calibrate calls per round to min_round_sec, return per-call stats."""
+    fn()  # warm up caches, lazy allocations and JIT'd paths
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        if time.perf_counter() - start >= min_round_sec or number >= 1 << 20:
+            break
+        number *= 2
+    times = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        times.append((time.perf_counter() - start) / number)
+    return {"median_s": statistics.median(times), "min_s": min(times), "calls": number}
+
+
+class StandInInterpreter:
+    """
+    Tiny TFLite stand-in with BirdNET's shapes: averages the mel input over
+    time and projects it to N_CLASSES logits with one matmul.
+    """
+
+    def __init__(self) -> None:
+        rng = np.random.default_rng(0)
+        self._weights = rng.normal(0, 0.1, (N_MELS, N_CLASSES)).astype(np.float32)
+        self._bias = np.full(N_CLASSES, -6.0, dtype=np.float32)
+        self._shape = [1, N_MELS, MelFrontend().n_frames]
+        self._input = np.zeros(self._shape, dtype=np.float32)
+        self._output = np.zeros((1, N_CLASSES), dtype=np.float32)
+
+    def allocate_tensors(self) -> None:
+        pass
+
+    def get_input_details(self) -> list[dict[str, Any]]:
+        return [{"index": 0, "shape": np.array(self._shape)}]
+
+    def get_output_details(self) -> list[dict[str, Any]]:
+        return [{"index": 1, "shape": np.array([self._shape[0], N_CLASSES])}]
+
+    def resize_tensor_input(self, index: int, shape: list[int]) -> None:
+        self._shape = list(shape)
+
+    def set_tensor(self, index: int, value: np.ndarray) -> None:
+        self._input = value
+
+    def invoke(self) -> None:
+        self._output = self._input.mean(axis=2) @ self._weights + self._bias
+
+    def get_tensor(self, index: int) -> np.ndarray:
+        return self._output
+
+
+class _AckConnection:
+    """MQTT connection stand-in that acknowledges every publish at once."""
+
+    def connect(self) -> Future:
+        return self._done()
+
+    def publish(self, topic: str, payload: str, qos: object) -> tuple[Future, int]:
+        return self._done(), 1
+
+    @staticmethod
+    def _done() -> Future:
+        future: Future = Future()
+        future.set_result(None)
+        return future
+
+
+def _window() -> np.ndarray:
+    rng = np.random.default_rng(0)
+    return rng.normal(0, 0.1, INPUT_SAMPLES).astype(np.float32)
+
+
+def bench_ring_buffer(results: dict[str, Any]) -> None:
+    from birdwatch.recorder import RingBuffer
+
+    ring = RingBuffer()
+    out = np.empty(INPUT_SAMPLES, dtype=np.float32)
+    rng = np.random.default_rng(0)
+    for block in BLOCK_SIZES:
+        chunk = rng.normal(0, 0.1, block).astype(np.float32)
+        results[f"ring_write_{block}"] = measure(lambda c=chunk: ring.write(c))
+    results["ring_read_into"] = measure(lambda: ring.read_into(out))
+    results["ring_rms"] = measure(ring.rms)
+
+    from birdwatch.clips import ClipRing
+
+    clip_ring = ClipRing(30.0)
+    block = rng.normal(0, 0.1, (4800, 1)).astype(np.float32)
+    results["clip_ring_write_4800"] = measure(lambda: clip_ring.write(block))
+
+
+def bench_dsp(results: dict[str, Any]) -> None:
+    from birdwatch.gate import ActivityGate
+
+    window = _window()
+    frontend = MelFrontend()
+    results["preprocess_audio"] = measure(lambda: preprocess_audio(window))
+    results["mel_frontend"] = measure(lambda: frontend(window))
+    mel = frontend(window).copy()
+    gate = ActivityGate()
+    results["activity_gate"] = measure(lambda: gate(mel))
+
+
+def bench_metrics(results: dict[str, Any]) -> None:
+    from birdwatch.metrics import Histogram
+
+    hist = Histogram("bench")
+    results["metrics_observe"] = measure(lambda: hist.observe(0.003))
+    perf_counter = time.perf_counter
+
+    def timed() -> None:
+        start = perf_counter()
+        hist.observe(perf_counter() - start)
+
+    results["metrics_timed_observe"] = measure(timed)
+
+
+def bench_postprocess(results: dict[str, Any]) -> None:
+    rng = np.random.default_rng(0)
+    logits = rng.normal(-8.0, 2.0, (8, N_CLASSES)).astype(np.float32)
+    logits[:, :5] = 3.0  # a few confident hits per window
+    results["postprocess_1x6522"] = measure(lambda: postprocess_logits(logits[:1]))
+    results["postprocess_8x6522"] = measure(lambda: postprocess_logits(logits))
+    # A typical site allow-list keeps a few hundred of the 6522 labels
+    species = np.sort(rng.choice(N_CLASSES, 300, replace=False))
+    results["postprocess_8x6522_mask300"] = measure(
+        lambda: postprocess_logits(logits, species=species)
+    )
+    quiet = np.full((1, N_CLASSES), -8.0, dtype=np.float32)
+    results["postprocess_no_hits"] = measure(lambda: postprocess_logits(quiet))
+
+
+def bench_analyzer(results: dict[str, Any], tmp: Path) -> None:
+    model_dir = tmp / "model"
+    model_dir.mkdir()
+    (model_dir / "BirdNET_GLOBAL_6K_V2.4_Model_FP16.tflite").write_bytes(b"")
+    labels = "\n".join(f"Species {i}" for i in range(N_CLASSES))
+    (model_dir / "labels.txt").write_text(labels, encoding="utf-8")
+    analyzer_mod._load_interpreter = lambda _path, **_kw: StandInInterpreter()
+    analyzer = BirdNETAnalyzer(model_dir=model_dir)
+    window = _window()
+    results["analyzer_run"] = measure(lambda: analyzer.run(window))
+    batch = [window] * 8
+    results["analyzer_run_batch_8"] = measure(lambda: analyzer.run_batch(batch))
+    with AnalyzerPool(model_dir, workers=4, num_threads=1) as pool:
+        results["analyzer_pool4_map_8"] = measure(lambda: pool.map(batch))
+
+
+def bench_cache(results: dict[str, Any], tmp: Path, sizes: tuple[int, ...]) -> None:
+    payload = DetectionPayload(
+        device_id="pi-01",
+        species_code="turdus_mig",
+        scientific_name="Turdus migratorius",
+        common_name="American Robin",
+        confidence=0.91,
+        timestamp="2025-01-01T00:00:00.000+00:00",
+        lat=None,
+        lon=None,
+        audio_url=None,
+        image_url=None,
+    )
+    conn = _AckConnection()
+    mqtt_client.mqtt_crt = SimpleNamespace(
+        QoS=SimpleNamespace(AT_LEAST_ONCE=1, AT_MOST_ONCE=0)
+    )
+    mqtt_client.mqtt_connection_builder = SimpleNamespace(
+        mtls_from_path=lambda **_kw: conn
+    )
+
+    def fill(path: Path, n: int) -> float:
+        cache = OfflineCache(path)
+        start = time.perf_counter()
+        for _ in range(n):
+            cache.append(encode_row(payload, cache.species))
+        cache.commit()
+        elapsed = time.perf_counter() - start
+        cache.close()
+        return elapsed
+
+    for n in sizes:
+        path = tmp / f"cache-{n}.db"
+        elapsed = fill(path, n)
+        results[f"cache_append_{n}"] = {
+            "median_s": elapsed / n,
+            "min_s": elapsed / n,
+            "calls": n,
+        }
+        for i, (batch_size, wire_format) in enumerate(
+            ((1, "json"), (25, "json"), (25, "compact"))
+        ):
+            if i:
+                fill(path, n)  # refill after the previous flush
+            client = MQTTClient(
+                endpoint="bench",
+                client_id="bench",
+                cert_path="cert",
+                key_path="key",
+                cache_path=path,
+                flush_batch_size=batch_size,
+                flush_max_messages_per_sec=None,
+                flush_max_bytes_per_sec=None,
+                wire_format=wire_format,
+            )
+            client.connect()
+            start = time.perf_counter()
+            flushed = client.flush_cache()
+            elapsed = time.perf_counter() - start
+            client.cache.close()
+            assert flushed == n, (flushed, n)
+            suffix = "_compact" if wire_format == "compact" else ""
+            results[f"cache_flush_{n}_batch{batch_size}{suffix}"] = {
+                "median_s": elapsed / n,
+                "min_s": elapsed / n,
+                "calls": n,
+            }
+
+
+def compare(
+    results: dict[str, Any], baseline: dict[str, Any], threshold: float
+) -> list[str]:
+    """Return a line per case whose median regressed by more than threshold."""
+    regressions = []
+    for name, current in results.items():
+        base = baseline.get(name)
+        if base is None or base["median_s"] <= 0:
+            continue
+        ratio = current["median_s"] / base["median_s"]
+        if ratio > 1.0 + threshold:
+            regressions.append(
+                f"{name}: {base['median_s'] * 1e6:.1f} -> "
+                f"{current['median_s'] * 1e6:.1f} us/op ({ratio:.2f}x)"
+            )
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("-o", "--out", help="write results JSON here")
+    parser.add_argument("--compare", help="baseline results JSON to check against")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.25,
+        help="allowed slowdown vs baseline (default 0.25 = 25%%)",
+    )
+    parser.add_argument(
+        "--full", action="store_true", help="include 1M-row cache cases"
+    )
+    parser.add_argument(
+        "-k", dest="pattern", help="only cases whose group contains this"
+    )
+    args = parser.parse_args(argv)
+
+    results: dict[str, Any] = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tmp = Path(tmp_dir)
+        groups: dict[str, Callable[[], None]] = {
+            "ring": lambda: bench_ring_buffer(results),
+            "dsp": lambda: bench_dsp(results),
+            "postprocess": lambda: bench_postprocess(results),
+            "metrics": lambda: bench_metrics(results),
+            "analyzer": lambda: bench_analyzer(results, tmp),
+            "cache": lambda: bench_cache(
+                results, tmp, CACHE_ROWS_FULL if args.full else CACHE_ROWS
+            ),
+        }
+        for group, run in groups.items():
+            if args.pattern and args.pattern not in group:
+                continue
+            before = set(results)
+            run()
+            for name in sorted(set(results) - before):
+                r = results[name]
+                print(
+                    f"{name:32s} {r['median_s'] * 1e6:12.2f} us/op (min {r['min_s'] * 1e6:.2f})"
+                )
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "platform": platform.platform(),
+        },
+        "results": results,
+    }
+    if args.out:
+        Path(args.out).write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        regressions = compare(results, baseline["results"], args.threshold)
+        if regressions:
+            print(f"Regressions vs {args.compare}:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print(f"No regressions vs {args.compare} (threshold {args.threshold:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,220 @@
+"""
+Soak test: run the full capture → analysis → event pipeline on a synthetic
+signal or an audio file instead of a microphone, and report real-time
+factor, drops and memory growth.
+
+    python benchmarks/soak.py --duration 3600 --speed 0 -o soak.json
+    python benchmarks/soak.py --file dawn.wav --model-dir ~/birdnet --speed 1
+
+Without --model-dir the TFLite model is replaced by the benchmarks' stand-in
+interpreter, so the run measures the pipeline around the model. --speed 0
+replays as fast as the pipeline accepts audio (use --backpressure block so
+nothing is dropped); --speed 1 paces the source at real time, where windows
+the analysis cannot keep up with are dropped as on the device. The real-time
+factor is analysis time per second of audio (< 1 keeps up).
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import resource
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from run_benchmarks import N_CLASSES, StandInInterpreter  # noqa: E402
+
+from birdwatch import analyzer as analyzer_mod  # noqa: E402
+from birdwatch.pi.main import _Detector  # noqa: E402
+from birdwatch.recorder import (  # noqa: E402
+    BACKPRESSURE_POLICIES,
+    SAMPLE_RATE,
+    RecorderStats,
+    run_recorder,
+)
+from birdwatch.sources import FileSource, SyntheticSource  # noqa: E402
+
+
+def rss_bytes() -> int:
+    """Current resident set size (Linux; peak RSS elsewhere)."""
+    try:
+        with open("/proc/self/statm", encoding="ascii") as f:
+            return int(f.read().split()[1]) * resource.getpagesize()
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _stand_in_model(tmp: Path) -> Path:
+    model_dir = tmp / "model"
+    model_dir.mkdir()
+    (model_dir / "BirdNET_GLOBAL_6K_V2.4_Model_FP16.tflite").write_bytes(b"")
+    labels = "\n".join(f"Species {i}" for i in range(N_CLASSES))
+    (model_dir / "labels.txt").write_text(labels, encoding="utf-8")
+    analyzer_mod._load_interpreter = lambda _path, **_kw: StandInInterpreter()
+    return model_dir
+
+
+def soak(
+    source: FileSource | SyntheticSource,
+    model_dir: Path,
+    *,
+    hop_seconds: float,
+    queue_size: int,
+    backpressure: str,
+    sample_every_sec: float = 60.0,
+    **detector_options: Any,
+) -> dict[str, Any]:
+    """
+    Run the pipeline until source ends; return the measurements.
+    detector_options (e.g. gate=True) go to the pipeline's _Detector.
+    """
+    stats = RecorderStats()
+    events = 0
+
+    def count(_payload: object) -> None:
+        nonlocal events
+        events += 1
+
+    detector = _Detector(
+        "soak", model_dir, count, hop_seconds=hop_seconds, **detector_options
+    )
+    busy = 0.0
+    audio_end = 0
+    # (audio seconds, RSS) every sample_every_sec of audio
+    rss: list[tuple[float, int]] = []
+
+    def on_window(*args: Any) -> None:
+        nonlocal busy, audio_end
+        start = time.perf_counter()
+        detector.on_window(*args)
+        busy += time.perf_counter() - start
+        audio_end = args[1]
+        if audio_end / SAMPLE_RATE >= len(rss) * sample_every_sec:
+            rss.append((audio_end / SAMPLE_RATE, rss_bytes()))
+
+    rss_start = rss_bytes()
+    start = time.perf_counter()
+    try:
+        run_recorder(
+            on_window=on_window,
+            hop_seconds=detector.hop_seconds,
+            queue_size=queue_size,
+            backpressure=backpressure,  # type: ignore[arg-type]
+            stats=stats,
+            source=source,
+        )
+    finally:
+        detector.close()
+    wall = time.perf_counter() - start
+    audio_sec = audio_end / SAMPLE_RATE
+    offered = stats.enqueued + (stats.dropped if backpressure == "drop_newest" else 0)
+    rss.append((audio_sec, rss_bytes()))
+    # Memory growth: slope over the second half, once caches have warmed up
+    tail = rss[len(rss) // 2 :]
+    slope = 0.0
+    if len(tail) >= 2 and tail[-1][0] > tail[0][0]:
+        x, y = np.array(tail, dtype=np.float64).T
+        slope = float(np.polyfit(x, y, 1)[0])
+    return {
+        "audio_sec": audio_sec,
+        "wall_sec": wall,
+        "speed": audio_sec / wall if wall else 0.0,
+        "real_time_factor": busy / audio_sec if audio_sec else 0.0,
+        "windows_processed": stats.processed,
+        "windows_dropped": stats.dropped,
+        "drop_rate": stats.dropped / offered if offered else 0.0,
+        "overruns": stats.overruns,
+        "skipped_sec": stats.skipped_samples / SAMPLE_RATE,
+        "window_errors": stats.errors,
+        "events": events,
+        "gate_pass_rate": detector.gate.pass_rate if detector.gate else 1.0,
+        "rss_start_mb": rss_start / 1e6,
+        "rss_end_mb": rss[-1][1] / 1e6,
+        "rss_max_mb": max(b for _, b in rss) / 1e6,
+        "rss_growth_mb_per_audio_hour": slope * 3600 / 1e6,
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--file", help="48 kHz audio file to replay")
+    parser.add_argument(
+        "--duration",
+        type=float,
+        default=600.0,
+        help="seconds of synthetic audio (default 600)",
+    )
+    parser.add_argument(
+        "--speed",
+        type=float,
+        default=0.0,
+        help="times real time; 0 = as fast as possible (default)",
+    )
+    parser.add_argument("--model-dir", help="real BirdNET model (default: stand-in)")
+    parser.add_argument("--hop", type=float, default=3.0, help="hop seconds")
+    parser.add_argument("--queue-size", type=int, default=2)
+    parser.add_argument(
+        "--backpressure", choices=BACKPRESSURE_POLICIES, default="drop_oldest"
+    )
+    parser.add_argument(
+        "--gate", action="store_true", help="skip the model on inactive windows"
+    )
+    parser.add_argument("--gate-snr-db", type=float, default=7.0)
+    parser.add_argument("-o", "--out", help="write results JSON here")
+    args = parser.parse_args(argv)
+
+    speed = args.speed or None
+    source: FileSource | SyntheticSource
+    if args.file:
+        source = FileSource(args.file, speed=speed)
+    else:
+        # Robin-like chirps over a hum and background noise
+        source = SyntheticSource(
+            args.duration,
+            tones_hz=(120.0,),
+            chirp_hz=(2500.0, 4000.0),
+            chirp_sec=0.4,
+            chirp_every_sec=2.5,
+            noise=0.01,
+            speed=speed,
+        )
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        model_dir = Path(args.model_dir or _stand_in_model(Path(tmp_dir)))
+        results = soak(
+            source,
+            model_dir,
+            hop_seconds=args.hop,
+            queue_size=args.queue_size,
+            backpressure=args.backpressure,
+            gate=args.gate,
+            gate_snr_db=args.gate_snr_db,
+        )
+    for name, value in results.items():
+        print(f"{name:30s} {value:12.4g}")
+    if args.out:
+        report = {
+            "meta": {
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "source": args.file or "synthetic",
+                "speed": args.speed,
+                "model": args.model_dir or "stand-in",
+                "gate": args.gate,
+            },
+            "results": results,
+        }
+        Path(args.out).write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -12,6 +12,12 @@ const schema = a.schema({
       commonName: a.string(),
       confidence: a.float().required(),
       timestamp: a.datetime().required(),
+      // Aggregated events: timestamp is the start, confidence the peak
+      endTimestamp: a.datetime(),
+      meanConfidence: a.float(),
+      windowCount: a.integer(),
+      // Input channel (microphone) on multi-channel nodes
+      channel: a.integer(),
       location: a.customType({
         lat: a.float(),
         lon: a.float(),
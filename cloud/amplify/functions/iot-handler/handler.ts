@@ -1,6 +1,9 @@
 /**
- * IoT Rule invokes this Lambda with MQTT payload from birdnet/detections.
- * Forwards to AppSync createDetection (implementation uses AppSync HTTP or SDK).
+ * IoT Rule invokes this Lambda with MQTT payload from birdnet/detections, or
+ * from birdnet/detections/batch ({ detections: [...] }, sent when a Pi drains
+ * its offline cache), or with { data: base64 } from birdnet/detections/compact
+ * (packed binary detections, see birdwatch.wire). Forwards to AppSync
+ * createDetection (implementation uses AppSync HTTP or SDK).
  */
 export type HandlerEvent = {
   deviceId: string;
@@ -9,20 +12,120 @@ export type HandlerEvent = {
   commonName?: string;
   confidence: number;
   timestamp: string;
+  endTimestamp?: string;
+  meanConfidence?: number;
+  windowCount?: number;
+  channel?: number;
   location?: { lat?: number; lon?: number };
   audioUrl?: string;
   imageUrl?: string;
 };
 
+export type BatchEvent = {
+  detections: HandlerEvent[];
+};
+
+// Flag bits of a packed record (birdwatch.wire)
+const HAS_LAT = 1;
+const HAS_LON = 2;
+const HAS_END = 4;
+const HAS_MEAN = 8;
+const HAS_AUDIO = 16;
+const HAS_IMAGE = 32;
+const RECORD_SIZE = 28;
+
+const roundConfidence = (x: number): number => Math.round(x * 1e6) / 1e6;
+
+/** Decode a packed message (version 1) into handler events; throws if malformed. */
+export const unpackDetections = (data: Buffer): HandlerEvent[] => {
+  let offset = 0;
+  const text = (lengthBytes: 1 | 2): string => {
+    const n = lengthBytes === 1 ? data.readUInt8(offset) : data.readUInt16LE(offset);
+    offset += lengthBytes;
+    if (offset + n > data.length) throw new RangeError("truncated string");
+    const value = data.toString("utf8", offset, offset + n);
+    offset += n;
+    return value;
+  };
+  if (data.readUInt8(0) !== 1) throw new Error(`unsupported message version ${data[0]}`);
+  const speciesCount = data.readUInt16LE(2);
+  offset = 4;
+  const species = new Map<number, [string, string, string]>();
+  for (let i = 0; i < speciesCount; i++) {
+    const index = data.readUInt16LE(offset);
+    offset += 2;
+    species.set(index, [text(1), text(1), text(1)]);
+  }
+  const count = data.readUInt16LE(offset);
+  offset += 2;
+  const detections: HandlerEvent[] = [];
+  for (let i = 0; i < count; i++) {
+    const length = data.readUInt16LE(offset);
+    offset += 2;
+    const end = offset + length;
+    const names = species.get(data.readUInt16LE(offset));
+    if (!names) throw new Error("unknown species index");
+    const flags = data.readUInt8(offset + 2);
+    const start = Number(data.readBigInt64LE(offset + 4));
+    const event: HandlerEvent = {
+      deviceId: "",
+      speciesCode: names[0],
+      scientificName: names[1],
+      commonName: names[2],
+      channel: data.readUInt8(offset + 3),
+      timestamp: new Date(start).toISOString(),
+      confidence: roundConfidence(data.readFloatLE(offset + 16)),
+      windowCount: data.readUInt32LE(offset + 24),
+    };
+    if (flags & HAS_END) event.endTimestamp = new Date(start + data.readUInt32LE(offset + 12)).toISOString();
+    if (flags & HAS_MEAN) event.meanConfidence = roundConfidence(data.readFloatLE(offset + 20));
+    offset += RECORD_SIZE;
+    if (flags & (HAS_LAT | HAS_LON)) event.location = {};
+    if (flags & HAS_LAT) {
+      event.location!.lat = data.readDoubleLE(offset);
+      offset += 8;
+    }
+    if (flags & HAS_LON) {
+      event.location!.lon = data.readDoubleLE(offset);
+      offset += 8;
+    }
+    event.deviceId = text(1);
+    if (flags & HAS_AUDIO) event.audioUrl = text(2);
+    if (flags & HAS_IMAGE) event.imageUrl = text(2);
+    if (offset !== end) throw new Error("malformed record");
+    detections.push(event);
+  }
+  return detections;
+};
+
 export const handler = async (event: { [key: string]: unknown }): Promise<{ statusCode: number; body?: string }> => {
   // IoT Core rule sends the MQTT message payload as the Lambda event
-  const payload = event as unknown as HandlerEvent;
-  if (!payload.deviceId || !payload.speciesCode || !payload.timestamp || payload.confidence == null) {
+  let payloads: HandlerEvent[];
+  if (typeof event.data === "string") {
+    // Compact topic: the rule forwards the binary payload base64-encoded
+    try {
+      payloads = unpackDetections(Buffer.from(event.data, "base64"));
+    } catch (e) {
+      return { statusCode: 400, body: `Malformed packed detections: ${e}` };
+    }
+  } else {
+    payloads = Array.isArray(event.detections)
+      ? (event as unknown as BatchEvent).detections
+      : [event as unknown as HandlerEvent];
+  }
+  let rejected = 0;
+  for (const payload of payloads) {
+    if (!payload.deviceId || !payload.speciesCode || !payload.timestamp || payload.confidence == null) {
+      rejected += 1;
+      continue;
+    }
+    // TODO: call AppSync createDetection via HTTP (signed) or SDK
+    // const endpoint = process.env.APPSYNC_ENDPOINT;
+    // await postMutation(endpoint, "createDetection", { input: { ...payload } });
+    console.log("Detection received:", payload);
+  }
+  if (rejected === payloads.length) {
     return { statusCode: 400, body: "Missing required fields" };
   }
-  // TODO: call AppSync createDetection via HTTP (signed) or SDK
-  // const endpoint = process.env.APPSYNC_ENDPOINT;
-  // await postMutation(endpoint, "createDetection", { input: { ...payload } });
-  console.log("Detection received:", payload);
-  return { statusCode: 200 };
+  return { statusCode: 200, body: rejected ? `${rejected} detections missing required fields` : undefined };
 };
@@ -2,14 +2,38 @@
 
 
 def main() -> None:
-    """Entry point for birdwatch CLI. Runs Pi pipeline if BIRDNET_MODEL_DIR set."""
+    """
+    Entry point for birdwatch CLI. ``birdwatch analyze <dir>`` processes
+    recordings offline; ``birdwatch calibrate`` picks the model variant and
+    thread count for this board; ``birdwatch --startup-profile`` times a
+    cold start up to the first inference; otherwise runs Pi pipeline if
+    BIRDNET_MODEL_DIR set.
+    """
+    import time
+
+    start = time.perf_counter()
     import os
     import sys
 
+    if sys.argv[1:2] == ["--startup-profile"]:
+        from birdwatch.pi.startup import main_startup_profile
+
+        sys.exit(main_startup_profile(start))
+    if sys.argv[1:2] == ["analyze"]:
+        from birdwatch.archive import main_analyze
+
+        sys.exit(main_analyze(sys.argv[2:]))
+    if sys.argv[1:2] == ["calibrate"]:
+        from birdwatch.calibration import main_calibrate
+
+        sys.exit(main_calibrate(sys.argv[2:]))
     if os.environ.get("BIRDNET_MODEL_DIR"):
         from birdwatch.pi.main import main_pi
 
         sys.exit(main_pi())
     print("Usage: set BIRDNET_MODEL_DIR (and AWS IoT env) then run birdwatch")
+    print("       birdwatch analyze <dir> to analyse WAV/FLAC recordings")
+    print("       birdwatch calibrate [<model dir>] to time the model variants")
+    print("       birdwatch --startup-profile to time startup to first inference")
     print("See docs/embedded.md")
     sys.exit(0)
@@ -3,16 +3,26 @@
 from __future__ import annotations
 
 import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from functools import cache
 from pathlib import Path
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
-import librosa
 import numpy as np
 
-try:
-    import tflite_runtime.interpreter as tflite  # type: ignore[import-untyped]
-except ImportError:
-    tflite = None
+from birdwatch.metrics import REGISTRY
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Sequence
+
+    from birdwatch.gate import ActivityGate
+
+# scipy.fft and tflite_runtime are imported on first use (see _rfft and
+# _load_interpreter): together they are most of this module's import time,
+# which a Pi pays on every cold start.
 
 # Match BirdNET training (48 kHz, 3 s window, 96 mels; see plan-full.md §2.1.1)
 SAMPLE_RATE = 48_000
@@ -23,43 +33,335 @@ FMAX = 15_000.0
 WINDOW_S = 3.0
 INPUT_SAMPLES = int(SAMPLE_RATE * WINDOW_S)
 
+# Model files by variant, most accurate first. INT8 is BirdNET's
+# dynamic-range quantized export.
+MODEL_VARIANTS: dict[str, str] = {
+    "fp32": "BirdNET_GLOBAL_6K_V2.4_Model_FP32.tflite",
+    "fp16": "BirdNET_GLOBAL_6K_V2.4_Model_FP16.tflite",
+    "int8": "BirdNET_GLOBAL_6K_V2.4_Model_INT8.tflite",
+}
+DEFAULT_VARIANT = "fp16"
+
+
+def _hz_to_mel(hz: np.ndarray) -> np.ndarray:
+    """Slaney mel scale: linear below 1 kHz, logarithmic above."""
+    hz = np.asarray(hz, dtype=np.float64)
+    log_region = hz >= 1000.0
+    mel = hz * 3.0 / 200.0
+    mel[log_region] = 15.0 + np.log(hz[log_region] / 1000.0) * 27.0 / np.log(6.4)
+    return mel
+
+
+def _mel_to_hz(mel: np.ndarray) -> np.ndarray:
+    mel = np.asarray(mel, dtype=np.float64)
+    log_region = mel >= 15.0
+    hz = mel * 200.0 / 3.0
+    hz[log_region] = 1000.0 * np.exp((mel[log_region] - 15.0) * np.log(6.4) / 27.0)
+    return hz
+
+
+@cache
+def _mel_basis() -> np.ndarray:
+    """
+    BirdNET mel filterbank (n_mels × n_fft//2+1), built once per process.
+
+    Slaney-normalized triangles on the Slaney mel scale, as
+    librosa.filters.mel(sr, n_fft, n_mels, fmax) builds them, in plain NumPy
+    so loading the analyzer does not import librosa.
+    """
+    fft_freqs = np.fft.rfftfreq(N_FFT, 1.0 / SAMPLE_RATE)
+    mel_min, mel_max = _hz_to_mel(np.array([0.0, FMAX]))
+    # n_mels triangles need n_mels + 2 band edges
+    edges = _mel_to_hz(np.linspace(mel_min, mel_max, N_MELS + 2))
+    widths = np.diff(edges)
+    ramps = edges[:, np.newaxis] - fft_freqs[np.newaxis, :]
+    lower = -ramps[:-2] / widths[:-1, np.newaxis]
+    upper = ramps[2:] / widths[1:, np.newaxis]
+    weights = np.maximum(0.0, np.minimum(lower, upper))
+    weights *= (2.0 / (edges[2:] - edges[:-2]))[:, np.newaxis]
+    return weights.astype(np.float32)
+
+
+@cache
+def _rfft() -> Callable[..., np.ndarray]:
+    """scipy.fft.rfft, imported on first use (float32 in, complex64 out)."""
+    import scipy.fft
+
+    return scipy.fft.rfft
+
+
+@cache
+def _hann_window() -> np.ndarray:
+    """Periodic Hann, as librosa's default get_window("hann", fftbins=True)."""
+    n = np.arange(N_FFT)
+    return (0.5 - 0.5 * np.cos(2.0 * np.pi * n / N_FFT)).astype(np.float32)
+
+
+class MelFrontend:
+    """
+    Log-mel front end with BirdNET parameters, built once and reused.
+
+    Holds the mel filterbank, periodic Hann window and scratch buffers, and
+    computes each window with one batched rFFT and one matmul into
+    preallocated outputs. Matches librosa.feature.melspectrogram
+    (center=True, zero padding, power 2) to float32 round-off. Not
+    thread-safe: use one instance per thread.
+    """
+
+    def __init__(self, n_samples: int = INPUT_SAMPLES) -> None:
+        self.n_samples = n_samples
+        self.n_frames = 1 + n_samples // HOP_LENGTH
+        self._mel_basis = _mel_basis()
+        self._window = _hann_window()
+        self._rfft = _rfft()
+        pad = N_FFT // 2
+        self._padded = np.zeros(n_samples + 2 * pad, dtype=np.float32)
+        self._signal = self._padded[pad : pad + n_samples]
+        self._frame_view = np.lib.stride_tricks.sliding_window_view(
+            self._padded, N_FFT
+        )[::HOP_LENGTH]
+        self._frames = np.empty((self.n_frames, N_FFT), dtype=np.float32)
+        self._power = np.empty((self.n_frames, N_FFT // 2 + 1), dtype=np.float32)
+        self._power_im = np.empty_like(self._power)
+        self._out = np.empty((1, N_MELS, self.n_frames), dtype=np.float32)
+
+    def __call__(self, buffer: np.ndarray) -> np.ndarray:
+        """
+        Return (1, n_mels, n_frames) float32 log-mel of buffer.
+
+        buffer is zero-padded or trimmed to n_samples and peak-normalized.
+        The result is an internal buffer overwritten by the next call.
+        """
+        sig = self._signal
+        n = min(buffer.size, self.n_samples)
+        sig[:n] = buffer[:n]
+        sig[n:] = 0.0
+        peak = max(float(sig.max()), -float(sig.min()))
+        if peak > 1e-8:
+            np.divide(sig, np.float32(peak), out=sig)
+        np.multiply(self._frame_view, self._window, out=self._frames)
+        spec = self._rfft(self._frames, axis=1, overwrite_x=True)
+        np.square(spec.real, out=self._power)
+        np.square(spec.imag, out=self._power_im)
+        self._power += self._power_im
+        mel = self._out[0]
+        np.matmul(self._mel_basis, self._power.T, out=mel)
+        mel += 1e-8
+        np.log(mel, out=mel)
+        return self._out
+
+
+class StreamingMelFrontend:
+    """
+    Rolling log-mel front end for overlapping windows.
+
+    Frames sit on a fixed hop_length grid over the continuous stream; push()
+    computes mel frames only for newly arrived samples and keeps the last
+    n_frames (plus per-frame peaks) in a rolling history, and window()
+    slices the model input out of it. Per-window cost therefore scales with
+    the hop, not the window length.
+
+    Differences from MelFrontend: frames at window edges see neighbouring
+    audio instead of zero padding, the frame grid is quantized to the
+    stream (up to hop_length / 2 samples of offset), the newest frame lags
+    the newest sample by n_fft / 2, and peak normalization uses per-hop
+    block peaks. Not thread-safe.
+    """
+
+    def __init__(self, n_samples: int = INPUT_SAMPLES) -> None:
+        self.n_frames = 1 + n_samples // HOP_LENGTH
+        self._mel_basis = _mel_basis()
+        self._window = _hann_window()
+        self._rfft = _rfft()
+        self._mel = np.zeros((self.n_frames, N_MELS), dtype=np.float32)
+        self._peaks = np.zeros(self.n_frames, dtype=np.float32)
+        self._out = np.empty((1, N_MELS, self.n_frames), dtype=np.float32)
+        self.reset()
+
+    def reset(self) -> None:
+        """Forget the stream (e.g. after a gap); history reads as silence."""
+        self._mel.fill(0.0)
+        self._peaks.fill(0.0)
+        self._count = 0  # frames computed so far
+        # Samples from the start of the next frame on; the stream starts with
+        # n_fft/2 zeros so frame 0 is centred on sample 0, like center=True.
+        self._pending = np.zeros(N_FFT // 2, dtype=np.float32)
+
+    def push(self, samples: np.ndarray) -> None:
+        """Append new stream samples and compute every frame they complete."""
+        pending = np.concatenate(
+            [self._pending, samples.astype(np.float32, copy=False)]
+        )
+        m = 0 if pending.size < N_FFT else 1 + (pending.size - N_FFT) // HOP_LENGTH
+        # Frames older than the history would be overwritten; don't compute them
+        first = max(0, m - self.n_frames)
+        if m > first:
+            start = first * HOP_LENGTH
+            view = np.lib.stride_tricks.sliding_window_view(pending[start:], N_FFT)
+            frames = (
+                view[: (m - first - 1) * HOP_LENGTH + 1 : HOP_LENGTH] * self._window
+            )
+            spec = self._rfft(frames, axis=1, overwrite_x=True)
+            power = np.square(spec.real)
+            power += np.square(spec.imag)
+            # Each frame owns the hop of samples starting at its centre
+            centre = start + N_FFT // 2
+            blocks = pending[centre : centre + (m - first) * HOP_LENGTH]
+            rows = (self._count + np.arange(first, m)) % self.n_frames
+            self._mel[rows] = power @ self._mel_basis.T
+            self._peaks[rows] = np.abs(blocks.reshape(-1, HOP_LENGTH)).max(axis=1)
+            self._count += m
+        self._pending = pending[m * HOP_LENGTH :]
+
+    def update(self, window: np.ndarray, new_samples: int | None) -> np.ndarray:
+        """
+        Advance to window, whose last new_samples samples are unseen, and
+        return window(). Resets and pushes the whole window when new_samples
+        is None or covers it (first window, or a gap in the stream).
+        """
+        if new_samples is None or new_samples >= window.size:
+            self.reset()
+            self.push(window)
+        elif new_samples > 0:
+            self.push(window[-new_samples:])
+        return self.window()
+
+    def window(self) -> np.ndarray:
+        """
+        Return (1, n_mels, n_frames) float32 log-mel of the latest frames.
+
+        The result is an internal buffer overwritten by the next call.
+        """
+        out = self._out[0]
+        pos = self._count % self.n_frames
+        k = self.n_frames - pos
+        out[:, :k] = self._mel[pos:].T
+        out[:, k:] = self._mel[:pos].T
+        peak = float(self._peaks.max())
+        if peak > 1e-8:
+            out *= np.float32(1.0 / (peak * peak))
+        out += 1e-8
+        np.log(out, out=out)
+        return self._out
+
+
+def frame_aligned_hop(hop_seconds: float) -> float:
+    """
+    Round hop_seconds to a whole number of STFT hops (hop_length samples).
+
+    With an aligned hop, StreamingMelFrontend windows share their frame grid
+    with MelFrontend, so interior frames match preprocess_audio exactly.
+    """
+    frames = max(1, round(hop_seconds * SAMPLE_RATE / HOP_LENGTH))
+    return frames * HOP_LENGTH / SAMPLE_RATE
+
+
+_local = threading.local()
+
+_preprocess_seconds = REGISTRY.histogram(
+    "birdwatch_preprocess_seconds", "Mel front end time per window"
+)
+_invoke_seconds = REGISTRY.histogram(
+    "birdwatch_invoke_seconds", "TFLite interpreter invoke time per call"
+)
+_postprocess_seconds = REGISTRY.histogram(
+    "birdwatch_postprocess_seconds", "Logit post-processing time per call"
+)
+
 
 def preprocess_audio(buffer: np.ndarray) -> np.ndarray:
     """
     Convert 3 s float32 mono (48 kHz) to mel spectrogram.
 
-    Uses librosa with BirdNET parameters: n_fft=2048, hop_length=278,
-    n_mels=96, fmax=15000. Output shape suitable for BirdNET TFLite input.
-    """
-    if buffer.size < INPUT_SAMPLES:
-        pad = np.zeros(INPUT_SAMPLES - buffer.size, dtype=buffer.dtype)
-        buffer = np.concatenate([buffer, pad])
-    elif buffer.size > INPUT_SAMPLES:
-        buffer = buffer[:INPUT_SAMPLES].copy()
-    # Normalize to roughly [-1, 1]
-    peak = np.abs(buffer).max()
-    if peak > 1e-8:
-        buffer = buffer / peak
-    mel = librosa.feature.melspectrogram(
-        y=buffer,
-        sr=SAMPLE_RATE,
-        n_fft=N_FFT,
-        hop_length=HOP_LENGTH,
-        n_mels=N_MELS,
-        fmax=FMAX,
-    )
-    # Log scale; ensure shape (1, n_mels, time)
-    log_mel = np.log(mel + 1e-8).astype(np.float32)
-    return log_mel[np.newaxis, :, :]
-
-
-def _load_interpreter(model_path: str | Path) -> Any:
-    """Load TFLite interpreter; requires tflite_runtime on Pi."""
-    if tflite is None:
+    BirdNET parameters: n_fft=2048, hop_length=278, n_mels=96, fmax=15000.
+    Output shape suitable for BirdNET TFLite input. Uses a per-thread
+    MelFrontend and returns a fresh array.
+    """
+    frontend = getattr(_local, "frontend", None)
+    if frontend is None:
+        frontend = _local.frontend = MelFrontend()
+    return frontend(buffer).copy()
+
+
+def _logit(p: float) -> float:
+    """Inverse sigmoid: the logit whose sigmoid is p (±inf at 0 and 1)."""
+    if p <= 0.0:
+        return -np.inf
+    if p >= 1.0:
+        return np.inf
+    return float(np.log(p / (1.0 - p)))
+
+
+def postprocess_logits(
+    logits: np.ndarray,
+    confidence_threshold: float = 0.7,
+    top_k: int = 10,
+    species: np.ndarray | None = None,
+) -> list[list[tuple[int, float]]]:
+    """
+    Turn (windows × classes) logits into per-window detections.
+
+    Thresholds on logits against the inverse sigmoid of
+    confidence_threshold, so windows with no candidate never compute an
+    exp; candidates are cut to top_k with np.argpartition, and only those
+    go through the sigmoid. Each window's list holds (species_index,
+    confidence) sorted by confidence desc. 1-D logits are one window.
+    species, if given, is an index array of the only classes considered
+    (see birdwatch.species); the others are never thresholded.
+    """
+    logits = np.atleast_2d(logits)
+    if species is not None:
+        logits = logits[:, species]
+    hits = logits >= _logit(confidence_threshold)
+    results: list[list[tuple[int, float]]] = [[] for _ in range(logits.shape[0])]
+    for w in np.flatnonzero(hits.any(axis=1)):
+        row = logits[w]
+        idx = np.flatnonzero(hits[w])
+        if idx.size > top_k:
+            idx = idx[np.argpartition(row[idx], -top_k)[-top_k:]]
+        idx = idx[np.argsort(row[idx])[::-1]]
+        # Sigmoid
+        probs = 1.0 / (1.0 + np.exp(-row[idx]))
+        if species is not None:
+            idx = species[idx]
+        results[w] = list(zip(idx.tolist(), probs.tolist(), strict=True))
+    return results
+
+
+def _load_interpreter(
+    model_path: str | Path, num_threads: int | None = None, xnnpack: bool = True
+) -> Any:
+    """
+    Load TFLite interpreter; requires tflite_runtime on Pi.
+
+    num_threads sets the interpreter's (and XNNPACK's) thread count (None:
+    TFLite default). tflite-runtime applies the XNNPACK delegate to float
+    models by default; xnnpack=False runs the reference kernels instead.
+    """
+    try:
+        import tflite_runtime.interpreter as tflite  # type: ignore[import-untyped]
+    except ImportError:
         raise RuntimeError(
             "tflite_runtime not installed (install on Raspberry Pi: pip install tflite-runtime)"
+        ) from None
+    kwargs: dict[str, Any] = {}
+    if num_threads:
+        kwargs["num_threads"] = num_threads
+    if not xnnpack:
+        kwargs["experimental_op_resolver_type"] = (
+            tflite.OpResolverType.BUILTIN_WITHOUT_DEFAULT_DELEGATES
         )
-    return tflite.Interpreter(model_path=str(model_path))
+    return tflite.Interpreter(model_path=str(model_path), **kwargs)
+
+
+def find_model_variants(model_dir: str | Path) -> dict[str, Path]:
+    """Model files present in model_dir by variant, most accurate first."""
+    model_dir = Path(model_dir)
+    return {
+        variant: model_dir / name
+        for variant, name in MODEL_VARIANTS.items()
+        if (model_dir / name).is_file()
+    }
 
 
 def _load_labels(labels_path: str | Path) -> list[str]:
@@ -73,56 +375,211 @@ class BirdNETAnalyzer:
     Run BirdNET inference on 3 s audio buffers.
 
     Expects BirdNET TFLite model and labels.txt in model_dir (or
-    BIRDNET_MODEL_DIR). Returns list of (species_index, confidence) above
-    threshold.
+    BIRDNET_MODEL_DIR). Returns up to top_k (species_index, confidence) above
+    threshold. With streaming=True, run() reuses mel frames across
+    overlapping windows (see StreamingMelFrontend) when told how many
+    samples of each window are new. num_threads and xnnpack are passed to
+    the TFLite interpreter (see _load_interpreter). species restricts
+    detections to those label indices (see birdwatch.species). gate, if
+    given, sees each window's mel frames first; windows it rejects return
+    no detections without invoking the model (see birdwatch.gate).
+    batch_size sizes the model input once, at start-up (e.g. to the
+    channel count for run_batch); smaller calls are padded to it rather
+    than reallocating the interpreter's tensors.
+
+    variant picks the model file (see MODEL_VARIANTS); by default FP16 if
+    present, otherwise the most accurate variant in model_dir.
+    birdwatch.calibration chooses one by measured speed.
     """
 
     def __init__(
         self,
         model_dir: str | Path | None = None,
         confidence_threshold: float = 0.7,
+        streaming: bool = False,
+        top_k: int = 10,
+        num_threads: int | None = None,
+        xnnpack: bool = True,
+        species: Sequence[int] | np.ndarray | None = None,
+        gate: ActivityGate | None = None,
+        variant: str | None = None,
+        batch_size: int = 1,
     ) -> None:
         model_dir = model_dir or os.environ.get("BIRDNET_MODEL_DIR", "")
         if not model_dir:
             raise ValueError("model_dir or BIRDNET_MODEL_DIR must be set")
         self.model_dir = Path(model_dir)
-        self.model_path = self.model_dir / "BirdNET_GLOBAL_6K_V2.4_Model_FP16.tflite"
+        if variant is not None and variant not in MODEL_VARIANTS:
+            raise ValueError(
+                f"variant must be one of {', '.join(MODEL_VARIANTS)}; got {variant!r}"
+            )
+        if variant is None:
+            found = find_model_variants(self.model_dir)
+            variant = (
+                DEFAULT_VARIANT
+                if DEFAULT_VARIANT in found
+                else next(iter(found), DEFAULT_VARIANT)
+            )
+        self.variant = variant
+        self.model_path = self.model_dir / MODEL_VARIANTS[variant]
         self.labels_path = self.model_dir / "labels.txt"
         if not self.model_path.is_file():
             raise FileNotFoundError(f"Model not found: {self.model_path}")
         if not self.labels_path.is_file():
             raise FileNotFoundError(f"Labels not found: {self.labels_path}")
+        if top_k < 1:
+            raise ValueError("top_k must be >= 1")
+        if batch_size < 1:
+            raise ValueError("batch_size must be >= 1")
         self.confidence_threshold = confidence_threshold
-        self._interpreter = _load_interpreter(self.model_path)
+        self.top_k = top_k
+        self.gate = gate
+        self._interpreter = _load_interpreter(
+            self.model_path, num_threads=num_threads, xnnpack=xnnpack
+        )
         self._labels = _load_labels(self.labels_path)
+        self.species: np.ndarray | None = None
+        self.set_species(species)
         self._interpreter.allocate_tensors()
         in_details = self._interpreter.get_input_details()[0]
         self._input_index = in_details["index"]
-        self._input_shape = in_details["shape"]
+        self._input_shape = tuple(int(d) for d in in_details["shape"])
+        self._output_index = self._interpreter.get_output_details()[0]["index"]
+        self._batch_size = self._input_shape[0] if self._input_shape else 1
+        self._can_batch = True  # until resize_tensor_input says otherwise
+        if batch_size > self._batch_size:
+            self._set_batch_size(batch_size)
+        self._frontend = MelFrontend()
+        self._stream = StreamingMelFrontend() if streaming else None
+
+    def _to_input(self, features: np.ndarray) -> np.ndarray:
+        """Fit (1, n_mels, frames) features to the model's per-window input shape."""
+        shape = (1, *self._input_shape[1:])
+        if features.shape != shape:
+            # Resize if model expects different (e.g. time steps)
+            return _resize_to_input(features, shape)
+        return features
 
-    def run(self, buffer: np.ndarray) -> list[tuple[int, float]]:
+    def _invoke_rows(self, rows: np.ndarray) -> np.ndarray:
         """
-        Run inference on 3 s float32 buffer. Returns list of
-        (species_index, confidence) above threshold, sorted by confidence desc.
+        Logits for a (n, ...) input: padded up to the input's batch size,
+        which only ever grows (once, if n exceeds it and the model can be
+        resized), else split into batches of that size.
         """
-        inp = preprocess_audio(buffer)
-        if inp.shape != tuple(self._input_shape):
-            # Resize if model expects different (e.g. batch or time steps)
-            inp = _resize_to_input(inp, self._input_shape)
+        n = len(rows)
+        if n > self._batch_size:
+            self._set_batch_size(n)
+        size = self._batch_size
+        if n == size:
+            return self._invoke(rows)
+        if n < size:
+            padded = np.zeros((size, *rows.shape[1:]), dtype=np.float32)
+            padded[:n] = rows
+            return self._invoke(padded)[:n]
+        return np.concatenate(
+            [self._invoke_rows(rows[i : i + size]) for i in range(0, n, size)]
+        )
+
+    def _set_batch_size(self, n: int) -> bool:
+        """Resize the input's batch dimension to n; False if the model can't."""
+        if n == self._batch_size:
+            return True
+        if not self._can_batch:
+            return False
+        try:
+            self._interpreter.resize_tensor_input(
+                self._input_index, [n, *self._input_shape[1:]]
+            )
+            self._interpreter.allocate_tensors()
+        except (RuntimeError, ValueError):
+            self._can_batch = False
+            self._interpreter.resize_tensor_input(
+                self._input_index, [self._batch_size, *self._input_shape[1:]]
+            )
+            self._interpreter.allocate_tensors()
+            return False
+        self._batch_size = n
+        return True
+
+    def _invoke(self, inp: np.ndarray) -> np.ndarray:
+        """Run the interpreter on a prepared input; return (batch, classes) logits."""
         self._interpreter.set_tensor(self._input_index, inp)
+        start = time.perf_counter()
         self._interpreter.invoke()
-        out_details = self._interpreter.get_output_details()[0]
-        logits = self._interpreter.get_tensor(out_details["index"]).squeeze()
-        if logits.ndim > 1:
-            logits = logits.reshape(-1)
-        # Sigmoid
-        probs = 1.0 / (1.0 + np.exp(-logits))
-        above = [
-            (i, float(probs[i]))
-            for i in np.argsort(probs)[::-1]
-            if probs[i] >= self.confidence_threshold
-        ]
-        return above[:10]  # Top 10
+        _invoke_seconds.observe(time.perf_counter() - start)
+        logits = self._interpreter.get_tensor(self._output_index)
+        return logits.reshape(inp.shape[0], -1)
+
+    def run(
+        self, buffer: np.ndarray, *, new_samples: int | None = None
+    ) -> list[tuple[int, float]]:
+        """
+        Run inference on 3 s float32 buffer. Returns list of
+        (species_index, confidence) above threshold, sorted by confidence desc.
+
+        new_samples is how much of buffer follows the previous call's buffer
+        (None if unknown or discontinuous); the streaming front end then
+        computes mel frames only for that tail.
+        """
+        start = time.perf_counter()
+        if self._stream is not None:
+            features = self._stream.update(buffer, new_samples)
+        else:
+            features = self._frontend(buffer)
+        _preprocess_seconds.observe(time.perf_counter() - start)
+        if self.gate is not None and not self.gate(features):
+            return []
+        logits = self._invoke_rows(self._to_input(features))
+        return self._postprocess(logits)[0]
+
+    def _postprocess(self, logits: np.ndarray) -> list[list[tuple[int, float]]]:
+        start = time.perf_counter()
+        results = postprocess_logits(
+            logits, self.confidence_threshold, self.top_k, self.species
+        )
+        _postprocess_seconds.observe(time.perf_counter() - start)
+        return results
+
+    def run_batch(self, buffers: Sequence[np.ndarray]) -> list[list[tuple[int, float]]]:
+        """
+        Run inference on several 3 s buffers; return run()'s result per buffer.
+
+        If the model accepts a resized batch dimension, all windows (that
+        pass the gate) go through one invoke, padded to the batch size;
+        otherwise windows are invoked one at a time. Windows are treated as
+        independent (the streaming front end is not used).
+        """
+        results: list[list[tuple[int, float]]] = [[] for _ in buffers]
+        batch = np.empty((len(buffers), *self._input_shape[1:]), dtype=np.float32)
+        rows: list[int] = []  # buffers that go to the model, in batch order
+        for i, buf in enumerate(buffers):
+            start = time.perf_counter()
+            features = self._frontend(buf)
+            _preprocess_seconds.observe(time.perf_counter() - start)
+            if self.gate is None or self.gate(features):
+                batch[len(rows)] = self._to_input(features)[0]
+                rows.append(i)
+        if not rows:
+            return results
+        logits = self._invoke_rows(batch[: len(rows)])
+        for i, res in zip(rows, self._postprocess(logits), strict=True):
+            results[i] = res
+        return results
+
+    def set_species(self, species: Sequence[int] | np.ndarray | None) -> None:
+        """
+        Restrict detections to the label indices species (None: all); takes
+        effect from the next window.
+        """
+        if species is None:
+            self.species = None
+            return
+        indices = np.unique(np.asarray(species, dtype=np.intp))
+        if indices.size == 0 or indices[0] < 0 or indices[-1] >= len(self._labels):
+            raise ValueError(
+                f"species must be non-empty indices below {len(self._labels)}"
+            )
+        self.species = indices
 
     def species_name(self, index: int) -> str:
         """Return scientific name for species index."""
@@ -131,6 +588,98 @@ class BirdNETAnalyzer:
         return f"unknown_{index}"
 
 
+class AnalyzerPool:
+    """
+    Several BirdNETAnalyzers, each owned by one worker thread.
+
+    Windows submitted to the pool are analysed concurrently; TFLite invoke
+    and the mel front end's FFT and matmul release the GIL, so while one
+    worker runs inference another computes the next window's spectrogram
+    and multi-core boards are kept busy. Windows are independent (no
+    streaming front end). At most max_pending windows (default: workers)
+    wait for a worker; submit() blocks beyond that, so a slow pool pushes
+    back on its producer. Keyword arguments go to each BirdNETAnalyzer;
+    use num_threads=1 so the workers do not oversubscribe the cores.
+    """
+
+    def __init__(
+        self,
+        model_dir: str | Path | None = None,
+        workers: int = 2,
+        *,
+        max_pending: int | None = None,
+        **analyzer_kwargs: Any,
+    ) -> None:
+        if workers < 1:
+            raise ValueError("workers must be >= 1")
+        if analyzer_kwargs.get("streaming"):
+            raise ValueError(
+                "AnalyzerPool windows are independent; streaming is unsupported"
+            )
+        self.analyzers = [
+            BirdNETAnalyzer(model_dir, **analyzer_kwargs) for _ in range(workers)
+        ]
+        self._tasks: queue.Queue[tuple[np.ndarray, Future] | None] = queue.Queue(
+            maxsize=max_pending or workers
+        )
+        self._threads = [
+            threading.Thread(
+                target=self._work,
+                args=(analyzer,),
+                name=f"birdwatch-analyzer-{i}",
+                daemon=True,
+            )
+            for i, analyzer in enumerate(self.analyzers)
+        ]
+        for t in self._threads:
+            t.start()
+
+    def __enter__(self) -> AnalyzerPool:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    def _work(self, analyzer: BirdNETAnalyzer) -> None:
+        while (task := self._tasks.get()) is not None:
+            buffer, future = task
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(analyzer.run(buffer))
+            except Exception as e:
+                future.set_exception(e)
+
+    def submit(self, buffer: np.ndarray) -> Future[list[tuple[int, float]]]:
+        """
+        Queue a 3 s window; the future resolves to run()'s result. The
+        buffer is read by a worker later, so do not reuse it until then.
+        """
+        future: Future[list[tuple[int, float]]] = Future()
+        self._tasks.put((buffer, future))
+        return future
+
+    def map(self, buffers: Sequence[np.ndarray]) -> list[list[tuple[int, float]]]:
+        """Analyse buffers concurrently; return results in order."""
+        return [f.result() for f in [self.submit(b) for b in buffers]]
+
+    def species_name(self, index: int) -> str:
+        """Return scientific name for species index."""
+        return self.analyzers[0].species_name(index)
+
+    def set_species(self, species: Sequence[int] | np.ndarray | None) -> None:
+        """Restrict every worker's detections (see BirdNETAnalyzer.set_species)."""
+        for analyzer in self.analyzers:
+            analyzer.set_species(species)
+
+    def close(self) -> None:
+        """Finish queued windows and stop the workers."""
+        for _ in self._threads:
+            self._tasks.put(None)
+        for t in self._threads:
+            t.join()
+
+
 def _resize_to_input(arr: np.ndarray, target_shape: tuple[int, ...]) -> np.ndarray:
     """Broadcast or trim to target shape."""
     t = list(target_shape)
@@ -0,0 +1,277 @@
+"""Offline bulk analysis of WAV/FLAC recordings (``birdwatch analyze <dir>``)."""
+
+from __future__ import annotations
+
+import csv
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from birdwatch.analyzer import INPUT_SAMPLES, SAMPLE_RATE, BirdNETAnalyzer
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+AUDIO_EXTENSIONS = (".wav", ".flac")
+CSV_HEADER = ("file", "offset_s", "species", "confidence")
+MIN_TAIL_SECONDS = 1.0  # shorter trailing windows are not analysed
+
+# Per-process analyzer, created by _init_worker (one TFLite interpreter each)
+_worker_analyzer: BirdNETAnalyzer | None = None
+
+
+def find_audio_files(root: str | Path) -> list[Path]:
+    """Return WAV/FLAC files under root (recursively), sorted by path."""
+    root = Path(root)
+    if root.is_file():
+        return [root]
+    return sorted(
+        p
+        for p in root.rglob("*")
+        if p.is_file() and p.suffix.lower() in AUDIO_EXTENSIONS
+    )
+
+
+def iter_windows(
+    path: str | Path, block_seconds: float = 30.0
+) -> Iterator[tuple[float, np.ndarray]]:
+    """
+    Yield (offset_s, 3 s float32 window at 48 kHz) from an audio file.
+
+    Reads block_seconds at a time so long recordings never load whole, takes
+    channel 0 (as the live recorder does), and resamples to 48 kHz with a
+    streaming resampler only when the file is at another rate. A final
+    partial window of at least MIN_TAIL_SECONDS is zero-padded.
+    """
+    import soundfile as sf
+
+    with sf.SoundFile(str(path)) as f:
+        resampler = None
+        if f.samplerate != SAMPLE_RATE:
+            import soxr
+
+            resampler = soxr.ResampleStream(
+                f.samplerate, SAMPLE_RATE, 1, dtype="float32"
+            )
+        block = max(1, int(block_seconds * f.samplerate))
+        pending = np.empty(0, dtype=np.float32)
+        offset = 0
+        while True:
+            data = f.read(block, dtype="float32", always_2d=True)
+            last = len(data) < block
+            samples = data[:, 0]
+            if resampler is not None:
+                samples = resampler.resample_chunk(samples, last=last)
+            pending = np.concatenate([pending, samples]) if pending.size else samples
+            n_full = pending.size // INPUT_SAMPLES
+            for i in range(n_full):
+                window = pending[i * INPUT_SAMPLES : (i + 1) * INPUT_SAMPLES]
+                yield (offset + i * INPUT_SAMPLES) / SAMPLE_RATE, window
+            offset += n_full * INPUT_SAMPLES
+            pending = pending[n_full * INPUT_SAMPLES :]
+            if last:
+                break
+        if pending.size >= MIN_TAIL_SECONDS * SAMPLE_RATE:
+            window = np.zeros(INPUT_SAMPLES, dtype=np.float32)
+            window[: pending.size] = pending
+            yield offset / SAMPLE_RATE, window
+
+
+def _init_worker(
+    model_dir: str,
+    confidence_threshold: float,
+    batch_size: int = 1,
+    num_threads: int | None = None,
+) -> None:
+    global _worker_analyzer
+    _worker_analyzer = BirdNETAnalyzer(
+        model_dir=model_dir,
+        confidence_threshold=confidence_threshold,
+        num_threads=num_threads,
+        batch_size=batch_size,
+    )
+
+
+def _analyze_file(
+    path: str, batch_size: int
+) -> tuple[str, list[tuple[float, str, float]], float]:
+    """Analyse one file in the current worker; return (path, rows, audio_seconds)."""
+    analyzer = _worker_analyzer
+    assert analyzer is not None, "_init_worker not run"
+    rows: list[tuple[float, str, float]] = []
+    audio_seconds = 0.0
+    offsets: list[float] = []
+    windows: list[np.ndarray] = []
+
+    def flush() -> None:
+        for offset, results in zip(offsets, analyzer.run_batch(windows), strict=True):
+            rows.extend((offset, analyzer.species_name(i), c) for i, c in results)
+        offsets.clear()
+        windows.clear()
+
+    for offset, window in iter_windows(path):
+        offsets.append(offset)
+        windows.append(window)
+        audio_seconds = offset + INPUT_SAMPLES / SAMPLE_RATE
+        if len(windows) >= batch_size:
+            flush()
+    if windows:
+        flush()
+    return path, rows, audio_seconds
+
+
+def _done_path(out_path: Path) -> Path:
+    return out_path.with_name(out_path.name + ".done")
+
+
+def analyze_archive(
+    root: str | Path,
+    out_path: str | Path,
+    model_dir: str | Path,
+    *,
+    confidence_threshold: float = 0.7,
+    jobs: int | None = None,
+    batch_size: int = 8,
+    resume: bool = True,
+) -> int:
+    """
+    Analyse every WAV/FLAC file under root and append detections to a CSV.
+
+    Rows are (file, offset_s, species, confidence). Files run in a process
+    pool of `jobs` workers (default: CPU count), each owning one
+    BirdNETAnalyzer with one interpreter thread; jobs=1 runs in-process
+    with the default thread count. Completed files are listed (as resolved
+    paths) in ``<out_path>.done``, and with resume=True those files are
+    skipped, so an interrupted run picks up where it left off. A file that
+    cannot be read or analysed is reported and left out of ``.done``; the
+    run carries on. Prints throughput in audio seconds per wall second;
+    returns the number of files analysed.
+    """
+    out_path = Path(out_path)
+    done_path = _done_path(out_path)
+    done: set[str] = set()
+    if resume and done_path.is_file():
+        lines = done_path.read_text(encoding="utf-8").splitlines()
+        done = {str(Path(line).resolve()) for line in lines if line}
+    files = [str(p) for p in find_audio_files(root) if str(p.resolve()) not in done]
+    if not files:
+        print(f"Nothing to analyse ({len(done)} files already done)")
+        return 0
+    jobs = jobs or os.cpu_count() or 1
+    write_header = not (resume and out_path.is_file())
+    start = time.perf_counter()
+    total_audio = 0.0
+    analysed = failed = 0
+    with (
+        open(out_path, "a" if resume else "w", newline="", encoding="utf-8") as out,
+        open(done_path, "a" if resume else "w", encoding="utf-8") as done_file,
+    ):
+        writer = csv.writer(out)
+        if write_header:
+            writer.writerow(CSV_HEADER)
+
+        def record(
+            path: str, rows: list[tuple[float, str, float]], seconds: float
+        ) -> None:
+            nonlocal total_audio, analysed
+            writer.writerows((path, f"{o:.3f}", s, f"{c:.4f}") for o, s, c in rows)
+            out.flush()
+            done_file.write(str(Path(path).resolve()) + "\n")
+            done_file.flush()
+            total_audio += seconds
+            analysed += 1
+            elapsed = max(time.perf_counter() - start, 1e-9)
+            print(
+                f"[{analysed + failed}/{len(files)}] {path}: {len(rows)} detections; "
+                f"{total_audio / elapsed:.1f} audio-s/s"
+            )
+
+        def skip(path: str, error: Exception) -> None:
+            nonlocal failed
+            failed += 1
+            print(
+                f"[{analysed + failed}/{len(files)}] {path}: skipped "
+                f"({type(error).__name__}: {error})",
+                file=sys.stderr,
+            )
+
+        if jobs == 1:
+            _init_worker(str(model_dir), confidence_threshold, batch_size)
+            for path in files:
+                try:
+                    result = _analyze_file(path, batch_size)
+                except Exception as e:
+                    skip(path, e)
+                else:
+                    record(*result)
+        else:
+            with ProcessPoolExecutor(
+                max_workers=jobs,
+                initializer=_init_worker,
+                # One interpreter thread per worker: jobs already fill the cores
+                initargs=(str(model_dir), confidence_threshold, batch_size, 1),
+            ) as pool:
+                futures = {pool.submit(_analyze_file, p, batch_size): p for p in files}
+                for future in as_completed(futures):
+                    try:
+                        result = future.result()
+                    except BrokenProcessPool:
+                        raise
+                    except Exception as e:
+                        skip(futures[future], e)
+                    else:
+                        record(*result)
+    elapsed = time.perf_counter() - start
+    print(
+        f"Analysed {analysed} files, {total_audio:.0f} s of audio in {elapsed:.1f} s "
+        f"({total_audio / max(elapsed, 1e-9):.1f}x real time)"
+        + (f"; {failed} files skipped" if failed else "")
+    )
+    return analysed
+
+
+def main_analyze(argv: list[str] | None = None) -> int:
+    """Entry point for ``birdwatch analyze``."""
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog="birdwatch analyze",
+        description="Run BirdNET over WAV/FLAC recordings and write detections to CSV.",
+    )
+    parser.add_argument("root", help="directory (searched recursively) or audio file")
+    parser.add_argument("-o", "--out", default="detections.csv", help="output CSV path")
+    parser.add_argument(
+        "--model-dir",
+        default=os.environ.get("BIRDNET_MODEL_DIR"),
+        help="BirdNET model directory (default: $BIRDNET_MODEL_DIR)",
+    )
+    parser.add_argument(
+        "--confidence",
+        type=float,
+        default=float(os.environ.get("BIRDNET_CONFIDENCE", "0.7")),
+    )
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="worker processes")
+    parser.add_argument("--batch-size", type=int, default=8, help="windows per invoke")
+    parser.add_argument(
+        "--no-resume", action="store_true", help="reanalyse all files, overwrite output"
+    )
+    args = parser.parse_args(argv)
+    if not args.model_dir:
+        print("Set --model-dir or BIRDNET_MODEL_DIR")
+        return 1
+    analyze_archive(
+        args.root,
+        args.out,
+        args.model_dir,
+        confidence_threshold=args.confidence,
+        jobs=args.jobs,
+        batch_size=args.batch_size,
+        resume=not args.no_resume,
+    )
+    return 0
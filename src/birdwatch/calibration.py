@@ -0,0 +1,352 @@
+"""
+On-device model calibration: pick the BirdNET variant and interpreter thread
+count that keep up on this board, and cache the choice in a JSON profile.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import platform
+import statistics
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+import numpy as np
+
+from birdwatch.analyzer import (
+    INPUT_SAMPLES,
+    MODEL_VARIANTS,
+    BirdNETAnalyzer,
+    find_model_variants,
+    frame_aligned_hop,
+)
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+_log = logging.getLogger(__name__)
+
+PROFILE_NAME = "model_profile.json"
+
+
+@dataclass
+class ModelProfile:
+    """
+    A calibrated choice: variant and num_threads for BirdNETAnalyzer, the
+    seconds per window they measured and the resulting real-time factor
+    (seconds per window / seconds of audio per window). key records what
+    the measurement depends on; measured holds every "variant/threads"
+    pair timed.
+    """
+
+    variant: str
+    num_threads: int
+    seconds_per_window: float
+    rtf: float
+    key: dict[str, Any] = field(default_factory=dict)
+    measured: dict[str, float] = field(default_factory=dict)
+
+
+def _device_model() -> str:
+    """Board name (e.g. "Raspberry Pi 5 Model B Rev 1.0"), else the CPU."""
+    try:
+        with open("/proc/device-tree/model", encoding="ascii") as f:
+            return f.read().rstrip("\x00\n")
+    except OSError:
+        return platform.processor() or platform.machine()
+
+
+def thread_counts(cpus: int | None = None) -> list[int]:
+    """1, 2, 4, ... up to the CPU count (which is always included)."""
+    cpus = cpus or os.cpu_count() or 1
+    counts = [1]
+    while counts[-1] * 2 < cpus:
+        counts.append(counts[-1] * 2)
+    if counts[-1] != cpus:
+        counts.append(cpus)
+    return counts
+
+
+def pipeline_settings(
+    hop_seconds: float,
+    *,
+    workers: int = 1,
+    channels: int = 1,
+    tflite_threads: int | None = None,
+    streaming_mel: bool = False,
+) -> tuple[list[int] | None, float]:
+    """
+    (threads, budget_seconds) to calibrate with for a Pi pipeline with these
+    settings, so that its profile key matches what `birdwatch calibrate`
+    writes. Parallel workers run one thread each and a fixed count is not
+    searched (threads None: thread_counts()). The budget is the audio time
+    one worker has per window.
+    """
+    if streaming_mel:
+        hop_seconds = frame_aligned_hop(hop_seconds)
+    threads = [tflite_threads or 1] if tflite_threads or workers > 1 else None
+    return threads, hop_seconds * workers / channels
+
+
+def _profile_key(
+    found: dict[str, Path],
+    threads: Sequence[int],
+    budget_seconds: float,
+    target_rtf: float,
+    xnnpack: bool,
+) -> dict[str, Any]:
+    return {
+        "device": _device_model(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "models": {v: path.stat().st_size for v, path in found.items()},
+        "threads": list(threads),
+        "budget_seconds": budget_seconds,
+        "target_rtf": target_rtf,
+        "xnnpack": xnnpack,
+    }
+
+
+def _candidates(
+    model_dir: str | Path, variants: Sequence[str] | None
+) -> dict[str, Path]:
+    found = find_model_variants(model_dir)
+    if variants is not None:
+        unknown = [v for v in variants if v not in MODEL_VARIANTS]
+        if unknown:
+            raise ValueError(f"Unknown model variants: {', '.join(unknown)}")
+        found = {v: p for v, p in found.items() if v in variants}
+    if not found:
+        raise FileNotFoundError(f"No BirdNET model variants in {model_dir}")
+    return found
+
+
+def calibrate(
+    model_dir: str | Path,
+    *,
+    variants: Sequence[str] | None = None,
+    threads: Sequence[int] | None = None,
+    budget_seconds: float = 3.0,
+    target_rtf: float = 0.5,
+    windows: int = 3,
+    xnnpack: bool = True,
+    exhaustive: bool = False,
+) -> ModelProfile:
+    """
+    Time BirdNETAnalyzer.run on a noise window for the variants in
+    model_dir (or those listed) and thread counts (default: thread_counts()).
+
+    A pair's real-time factor is its run time over budget_seconds, the
+    audio time one analysis may take (the hop; more with parallel workers,
+    less with several channels). Variants are tried most accurate first and
+    thread counts fewest first, and the first pair at or below target_rtf
+    is chosen; unless exhaustive, nothing after it is timed. If no pair
+    meets the target, the fastest is chosen. Each pair gets one warm-up
+    run, then the median of windows runs is taken.
+    """
+    found = _candidates(model_dir, variants)
+    threads = list(threads or thread_counts())
+    window = np.random.default_rng(0).normal(0, 0.1, INPUT_SAMPLES)
+    window = window.astype(np.float32)
+    budget = target_rtf * budget_seconds
+    measured: dict[tuple[str, int], float] = {}
+    for variant, n in [(v, n) for v in found for n in threads]:
+        analyzer = BirdNETAnalyzer(
+            model_dir, variant=variant, num_threads=n, xnnpack=xnnpack
+        )
+        analyzer.run(window)
+        times = []
+        for _ in range(windows):
+            start = time.perf_counter()
+            analyzer.run(window)
+            times.append(time.perf_counter() - start)
+        measured[variant, n] = statistics.median(times)
+        _log.info(
+            "Calibration: %s with %d threads: %.3f s per window",
+            variant,
+            n,
+            measured[variant, n],
+        )
+        if not exhaustive and measured[variant, n] <= budget:
+            break
+    fits = [p for p, sec in measured.items() if sec <= budget]
+    if fits:
+        variant, n = fits[0]
+    else:
+        variant, n = min(measured, key=measured.__getitem__)
+        _log.warning(
+            "No model variant meets real-time factor %.2f; using the fastest (%s, %d threads)",
+            target_rtf,
+            variant,
+            n,
+        )
+    seconds = measured[variant, n]
+    return ModelProfile(
+        variant=variant,
+        num_threads=n,
+        seconds_per_window=seconds,
+        rtf=seconds / budget_seconds,
+        key=_profile_key(found, threads, budget_seconds, target_rtf, xnnpack),
+        measured={f"{v}/{t}": sec for (v, t), sec in measured.items()},
+    )
+
+
+def load_profile(path: str | Path) -> ModelProfile | None:
+    """Read a cached profile; None if missing or unreadable."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            return ModelProfile(**json.load(f))
+    except (OSError, ValueError, TypeError) as e:
+        if not isinstance(e, FileNotFoundError):
+            _log.warning("Ignoring model profile %s: %s", path, e)
+        return None
+
+
+def save_profile(profile: ModelProfile, path: str | Path) -> None:
+    """Write profile as JSON atomically."""
+    path = Path(path)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(asdict(profile), indent=2) + "\n", encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def select_model(
+    model_dir: str | Path,
+    profile_path: str | Path | None = None,
+    *,
+    variants: Sequence[str] | None = None,
+    threads: Sequence[int] | None = None,
+    budget_seconds: float = 3.0,
+    target_rtf: float = 0.5,
+    xnnpack: bool = True,
+) -> ModelProfile:
+    """
+    Return the profile cached at profile_path (default: model_profile.json
+    in model_dir) if it was measured on this board for the same model files
+    and settings; otherwise calibrate() and cache the result. A profile
+    that cannot be written is only logged.
+    """
+    path = Path(profile_path or Path(model_dir) / PROFILE_NAME)
+    threads = list(threads or thread_counts())
+    key = _profile_key(
+        _candidates(model_dir, variants), threads, budget_seconds, target_rtf, xnnpack
+    )
+    profile = load_profile(path)
+    if profile is not None and profile.key == key:
+        return profile
+    profile = calibrate(
+        model_dir,
+        variants=variants,
+        threads=threads,
+        budget_seconds=budget_seconds,
+        target_rtf=target_rtf,
+        xnnpack=xnnpack,
+    )
+    try:
+        save_profile(profile, path)
+    except OSError as e:
+        _log.warning("Could not cache model profile at %s: %s", path, e)
+    return profile
+
+
+def main_calibrate(argv: list[str] | None = None) -> int:
+    """``birdwatch calibrate``: re-run calibration and rewrite the profile."""
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog="birdwatch calibrate",
+        description="Time each BirdNET model variant and thread count on this board.",
+    )
+    parser.add_argument(
+        "model_dir",
+        nargs="?",
+        default=os.environ.get("BIRDNET_MODEL_DIR"),
+        help="model directory (default: BIRDNET_MODEL_DIR)",
+    )
+    parser.add_argument(
+        "--target-rtf",
+        type=float,
+        default=float(os.environ.get("BIRDNET_TARGET_RTF", "0.5")),
+        help="max seconds of analysis per second of audio (default 0.5)",
+    )
+    # The pipeline's settings, from the same environment, so the profile
+    # written here is the one it looks up
+    env = os.environ.get
+    parser.add_argument(
+        "--hop",
+        type=float,
+        default=float(env("BIRDNET_HOP_SECONDS", "3.0")),
+        help="seconds of audio per window (default 3)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=int(env("BIRDNET_ANALYZER_WORKERS", "1")),
+        help="analyzer workers (default 1)",
+    )
+    parser.add_argument(
+        "--channels",
+        type=int,
+        default=int(env("BIRDNET_CHANNELS", "1")),
+        help="channels analysed (default 1)",
+    )
+    parser.add_argument(
+        "--threads",
+        type=int,
+        default=int(env("BIRDNET_TFLITE_THREADS") or 0) or None,
+        help="fixed interpreter thread count (default: search)",
+    )
+    parser.add_argument(
+        "--streaming-mel",
+        action="store_true",
+        default=env("BIRDNET_STREAMING_MEL", "0") == "1",
+        help="hop aligned to the streaming front end's frames",
+    )
+    parser.add_argument(
+        "--no-xnnpack",
+        dest="xnnpack",
+        action="store_false",
+        default=env("BIRDNET_XNNPACK", "1") == "1",
+        help="time without the XNNPACK delegate",
+    )
+    parser.add_argument(
+        "--all", action="store_true", help="time every pair, not just until one fits"
+    )
+    parser.add_argument(
+        "-o",
+        "--profile",
+        default=env("BIRDNET_MODEL_PROFILE"),
+        help="profile path to write",
+    )
+    args = parser.parse_args(argv)
+    if not args.model_dir:
+        parser.error("pass a model directory or set BIRDNET_MODEL_DIR")
+    threads, budget = pipeline_settings(
+        args.hop,
+        workers=args.workers,
+        channels=args.channels,
+        tflite_threads=args.threads,
+        streaming_mel=args.streaming_mel,
+    )
+    profile = calibrate(
+        args.model_dir,
+        threads=threads,
+        budget_seconds=budget,
+        target_rtf=args.target_rtf,
+        xnnpack=args.xnnpack,
+        exhaustive=args.all,
+    )
+    for pair, seconds in profile.measured.items():
+        print(f"{pair:12s} {seconds * 1000:9.1f} ms/window  rtf {seconds / budget:.3f}")
+    print(
+        f"Chosen: {profile.variant} with {profile.num_threads} threads "
+        f"(rtf {profile.rtf:.3f}, target {args.target_rtf})"
+    )
+    path = Path(args.profile or Path(args.model_dir) / PROFILE_NAME)
+    save_profile(profile, path)
+    print(f"Wrote {path}")
+    return 0
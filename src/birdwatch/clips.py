@@ -0,0 +1,437 @@
+"""Detection audio clips: capture ring, encoder worker, bounded on-disk store and uploads."""
+
+from __future__ import annotations
+
+import http.client
+import importlib.util
+import io
+import logging
+import queue
+import threading
+import wave
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING
+from urllib.parse import urlsplit
+
+import numpy as np
+
+from birdwatch.analyzer import SAMPLE_RATE
+from birdwatch.metrics import REGISTRY
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from birdwatch.mqtt_client import DetectionPayload
+
+_log = logging.getLogger(__name__)
+
+CLIP_FORMATS = ("flac", "wav")
+_CONTENT_TYPES = {"flac": "audio/flac", "wav": "audio/wav"}
+
+_clips_written = REGISTRY.counter("birdwatch_clips_written_total", "Clips encoded")
+_clips_dropped = REGISTRY.counter(
+    "birdwatch_clips_dropped_total", "Detections published without a clip"
+)
+_clips_uploaded = REGISTRY.counter("birdwatch_clips_uploaded_total", "Clips uploaded")
+_clips_evicted = REGISTRY.counter(
+    "birdwatch_clips_evicted_total", "Clips evicted by the store's size cap"
+)
+
+
+class ClipRing:
+    """
+    The last `seconds` of raw input, all channels, for cutting clips with
+    pre/post roll around a window.
+
+    write() is called by the audio callback with each block; read() runs on
+    other threads without a lock and returns None if the writer may have
+    overwritten part of the requested span meanwhile (the newest second of
+    capacity is kept as a margin for that).
+    """
+
+    def __init__(
+        self, seconds: float, channels: int = 1, sample_rate: int = SAMPLE_RATE
+    ) -> None:
+        self.sample_rate = sample_rate
+        self.capacity = int(seconds * sample_rate)
+        self._margin = sample_rate
+        if self.capacity <= self._margin:
+            raise ValueError("clip ring must hold more than 1 s")
+        self._buf = np.zeros((self.capacity, channels), dtype=np.float32)
+        self.total_samples = 0  # samples written per channel since start
+
+    def write(self, block: np.ndarray) -> None:
+        """Append a (frames, channels) or 1-D block."""
+        if block.ndim == 1:
+            block = block[:, np.newaxis]
+        n = block.shape[0]
+        cap = self.capacity
+        if n >= cap:
+            start = (self.total_samples + n - cap) % cap
+            self._buf[start:] = block[n - cap : n - start]
+            self._buf[:start] = block[n - start :]
+        else:
+            start = self.total_samples % cap
+            k = min(n, cap - start)
+            self._buf[start : start + k] = block[:k]
+            self._buf[: n - k] = block[k:]
+        # Publish the new position only after the samples are in place
+        self.total_samples += n
+
+    def read(self, end_sample: int, n: int, channel: int = 0) -> np.ndarray | None:
+        """
+        Copy of channel's samples [end_sample - n, end_sample) of the stream,
+        trimmed to what has been captured; None if they are no longer held.
+        """
+        written = self.total_samples
+        start = max(0, end_sample - n)
+        end = min(end_sample, written)
+        if end <= start or written - start > self.capacity - self._margin:
+            return None
+        cap = self.capacity
+        a, b = start % cap, end % cap
+        col = self._buf[:, channel]
+        out = col[a:b].copy() if a < b else np.concatenate([col[a:], col[:b]])
+        if self.total_samples - start > self.capacity - self._margin:
+            return None  # overwritten while copying
+        return out
+
+
+def clip_format(fmt: str) -> str:
+    """The format encode_clip writes for fmt: WAV for FLAC without soundfile."""
+    if fmt not in CLIP_FORMATS:
+        raise ValueError(f"fmt must be one of {', '.join(CLIP_FORMATS)}")
+    if fmt == "flac" and importlib.util.find_spec("soundfile") is None:
+        return "wav"
+    return fmt
+
+
+def encode_clip(
+    audio: np.ndarray, fmt: str = "flac", sample_rate: int = SAMPLE_RATE
+) -> bytes:
+    """
+    Encode mono float32 audio as 16-bit FLAC (needs soundfile) or WAV. FLAC
+    falls back to WAV when soundfile is not installed; clip_format(fmt)
+    says which one is written.
+    """
+    fmt = clip_format(fmt)
+    pcm = (np.clip(audio, -1.0, 1.0) * 32767.0).astype("<i2")
+    out = io.BytesIO()
+    if fmt == "flac":
+        import soundfile as sf
+
+        sf.write(out, pcm, sample_rate, format="FLAC", subtype="PCM_16")
+        return out.getvalue()
+    with wave.open(out, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(sample_rate)
+        w.writeframes(pcm.tobytes())
+    return out.getvalue()
+
+
+class ClipStore:
+    """
+    Directory of encoded clips capped at max_bytes.
+
+    New clips go to pending/ and move to uploaded/ once uploaded. Past the
+    cap the least recently used clips are deleted, uploaded ones first.
+    With keep_pending, clips not yet uploaded are never deleted (their URL
+    has been published); add() refuses a clip that only they leave no room
+    for. The index is rebuilt from the directory (by mtime) on start, so
+    clips not yet uploaded survive a restart. Thread-safe.
+    """
+
+    def __init__(
+        self,
+        root: str | Path,
+        max_bytes: int = 200_000_000,
+        *,
+        keep_pending: bool = False,
+    ) -> None:
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.keep_pending = keep_pending
+        self.pending_dir = self.root / "pending"
+        self.uploaded_dir = self.root / "uploaded"
+        self.pending_dir.mkdir(parents=True, exist_ok=True)
+        self.uploaded_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        # Least recently used first
+        self._files: OrderedDict[Path, int] = OrderedDict()
+        found = [
+            (p.stat().st_mtime, p)
+            for d in (self.pending_dir, self.uploaded_dir)
+            for p in d.iterdir()
+            if p.is_file() and not p.name.endswith(".tmp")
+        ]
+        for _mtime, p in sorted(found):
+            self._files[p] = p.stat().st_size
+        self.size_bytes = sum(self._files.values())
+        with self._lock:
+            self._evict()
+
+    def __len__(self) -> int:
+        return len(self._files)
+
+    def unique_name(self, stem: str, suffix: str) -> str:
+        """stem + suffix, or stem-2 + suffix etc. if a clip has that name already."""
+        with self._lock:
+            taken = {p.name for p in self._files}
+        name, n = stem + suffix, 1
+        while name in taken:
+            n += 1
+            name = f"{stem}-{n}{suffix}"
+        return name
+
+    def add(self, name: str, data: bytes) -> Path:
+        """
+        Store data as pending/name (atomically); evict past the cap. Raises
+        OSError if keep_pending and pending clips leave no room.
+        """
+        if self.keep_pending:
+            with self._lock:
+                pending = sum(
+                    n for p, n in self._files.items() if p.parent == self.pending_dir
+                )
+            if pending + len(data) > self.max_bytes:
+                raise OSError(f"clip store full: {pending} bytes not yet uploaded")
+        path = self.pending_dir / name
+        tmp = path.with_name(name + ".tmp")
+        tmp.write_bytes(data)
+        tmp.replace(path)
+        with self._lock:
+            self.size_bytes += len(data) - self._files.pop(path, 0)
+            self._files[path] = len(data)
+            self._evict()
+        return path
+
+    def pending(self, limit: int | None = None) -> list[Path]:
+        """Clips not yet uploaded, oldest first."""
+        with self._lock:
+            paths = [p for p in self._files if p.parent == self.pending_dir]
+        return paths[:limit]
+
+    def mark_uploaded(self, path: Path) -> Path:
+        """Move a pending clip to uploaded/ and mark it most recently used."""
+        dest = self.uploaded_dir / path.name
+        with self._lock:
+            size = self._files.pop(path, None)
+            if size is None:
+                return dest  # evicted meanwhile
+            path.replace(dest)
+            self._files[dest] = size
+        return dest
+
+    def _evict(self) -> None:
+        """Drop LRU clips (uploaded first) until under max_bytes. Holds _lock."""
+        while self.size_bytes > self.max_bytes and len(self._files) > 1:
+            victim = next(
+                (p for p in self._files if p.parent == self.uploaded_dir), None
+            )
+            if victim is None:
+                if self.keep_pending:
+                    return
+                victim = next(iter(self._files))
+            self.size_bytes -= self._files.pop(victim)
+            victim.unlink(missing_ok=True)
+            _clips_evicted.inc()
+            if victim.parent == self.pending_dir:
+                _log.warning("Evicted clip %s before it was uploaded", victim.name)
+
+
+class HttpClipUploader:
+    """
+    PUT clips to base_url/key over one HTTP(S) connection per batch, e.g.
+    an S3 bucket or an upload proxy; the clip's URL is base_url/key.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        timeout: float = 30.0,
+        headers: dict[str, str] | None = None,
+    ) -> None:
+        parts = urlsplit(base_url.rstrip("/"))
+        if parts.scheme not in ("http", "https") or not parts.netloc:
+            raise ValueError(f"clip upload URL must be http(s)://host/...: {base_url}")
+        self.base_url = base_url.rstrip("/")
+        self._https = parts.scheme == "https"
+        self._host = parts.netloc
+        self._prefix = parts.path
+        self.timeout = timeout
+        self.headers = headers or {}
+
+    def url_for(self, key: str) -> str:
+        return f"{self.base_url}/{key}"
+
+    def upload_batch(self, items: list[tuple[Path, str]]) -> int:
+        """
+        PUT each (path, key) in order; return how many succeeded before the
+        first failure (the rest are retried with the next batch).
+        """
+        cls = http.client.HTTPSConnection if self._https else http.client.HTTPConnection
+        conn = cls(self._host, timeout=self.timeout)
+        done = 0
+        try:
+            for path, key in items:
+                body = path.read_bytes()
+                ctype = _CONTENT_TYPES.get(
+                    path.suffix.lstrip("."), "application/octet-stream"
+                )
+                conn.request(
+                    "PUT",
+                    f"{self._prefix}/{key}",
+                    body=body,
+                    headers={"Content-Type": ctype, **self.headers},
+                )
+                resp = conn.getresponse()
+                resp.read()
+                if resp.status >= 300:
+                    raise OSError(f"HTTP {resp.status} {resp.reason}")
+                done += 1
+        except (OSError, http.client.HTTPException) as e:
+            _log.info("Clip upload stopped after %d of %d: %s", done, len(items), e)
+        finally:
+            conn.close()
+        return done
+
+
+def _clip_stamp(timestamp: str) -> str:
+    """ISO timestamp as a file-name stamp to the millisecond (2025-05-01T060003.250)."""
+    try:
+        t = datetime.fromisoformat(timestamp)
+    except ValueError:
+        return timestamp[:19].replace(":", "")
+    return f"{t:%Y-%m-%dT%H%M%S}.{t.microsecond // 1000:03d}"
+
+
+def clip_key(device_id: str, name: str) -> str:
+    """Object key for a clip; matches the cloud storage's audio/* path."""
+    return f"audio/{device_id}/{name}"
+
+
+class ClipWriter:
+    """
+    Encode detection clips off the analysis path and publish their payloads.
+
+    submit() only queues (payload, audio) and returns False when
+    max_pending clips are already waiting, so the caller can publish
+    without a clip instead of stalling. The encoder thread writes each clip
+    to the store, sets payload.audio_url to where the uploader will put it
+    (if there is one) and hands the payload to publish. The upload thread
+    sends pending clips in batches every upload_interval_sec; a failed
+    batch (e.g. while offline) is retried on the next round. With an
+    uploader the store should keep_pending, so that every published URL is
+    eventually uploaded; a clip the store refuses is published without one.
+    """
+
+    def __init__(
+        self,
+        store: ClipStore,
+        device_id: str,
+        publish: Callable[[DetectionPayload], object],
+        *,
+        uploader: HttpClipUploader | None = None,
+        fmt: str = "flac",
+        max_pending: int = 8,
+        upload_batch_size: int = 20,
+        upload_interval_sec: float = 60.0,
+    ) -> None:
+        if max_pending < 1:
+            raise ValueError("max_pending must be >= 1")
+        self.store = store
+        self.device_id = device_id
+        self.publish = publish
+        self.uploader = uploader
+        # Named and uploaded as what is actually written
+        self.fmt = clip_format(fmt)
+        if self.fmt != fmt:
+            _log.warning("soundfile not installed; writing WAV clips instead of FLAC")
+        self.upload_batch_size = upload_batch_size
+        self.upload_interval_sec = upload_interval_sec
+        self._queue: queue.Queue[tuple[DetectionPayload, np.ndarray] | None] = (
+            queue.Queue(maxsize=max_pending)
+        )
+        self._stop = threading.Event()
+        REGISTRY.gauge(
+            "birdwatch_clip_store_bytes",
+            "Bytes of clips on disk",
+            lambda: store.size_bytes,
+        )
+        REGISTRY.gauge(
+            "birdwatch_clips_pending_upload",
+            "Clips waiting for upload",
+            lambda: len(store.pending()),
+        )
+        self._encoder = threading.Thread(
+            target=self._encode_loop, name="birdwatch-clips", daemon=True
+        )
+        self._encoder.start()
+        self._uploader_thread: threading.Thread | None = None
+        if uploader is not None:
+            self._uploader_thread = threading.Thread(
+                target=self._upload_loop, name="birdwatch-clip-upload", daemon=True
+            )
+            self._uploader_thread.start()
+
+    def submit(self, payload: DetectionPayload, audio: np.ndarray) -> bool:
+        """Queue a clip for payload; False (nothing queued) if the encoder is behind."""
+        try:
+            self._queue.put_nowait((payload, audio))
+        except queue.Full:
+            _clips_dropped.inc()
+            return False
+        return True
+
+    def _encode_loop(self) -> None:
+        while (item := self._queue.get()) is not None:
+            payload, audio = item
+            try:
+                name = self.store.unique_name(
+                    f"{_clip_stamp(payload.timestamp)}"
+                    f"_{payload.species_code}_ch{payload.channel}",
+                    f".{self.fmt}",
+                )
+                self.store.add(name, encode_clip(audio, self.fmt))
+                _clips_written.inc()
+                if self.uploader is not None:
+                    payload.audio_url = self.uploader.url_for(
+                        clip_key(self.device_id, name)
+                    )
+            except Exception:
+                _clips_dropped.inc()
+                _log.exception("Writing clip for %s failed", payload.species_code)
+            try:
+                self.publish(payload)
+            except Exception:
+                _log.exception("Publishing %s failed", payload.species_code)
+
+    def upload_pending(self) -> int:
+        """Upload one batch of pending clips; return how many were uploaded."""
+        if self.uploader is None:
+            return 0
+        paths = self.store.pending(self.upload_batch_size)
+        if not paths:
+            return 0
+        items = [(p, clip_key(self.device_id, p.name)) for p in paths]
+        done = self.uploader.upload_batch(items)
+        for path in paths[:done]:
+            self.store.mark_uploaded(path)
+        _clips_uploaded.inc(done)
+        return done
+
+    def _upload_loop(self) -> None:
+        while not self._stop.wait(self.upload_interval_sec):
+            try:
+                self.upload_pending()
+            except Exception:
+                _log.exception("Clip upload failed")
+
+    def close(self) -> None:
+        """Encode and publish the clips still queued; stop uploading."""
+        self._stop.set()
+        self._queue.put(None)
+        self._encoder.join()
@@ -0,0 +1,134 @@
+"""Merge per-window detections into per-species events before publishing."""
+
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+
+@dataclass
+class DetectionEvent:
+    """Consecutive windows in which one species was detected on one channel."""
+
+    species_index: int
+    start: float  # epoch seconds, start of the first window
+    end: float  # epoch seconds, end of the last window
+    peak_confidence: float
+    confidence_sum: float
+    window_count: int
+    channel: int = 0  # input channel (microphone) the windows came from
+    peak_end: float = 0.0  # epoch seconds, end of the highest-confidence window
+
+    @property
+    def mean_confidence(self) -> float:
+        """Mean confidence over the event's windows."""
+        return self.confidence_sum / self.window_count
+
+
+class DetectionAggregator:
+    """
+    Debounce per-window hits into one DetectionEvent per species and channel.
+
+    add() extends the species' open event, or opens one. An event is emitted
+    through on_event once no hit has arrived for gap_timeout_sec (checked by
+    flush(), which the flush timer calls every flush_interval_sec) or when
+    extending it would make it longer than max_event_sec. on_event runs
+    without the aggregator's lock held, on the caller's or the timer's
+    thread.
+    """
+
+    def __init__(
+        self,
+        on_event: Callable[[DetectionEvent], None],
+        *,
+        gap_timeout_sec: float = 6.0,
+        max_event_sec: float = 60.0,
+        window_sec: float = 3.0,
+        flush_interval_sec: float = 1.0,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.on_event = on_event
+        self.gap_timeout_sec = gap_timeout_sec
+        self.max_event_sec = max_event_sec
+        self.window_sec = window_sec
+        self.flush_interval_sec = flush_interval_sec
+        self._clock = clock
+        self._open: dict[tuple[int, int], DetectionEvent] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def add(
+        self,
+        species_index: int,
+        confidence: float,
+        window_end: float,
+        channel: int = 0,
+    ) -> None:
+        """Record a hit for the window ending at window_end (epoch seconds)."""
+        key = (channel, species_index)
+        emit: DetectionEvent | None = None
+        with self._lock:
+            event = self._open.get(key)
+            if event is not None and (
+                window_end - event.end > self.gap_timeout_sec
+                or window_end - event.start > self.max_event_sec
+            ):
+                emit = self._open.pop(key)
+                event = None
+            if event is None:
+                self._open[key] = DetectionEvent(
+                    species_index=species_index,
+                    start=window_end - self.window_sec,
+                    end=window_end,
+                    peak_confidence=confidence,
+                    confidence_sum=confidence,
+                    window_count=1,
+                    channel=channel,
+                    peak_end=window_end,
+                )
+            else:
+                # Pool workers can finish windows out of order
+                event.start = min(event.start, window_end - self.window_sec)
+                event.end = max(event.end, window_end)
+                if confidence > event.peak_confidence:
+                    event.peak_confidence = confidence
+                    event.peak_end = window_end
+                event.confidence_sum += confidence
+                event.window_count += 1
+        if emit is not None:
+            self.on_event(emit)
+
+    def flush(self, now: float | None = None, *, force: bool = False) -> int:
+        """Emit events idle for longer than gap_timeout_sec (all if force); return count."""
+        now = self._clock() if now is None else now
+        with self._lock:
+            done = [
+                k
+                for k, e in self._open.items()
+                if force or now - e.end > self.gap_timeout_sec
+            ]
+            events = [self._open.pop(k) for k in done]
+        for event in sorted(events, key=lambda e: e.start):
+            self.on_event(event)
+        return len(events)
+
+    def start_flush_timer(self) -> threading.Thread:
+        """Start a daemon thread that calls flush() every flush_interval_sec."""
+
+        def run() -> None:
+            while not self._stop.wait(self.flush_interval_sec):
+                self.flush()
+
+        t = threading.Thread(target=run, name="birdwatch-events", daemon=True)
+        t.start()
+        return t
+
+    def close(self) -> None:
+        """Stop the flush timer and emit every open event."""
+        self._stop.set()
+        self.flush(force=True)
@@ -0,0 +1,111 @@
+"""Spectral activity pre-gate: skip BirdNET invokes on windows with nothing bird-like."""
+
+from __future__ import annotations
+
+import math
+import threading
+
+import numpy as np
+
+from birdwatch.analyzer import (
+    FMAX,
+    HOP_LENGTH,
+    N_MELS,
+    SAMPLE_RATE,
+    _hz_to_mel,
+    _mel_to_hz,
+)
+from birdwatch.metrics import REGISTRY
+
+_gate_windows = REGISTRY.counter(
+    "birdwatch_gate_windows_total", "Windows checked by the activity gate"
+)
+_gate_passed = REGISTRY.counter(
+    "birdwatch_gate_passed_total", "Windows the activity gate sent to the model"
+)
+
+
+def _mel_centers() -> np.ndarray:
+    """Centre frequency (Hz) of each BirdNET mel band."""
+    mel_min, mel_max = _hz_to_mel(np.array([0.0, FMAX]))
+    return _mel_to_hz(np.linspace(mel_min, mel_max, N_MELS + 2))[1:-1]
+
+
+class ActivityGate:
+    """
+    Cheap pre-classifier on the log-mel frames computed for the model.
+
+    Looks only at mel bands between fmin and fmax (1–10 kHz: most song).
+    Each band's noise floor is its median over the window, so the floor
+    adapts to every window and steady sound (rain hiss, traffic roar, an
+    insect drone) is discounted. Each frame's median excess over the bands
+    is removed as well, so broadband changes (gusts, rain drops, a passing
+    car) cancel. What is left is narrowband energy standing out from the
+    floor. After smoothing over smooth_sec, a frame is active when some
+    band is min_snr_db above its floor; a window passes when at least
+    min_active_sec of it is active.
+
+    Costs about 0.5 ms per window against a full BirdNET invoke. Calling it
+    counts windows and passes (birdwatch_gate_*_total, pass_rate), so the
+    thresholds can be tuned on a node's own audio; one gate may be shared
+    by the threads of an AnalyzerPool.
+    """
+
+    def __init__(
+        self,
+        min_snr_db: float = 7.0,
+        min_active_sec: float = 0.07,
+        fmin: float = 1_000.0,
+        fmax: float = 10_000.0,
+        smooth_sec: float = 0.03,
+    ) -> None:
+        centers = _mel_centers()
+        bands = np.flatnonzero((centers >= fmin) & (centers <= fmax))
+        if bands.size < 2:
+            raise ValueError(f"fmin..fmax ({fmin}..{fmax} Hz) must span 2+ mel bands")
+        self.min_snr_db = min_snr_db
+        self.min_active_sec = min_active_sec
+        self._bands = slice(int(bands[0]), int(bands[-1]) + 1)
+        frame_sec = HOP_LENGTH / SAMPLE_RATE
+        self._smooth = max(1, round(smooth_sec / frame_sec))
+        self._min_frames = max(1, math.ceil(min_active_sec / frame_sec))
+        # MelFrontend output is natural-log power
+        self._threshold = min_snr_db * math.log(10.0) / 10.0
+        self.windows = 0
+        self.passed = 0
+        self._lock = threading.Lock()
+        REGISTRY.gauge(
+            "birdwatch_gate_pass_rate",
+            "Fraction of windows the activity gate sent to the model",
+            lambda: round(self.pass_rate, 4),
+        )
+
+    @property
+    def pass_rate(self) -> float:
+        """Fraction of checked windows that passed (1.0 before any)."""
+        return self.passed / self.windows if self.windows else 1.0
+
+    def active_frames(self, mel: np.ndarray) -> int:
+        """Frames of mel ((1,) n_mels × frames log-mel) with narrowband activity."""
+        mel = mel.reshape(N_MELS, -1)[self._bands]
+        # Upper medians via partition: np.median is several times slower
+        mid = mel.shape[1] // 2
+        excess = mel - np.partition(mel, mid, axis=1)[:, mid : mid + 1]
+        mid = excess.shape[0] // 2
+        excess -= np.partition(excess, mid, axis=0)[mid]
+        # Average over blocks of k frames
+        k = self._smooth
+        n = excess.shape[1] // k
+        blocks = excess[:, : n * k].reshape(excess.shape[0], n, k).mean(axis=2)
+        return k * int(np.count_nonzero(blocks.max(axis=0) >= self._threshold))
+
+    def __call__(self, mel: np.ndarray) -> bool:
+        """Return True if the window in mel is worth a model invoke."""
+        passed = self.active_frames(mel) >= self._min_frames
+        with self._lock:
+            self.windows += 1
+            _gate_windows.inc()
+            if passed:
+                self.passed += 1
+                _gate_passed.inc()
+        return passed
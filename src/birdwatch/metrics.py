@@ -0,0 +1,330 @@
+"""In-process pipeline metrics: counters, gauges and latency histograms."""
+
+from __future__ import annotations
+
+import json
+import math
+import threading
+import time
+from bisect import bisect_left
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from http.server import ThreadingHTTPServer
+
+# Latency bucket upper bounds in seconds (100 µs .. 10 s)
+LATENCY_BUCKETS = (
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+
+def _finite(value: float) -> float | None:
+    """value, or None (JSON null) for NaN and infinities."""
+    return value if math.isfinite(value) else None
+
+
+def _prom_value(value: float) -> str:
+    """value as Prometheus text spells it (NaN, +Inf, -Inf)."""
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return str(value)
+
+
+class _Metric:
+    """Base for counters and gauges: a stored value, or fn read at export time."""
+
+    def __init__(
+        self, name: str, help: str = "", fn: Callable[[], float] | None = None
+    ) -> None:
+        self.name = name
+        self.help = help
+        self.fn = fn
+        self._value: float = 0
+
+    @property
+    def value(self) -> float:
+        if self.fn is not None:
+            try:
+                return self.fn()
+            except Exception:
+                return float("nan")
+        return self._value
+
+
+class Counter(_Metric):
+    """Monotonic count (e.g. overruns, publishes by outcome)."""
+
+    def inc(self, n: int = 1) -> None:
+        self._value += n
+
+
+class Gauge(_Metric):
+    """Point-in-time value (e.g. queue depth)."""
+
+    def set(self, value: float) -> None:
+        self._value = value
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram. observe() is a bisect and two adds, cheap enough
+    for the audio callback; like the counters it takes no lock (a racing
+    export may see one observation half-applied).
+    """
+
+    def __init__(
+        self, name: str, help: str = "", buckets: tuple[float, ...] = LATENCY_BUCKETS
+    ) -> None:
+        self.name = name
+        self.help = help
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot: above the top bound
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def time(self) -> _Timer:
+        """Context manager that observes the elapsed wall time of its block."""
+        return _Timer(self)
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding quantile q (inf above the top bucket)."""
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip((*self.buckets, float("inf")), self.counts, strict=True):
+            seen += n
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+
+class _Timer:
+    __slots__ = ("_hist", "_start")
+
+    def __init__(self, hist: Histogram) -> None:
+        self._hist = hist
+        self._start = 0.0
+
+    def __enter__(self) -> None:
+        self._start = time.perf_counter()
+
+    def __exit__(self, *exc: object) -> None:
+        self._hist.observe(time.perf_counter() - self._start)
+
+
+class Registry:
+    """Named metrics, created on first use and exported as JSON or Prometheus text."""
+
+    def __init__(self) -> None:
+        self._metrics: dict[str, Counter | Gauge | Histogram] = {}
+        self._lock = threading.Lock()
+        self._absorbed: dict[str, dict[str, Any]] = {}
+        self.started = time.time()
+
+    def _get(self, cls: type, name: str, *args: Any) -> Any:
+        metric = self._metrics.get(name)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.setdefault(name, cls(name, *args))
+        if not isinstance(metric, cls):
+            raise ValueError(
+                f"metric {name!r} already registered as {type(metric).__name__}"
+            )
+        return metric
+
+    def counter(
+        self, name: str, help: str = "", fn: Callable[[], float] | None = None
+    ) -> Counter:
+        """Get or create a counter; passing fn (re)binds the function it reads."""
+        counter: Counter = self._get(Counter, name, help)
+        if fn is not None:
+            counter.fn = fn
+        return counter
+
+    def gauge(
+        self, name: str, help: str = "", fn: Callable[[], float] | None = None
+    ) -> Gauge:
+        """Get or create a gauge; passing fn (re)binds the function it reads."""
+        gauge: Gauge = self._get(Gauge, name, help)
+        if fn is not None:
+            gauge.fn = fn
+        return gauge
+
+    def histogram(
+        self, name: str, help: str = "", buckets: tuple[float, ...] = LATENCY_BUCKETS
+    ) -> Histogram:
+        return self._get(Histogram, name, help, buckets)
+
+    def _items(self) -> list[tuple[str, Counter | Gauge | Histogram]]:
+        with self._lock:
+            return sorted(self._metrics.items())
+
+    def snapshot(self) -> dict[str, Any]:
+        """
+        All metrics as plain values (None where a value is NaN or infinite,
+        e.g. a failing fn); histograms as count/sum/buckets.
+        """
+        out: dict[str, Any] = {}
+        for name, m in self._items():
+            if isinstance(m, Histogram):
+                out[name] = {
+                    "count": m.count,
+                    "sum": m.sum,
+                    "buckets": dict(zip(map(str, m.buckets), m.counts, strict=False)),
+                    "overflow": m.counts[-1],
+                }
+            else:
+                out[name] = _finite(m.value)
+        return out
+
+    def absorb(self, source: str, snapshot: dict[str, Any]) -> None:
+        """
+        Add another process's snapshot() to the counters (names ending in
+        ``_total``) and histograms here; gauges and counters read through fn
+        are left alone. Snapshots are cumulative, so only what grew since
+        source's previous one is added; a count that went down means the
+        process restarted, and is added from zero.
+        """
+        with self._lock:
+            previous = self._absorbed.get(source, {})
+            self._absorbed[source] = snapshot
+        for name, value in snapshot.items():
+            before = previous.get(name)
+            if isinstance(value, dict):
+                hist = self.histogram(name)
+                counts = [*value["buckets"].values(), value["overflow"]]
+                if len(counts) != len(hist.counts):
+                    continue
+                old, old_count, old_sum = [0] * len(counts), 0, 0.0
+                if before is not None and value["count"] >= before["count"]:
+                    old = [*before["buckets"].values(), before["overflow"]]
+                    old_count, old_sum = before["count"], before["sum"]
+                for i, (n, o) in enumerate(zip(counts, old, strict=True)):
+                    hist.counts[i] += n - o
+                hist.count += value["count"] - old_count
+                hist.sum += value["sum"] - old_sum
+            elif (
+                name.endswith("_total")
+                and isinstance(value, int | float)
+                and math.isfinite(value)
+            ):
+                counter = self.counter(name)
+                if counter.fn is None:
+                    grown = value - (before or 0)
+                    counter.inc(grown if grown >= 0 else value)
+
+    def to_json(self) -> str:
+        return json.dumps(self.snapshot(), sort_keys=True, allow_nan=False)
+
+    def to_prometheus(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines: list[str] = []
+        for name, m in self._items():
+            kind = {Counter: "counter", Gauge: "gauge", Histogram: "histogram"}[type(m)]
+            if m.help:
+                lines.append(f"# HELP {name} {m.help}")
+            lines.append(f"# TYPE {name} {kind}")
+            if isinstance(m, Histogram):
+                cumulative = 0
+                for bound, n in zip(m.buckets, m.counts, strict=False):
+                    cumulative += n
+                    lines.append(f'{name}_bucket{{le="{bound}"}} {cumulative}')
+                lines.append(f'{name}_bucket{{le="+Inf"}} {m.count}')
+                lines.append(f"{name}_sum {m.sum}")
+                lines.append(f"{name}_count {m.count}")
+            else:
+                lines.append(f"{name} {_prom_value(m.value)}")
+        return "\n".join(lines) + "\n"
+
+    def health(self) -> dict[str, Any]:
+        """
+        Compact summary for a periodic health message: counters and gauges
+        as-is, histograms as count with p50/p95 in milliseconds. Names lose
+        their ``birdwatch_`` prefix. Values that are NaN or infinite (a
+        quantile above the top bucket) are None, so the result is valid
+        JSON.
+        """
+        out: dict[str, Any] = {"uptime_s": round(time.time() - self.started)}
+        for full_name, m in self._items():
+            name = full_name.removeprefix("birdwatch_")
+            if isinstance(m, Histogram):
+                out[name] = {
+                    "n": m.count,
+                    "p50_ms": _finite(round(m.quantile(0.5) * 1000, 2)),
+                    "p95_ms": _finite(round(m.quantile(0.95) * 1000, 2)),
+                }
+            else:
+                value = m.value
+                out[name] = (
+                    _finite(round(value, 3)) if isinstance(value, float) else value
+                )
+        return out
+
+    def write(self, path: str | Path) -> None:
+        """Write Prometheus text (or JSON if path ends in .json) atomically."""
+        path = Path(path)
+        text = self.to_json() if path.suffix == ".json" else self.to_prometheus()
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.write_text(text, encoding="utf-8")
+        tmp.replace(path)
+
+    def serve(self, port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+        """Serve /metrics (Prometheus) and /metrics.json from a daemon thread."""
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                if self.path == "/metrics.json":
+                    body, ctype = registry.to_json(), "application/json"
+                elif self.path == "/metrics":
+                    body, ctype = registry.to_prometheus(), "text/plain; version=0.0.4"
+                else:
+                    self.send_error(404)
+                    return
+                data = body.encode()
+                self.send_response(200)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args: object) -> None:
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        t = threading.Thread(
+            target=server.serve_forever, name="birdwatch-metrics", daemon=True
+        )
+        t.start()
+        return server
+
+
+# Process-wide registry the pipeline modules record into
+REGISTRY = Registry()
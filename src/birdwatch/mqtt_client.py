@@ -2,30 +2,72 @@
 
 from __future__ import annotations
 
+import asyncio
+import importlib.util
 import json
-import os
-import sqlite3
+import logging
+import random
 import threading
 import time
+from concurrent.futures import FIRST_COMPLETED, Future, wait
 from dataclasses import asdict, dataclass
 from pathlib import Path
-from types import ModuleType
 from typing import Any
 
-
-def _load_mqtt() -> tuple[ModuleType | None, Any]:
+from birdwatch.metrics import REGISTRY
+from birdwatch.offline_cache import OfflineCache
+from birdwatch.wire import (
+    decode_record,
+    encode_record,
+    encode_row,
+    pack_message,
+    record_species,
+    row_record,
+)
+
+# Imported by the first connect(): loading awscrt is a noticeable part of a
+# Pi's cold start, and it can overlap with loading the model
+mqtt_crt: Any = None
+mqtt_connection_builder: Any = None
+
+
+def _load_mqtt() -> None:
+    """Import the AWS IoT SDK into mqtt_crt and mqtt_connection_builder once."""
+    global mqtt_crt, mqtt_connection_builder
+    if mqtt_connection_builder is not None:
+        return
     try:
         from awscrt import mqtt as mqtt_mod
-        from awsiotsdk import mqtt_connection_builder  # type: ignore[import-untyped]
-
-        return mqtt_mod, mqtt_connection_builder
-    except ImportError:
-        return None, None
+        from awsiot import mqtt_connection_builder as builder  # type: ignore[import-untyped]
+    except ImportError as e:
+        raise RuntimeError("awsiotsdk not installed") from e
+    mqtt_crt, mqtt_connection_builder = mqtt_mod, builder
 
 
-mqtt_crt, mqtt_connection_builder = _load_mqtt()
-
 TOPIC = "birdnet/detections"
+# Several detections per message: {"detections": [payload, ...]}
+BATCH_TOPIC = "birdnet/detections/batch"
+# Detections in birdwatch.wire's packed encoding (wire_format="compact")
+COMPACT_TOPIC = "birdnet/detections/compact"
+WIRE_FORMATS = ("json", "compact")
+# Periodic node health summaries (QoS0, never cached)
+HEALTH_TOPIC = "birdnet/health"
+
+_log = logging.getLogger(__name__)
+
+_publish_seconds = REGISTRY.histogram(
+    "birdwatch_publish_seconds", "Detection publish time until PUBACK"
+)
+_published = REGISTRY.counter("birdwatch_published_total", "Detections acknowledged")
+_publish_cached = REGISTRY.counter(
+    "birdwatch_publish_cached_total", "Detections cached because offline"
+)
+_publish_failed = REGISTRY.counter(
+    "birdwatch_publish_failed_total", "Detections cached after a failed publish"
+)
+_cache_flushed = REGISTRY.counter(
+    "birdwatch_cache_flushed_total", "Cached detections delivered by flushes"
+)
 
 
 @dataclass
@@ -42,74 +84,103 @@ class DetectionPayload:
     lon: float | None
     audio_url: str | None
     image_url: str | None
+    # Aggregated events (see birdwatch.events): timestamp is the start,
+    # confidence the peak over window_count windows
+    end_timestamp: str | None = None  # ISO8601
+    mean_confidence: float | None = None
+    window_count: int = 1
+    channel: int = 0  # input channel (microphone) on multi-channel nodes
 
 
-def _default_cache_path() -> Path:
-    return Path(os.environ.get("BIRDNET_OFFLINE_CACHE", "offline_cache.db"))
+@dataclass
+class FlushStats:
+    """Outcome of one MQTTClient.flush_cache() drain."""
 
+    flushed: int = 0  # detections acknowledged and deleted from the cache
+    messages: int = 0  # MQTT publishes acknowledged
+    failed: int = 0  # publishes that failed or timed out (rows kept)
+    dropped: int = 0  # unparseable cached rows deleted
+    seconds: float = 0.0
 
-def _init_db(cache_path: Path) -> None:
-    conn = sqlite3.connect(cache_path)
-    conn.execute(
-        """
-        CREATE TABLE IF NOT EXISTS detections (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            payload TEXT NOT NULL,
-            created_at REAL NOT NULL
-        )
-        """
-    )
-    conn.commit()
-    conn.close()
+    @property
+    def rate(self) -> float:
+        """Detections drained per second."""
+        return self.flushed / self.seconds if self.seconds > 0 else 0.0
 
 
-def _load_cache(cache_path: Path) -> list[tuple[str, float]]:
-    """Return list of (payload_json, created_at)."""
-    conn = sqlite3.connect(cache_path)
-    rows = conn.execute(
-        "SELECT payload, created_at FROM detections ORDER BY id"
-    ).fetchall()
-    conn.close()
-    return rows
+class _RateLimiter:
+    """Pace publishes under a messages/s and bytes/s budget (None = unlimited)."""
 
+    def __init__(
+        self, messages_per_sec: float | None, bytes_per_sec: float | None
+    ) -> None:
+        self.messages_per_sec = messages_per_sec
+        self.bytes_per_sec = bytes_per_sec
+        self._next = time.monotonic()
 
-def _delete_cached(cache_path: Path, created_ats: list[float]) -> None:
-    if not created_ats:
-        return
-    conn = sqlite3.connect(cache_path)
-    placeholders = ",".join("?" * len(created_ats))
-    conn.execute(
-        f"DELETE FROM detections WHERE created_at IN ({placeholders})", created_ats
+    def wait(self, size: int, stop: threading.Event | None = None) -> None:
+        """
+        Block until a message of size bytes may be sent, then book it; stop
+        being set cuts the wait short.
+        """
+        cost = 0.0
+        if self.messages_per_sec:
+            cost = 1.0 / self.messages_per_sec
+        if self.bytes_per_sec:
+            cost = max(cost, size / self.bytes_per_sec)
+        if cost == 0.0:
+            return
+        now = time.monotonic()
+        if self._next > now:
+            if stop is None:
+                time.sleep(self._next - now)
+            else:
+                stop.wait(self._next - now)
+            now = self._next
+        self._next = now + cost
+
+
+def _publish_async(conn: Any, topic: str, body: str | bytes, qos: Any = None) -> Future:
+    """Publish (QoS1 unless qos given); return the future that completes on PUBACK."""
+    assert mqtt_crt is not None
+    future, _packet_id = conn.publish(
+        topic=topic, payload=body, qos=qos or mqtt_crt.QoS.AT_LEAST_ONCE
     )
-    conn.commit()
-    conn.close()
+    return future
 
 
-def _append_cache(cache_path: Path, payload: DetectionPayload) -> None:
-    conn = sqlite3.connect(cache_path)
-    conn.execute(
-        "INSERT INTO detections (payload, created_at) VALUES (?, ?)",
-        (json.dumps(asdict(payload)), time.time()),
-    )
-    conn.commit()
-    conn.close()
+class _Backoff:
+    """Exponential reconnect delays with full jitter: uniform(0, min(cap, base * 2**n))."""
 
+    def __init__(self, base: float = 1.0, cap: float = 300.0) -> None:
+        self.base = base
+        self.cap = cap
+        self.attempts = 0
 
-def _is_connected() -> bool:
-    """Simple connectivity check (e.g. try DNS or a lightweight request)."""
-    import socket
+    def next_delay(self) -> float:
+        """Delay before the next attempt; each call doubles the ceiling."""
+        ceiling = min(self.cap, self.base * 2 ** min(self.attempts, 32))
+        self.attempts += 1
+        return random.uniform(0.0, ceiling)
 
-    try:
-        socket.create_connection(("8.8.8.8", 53), timeout=2)
-        return True
-    except OSError:
-        return False
+    def reset(self) -> None:
+        self.attempts = 0
 
 
 class MQTTClient:
     """
     Publish Detection payloads to AWS IoT Core (birdnet/detections).
     Uses mTLS (cert/key). Offline cache and watchdog thread to flush when online.
+
+    Online/offline state follows the connection's interrupted/resumed
+    callbacks, so publish() caches immediately while offline instead of
+    waiting on the network. Once connected, awscrt resumes the session
+    itself; until the first connect succeeds the watchdog retries with
+    exponential backoff and jitter (reconnect_min_sec .. reconnect_max_sec).
+
+    The offline cache stores compact rows (birdwatch.wire). wire_format
+    "json" publishes JSON on TOPIC and BATCH_TOPIC, as the iot-handler
+    expects; "compact" sends packed messages on COMPACT_TOPIC instead.
     """
 
     def __init__(
@@ -121,100 +192,415 @@ class MQTTClient:
         ca_path: str | Path | None = None,
         cache_path: Path | None = None,
         flush_interval_sec: float = 60.0,
+        cache_max_rows: int | None = None,
+        cache_max_bytes: int | None = None,
+        flush_window: int = 32,
+        flush_batch_size: int = 1,
+        flush_max_messages_per_sec: float | None = 50.0,
+        flush_max_bytes_per_sec: float | None = 256_000.0,
+        flush_ack_timeout_sec: float = 10.0,
+        reconnect_min_sec: float = 1.0,
+        reconnect_max_sec: float = 300.0,
+        keep_alive_sec: int = 30,
+        wire_format: str = "json",
     ) -> None:
-        if mqtt_connection_builder is None:
+        if wire_format not in WIRE_FORMATS:
+            raise ValueError(f"wire_format must be one of {', '.join(WIRE_FORMATS)}")
+        if flush_window < 1:
+            raise ValueError("flush_window must be >= 1")
+        if flush_batch_size > 0xFFFF:
+            raise ValueError("flush_batch_size must be at most 65535")
+        if (
+            mqtt_connection_builder is None
+            and importlib.util.find_spec("awsiot") is None
+        ):
             raise RuntimeError("awsiotsdk not installed")
         self.endpoint = endpoint
         self.client_id = client_id
         self.cert_path = Path(cert_path)
         self.key_path = Path(key_path)
         self.ca_path = Path(ca_path) if ca_path else None
-        self.cache_path = cache_path or _default_cache_path()
+        self.cache = OfflineCache(
+            cache_path, max_rows=cache_max_rows, max_bytes=cache_max_bytes
+        )
+        self.cache_path = self.cache.path
         self.flush_interval_sec = flush_interval_sec
+        self.flush_window = flush_window
+        self.flush_batch_size = flush_batch_size
+        self.flush_max_messages_per_sec = flush_max_messages_per_sec
+        self.flush_max_bytes_per_sec = flush_max_bytes_per_sec
+        self.flush_ack_timeout_sec = flush_ack_timeout_sec
+        self.reconnect_min_sec = reconnect_min_sec
+        self.reconnect_max_sec = reconnect_max_sec
+        self.keep_alive_sec = keep_alive_sec
+        self.wire_format = wire_format
+        self.species = self.cache.species
+        self.last_flush: FlushStats | None = None
         self._connection: Any = None
         self._lock = threading.Lock()
-        _init_db(self.cache_path)
+        self._connect_lock = threading.Lock()
+        self._online = threading.Event()
+        self._wake = threading.Event()  # cuts the watchdog's sleep short
+        self._backoff = _Backoff(reconnect_min_sec, reconnect_max_sec)
+        self._next_attempt = 0.0  # monotonic time of the next connect attempt
+        cache = self.cache
+        REGISTRY.gauge(
+            "birdwatch_cache_rows", "Detections in the offline cache", cache.__len__
+        )
+        REGISTRY.gauge(
+            "birdwatch_cache_bytes",
+            "Payload bytes in the offline cache",
+            lambda: cache.size_bytes,
+        )
+        REGISTRY.counter(
+            "birdwatch_cache_evicted_total",
+            "Cached detections evicted by the caps",
+            lambda: cache.evicted,
+        )
+        REGISTRY.gauge(
+            "birdwatch_flush_rate",
+            "Detections/s drained by the last cache flush",
+            lambda: self.last_flush.rate if self.last_flush else 0.0,
+        )
+        REGISTRY.gauge(
+            "birdwatch_mqtt_connected", "1 while connected", lambda: int(self.connected)
+        )
+
+    @property
+    def connected(self) -> bool:
+        """True while the MQTT connection is up (per its callbacks)."""
+        return self._online.is_set()
 
     def connect(self) -> None:
-        """Build and connect MQTT over mTLS."""
-        builder = mqtt_connection_builder.mtls_from_path(
+        """
+        Build and connect MQTT over mTLS; raises if the connect fails.
+        Concurrent calls wait for the first; once connected this is a no-op.
+        """
+        with self._connect_lock:
+            with self._lock:
+                if self._connection is not None:
+                    return
+            self._connect()
+
+    def _connect(self) -> None:
+        _load_mqtt()
+        extra: dict[str, Any] = {}
+        if self.ca_path and self.ca_path.is_file():
+            extra["ca_filepath"] = str(self.ca_path)
+        connection = mqtt_connection_builder.mtls_from_path(
             endpoint=self.endpoint,
             cert_filepath=str(self.cert_path),
             pri_key_filepath=str(self.key_path),
             client_id=self.client_id,
+            clean_session=False,
+            # Short keep-alive so a dead link is noticed (and reported through
+            # on_connection_interrupted) within about a minute
+            keep_alive_secs=self.keep_alive_sec,
+            reconnect_min_timeout_secs=max(1, int(self.reconnect_min_sec)),
+            reconnect_max_timeout_secs=max(1, int(self.reconnect_max_sec)),
+            on_connection_interrupted=self._on_interrupted,
+            on_connection_resumed=self._on_resumed,
+            **extra,
         )
-        if self.ca_path and self.ca_path.is_file():
-            builder.with_certificate_authority(str(self.ca_path))
-        self._connection = builder.build()
-        self._connection.connect().result(timeout=10)
+        connection.connect().result(timeout=10)
+        with self._lock:
+            self._connection = connection
+        self._backoff.reset()
+        self._online.set()
+        self._wake.set()
+
+    def _on_interrupted(self, connection: Any, error: Exception, **kwargs: Any) -> None:
+        _log.warning("MQTT connection interrupted: %s", error)
+        self._online.clear()
+
+    def _on_resumed(
+        self, connection: Any, return_code: Any, session_present: bool, **kwargs: Any
+    ) -> None:
+        _log.info("MQTT connection resumed (return code %s)", return_code)
+        self._online.set()
+        self._wake.set()  # drain the cache now rather than at the next tick
+
+    def _reconnect_if_due(self) -> float:
+        """
+        Try connect() if there is no connection and the backoff delay has
+        passed; return seconds until the watchdog should check again.
+        """
+        with self._lock:
+            has_connection = self._connection is not None
+        if has_connection:
+            return self.flush_interval_sec  # awscrt is resuming it
+        wait_sec = self._next_attempt - time.monotonic()
+        if wait_sec > 0:
+            return wait_sec
+        try:
+            self.connect()
+        except Exception as e:
+            delay = self._backoff.next_delay()
+            self._next_attempt = time.monotonic() + delay
+            _log.info("MQTT connect failed (%s); retrying in %.1f s", e, delay)
+            return delay
+        return 0.0
 
     def disconnect(self) -> None:
         """Disconnect MQTT."""
         with self._lock:
+            self._online.clear()
             if self._connection:
                 self._connection.disconnect()
                 self._connection = None
+        self.cache.commit()
 
     def publish(self, payload: DetectionPayload) -> bool:
         """
-        Publish payload to birdnet/detections. If not connected, append to
-        offline cache and return False.
+        Publish payload to birdnet/detections (or COMPACT_TOPIC). If not
+        connected, append to offline cache and return False without touching the network.
         """
-        body = json.dumps(asdict(payload))
         with self._lock:
-            if self._connection is None:
-                _append_cache(self.cache_path, payload)
-                return False
+            conn = self._connection if self._online.is_set() else None
+        if conn is None:
+            self.cache.append(self._cache_row(payload))
+            _publish_cached.inc()
+            return False
+        topic, body = self._message(payload)
+        start = time.perf_counter()
         try:
-            assert mqtt_crt is not None
-            self._connection.publish(
-                topic=TOPIC, payload=body, qos=mqtt_crt.QoS.AT_LEAST_ONCE
-            ).result(timeout=5)
-            return True
+            _publish_async(conn, topic, body).result(timeout=5)
         except Exception:
-            _append_cache(self.cache_path, payload)
+            self.cache.append(self._cache_row(payload))
+            _publish_failed.inc()
             return False
+        _publish_seconds.observe(time.perf_counter() - start)
+        _published.inc()
+        return True
 
-    def flush_cache(self) -> int:
-        """Connect if needed, publish all cached payloads, remove from DB. Return count flushed."""
+    async def publish_async(self, payload: DetectionPayload) -> bool:
+        """publish() for asyncio callers: awaits the PUBACK instead of blocking."""
         with self._lock:
-            conn = self._connection
-        if conn is None and _is_connected():
+            conn = self._connection if self._online.is_set() else None
+        if conn is None:
+            self.cache.append(self._cache_row(payload))
+            _publish_cached.inc()
+            return False
+        topic, body = self._message(payload)
+        start = time.perf_counter()
+        try:
+            future = _publish_async(conn, topic, body)
+            await asyncio.wait_for(asyncio.wrap_future(future), timeout=5)
+        except Exception:
+            self.cache.append(self._cache_row(payload))
+            _publish_failed.inc()
+            return False
+        _publish_seconds.observe(time.perf_counter() - start)
+        _published.inc()
+        return True
+
+    def _message(self, payload: DetectionPayload) -> tuple[str, str | bytes]:
+        """(topic, body) publishing one detection in wire_format."""
+        if self.wire_format == "compact":
             try:
-                self.connect()
-            except Exception:
-                return 0
-        rows = _load_cache(self.cache_path)
-        if not rows:
+                record = encode_record(payload, self.species)
+            except ValueError:
+                pass  # beyond the compact limits; sent as JSON
+            else:
+                return COMPACT_TOPIC, pack_message([record], self.species)
+        return TOPIC, json.dumps(asdict(payload))
+
+    def _cache_row(self, payload: DetectionPayload) -> str | bytes:
+        """A compact cache row, or JSON for payloads beyond the compact limits."""
+        try:
+            return encode_row(payload, self.species)
+        except ValueError as e:
+            _log.warning("Caching detection as JSON: %s", e)
+            return json.dumps(asdict(payload))
+
+    def publish_health(self, health: dict[str, Any]) -> bool:
+        """Publish a health summary on HEALTH_TOPIC (QoS0, not cached); False if offline."""
+        with self._lock:
+            conn = self._connection if self._online.is_set() else None
+        if conn is None:
+            return False
+        assert mqtt_crt is not None
+        try:
+            _publish_async(
+                conn, HEALTH_TOPIC, json.dumps(health), mqtt_crt.QoS.AT_MOST_ONCE
+            )
+        except Exception:
+            return False
+        return True
+
+    def flush_cache(self, stop: threading.Event | None = None) -> int:
+        """
+        Drain the offline cache while connected; return count flushed.
+
+        Keeps up to flush_window QoS1 publishes in flight and deletes rows
+        by id as their PUBACKs arrive. With flush_batch_size > 1, rows are
+        packed into one {"detections": [...]} message on BATCH_TOPIC (or
+        one packed message on COMPACT_TOPIC).
+        Publishes are paced by flush_max_messages_per_sec and
+        flush_max_bytes_per_sec (stay under the AWS IoT per-connection
+        quotas). Stops issuing at the first failure or ack timeout, or once
+        stop is set (it waits for the acks in flight, then returns); rows not
+        acknowledged stay cached. Details land in last_flush.
+        """
+        if not self.connected:
             return 0
-        flushed = 0
-        created_ats: list[float] = []
-        for payload_json, created_at in rows:
-            try:
-                _ = DetectionPayload(**json.loads(payload_json))  # validate shape
+        stats = FlushStats()
+        start = time.monotonic()
+        limiter = _RateLimiter(
+            self.flush_max_messages_per_sec, self.flush_max_bytes_per_sec
+        )
+        in_flight: dict[Future, list[int]] = {}
+        acked: list[int] = []
+        ok = True
+
+        def reap(timeout: float | None) -> None:
+            nonlocal ok
+            done, _ = wait(
+                list(in_flight), timeout=timeout, return_when=FIRST_COMPLETED
+            )
+            if not done:
+                ok = False  # nothing acknowledged within the timeout
+                return
+            for future in done:
+                ids = in_flight.pop(future)
+                if future.exception() is None:
+                    acked.extend(ids)
+                    stats.messages += 1
+                else:
+                    stats.failed += 1
+                    ok = False
+
+        for page in self.cache.iter_pages():
+            for ids, topic, body in self._flush_messages(page, stats):
                 with self._lock:
-                    c = self._connection
-                if c is None:
+                    c = self._connection if self._online.is_set() else None
+                if c is None or (stop is not None and stop.is_set()):
+                    ok = False
+                while ok and len(in_flight) >= self.flush_window:
+                    reap(self.flush_ack_timeout_sec)
+                if not ok:
+                    break
+                limiter.wait(len(body), stop)
+                try:
+                    in_flight[_publish_async(c, topic, body)] = ids
+                except Exception:
+                    stats.failed += 1
+                    ok = False
                     break
-                assert mqtt_crt is not None
-                c.publish(
-                    topic=TOPIC, payload=payload_json, qos=mqtt_crt.QoS.AT_LEAST_ONCE
-                ).result(timeout=5)
-                flushed += 1
-                created_ats.append(created_at)
-            except Exception:
+            # Delete what this page got acknowledged so far (one commit per page)
+            self.cache.delete(acked)
+            stats.flushed += len(acked)
+            acked.clear()
+            if not ok:
                 break
-        if created_ats:
-            _delete_cached(self.cache_path, created_ats)
-        return flushed
+        while in_flight:
+            pending = len(in_flight)
+            reap(self.flush_ack_timeout_sec)
+            if len(in_flight) == pending:
+                stats.failed += pending  # timed out; rows stay cached
+                break
+        self.cache.delete(acked)
+        stats.flushed += len(acked)
+        stats.seconds = time.monotonic() - start
+        self.last_flush = stats
+        _cache_flushed.inc(stats.flushed)
+        if stats.flushed or stats.failed:
+            _log.info(
+                "Flushed %d cached detections in %.1f s (%.1f/s), %d failed publishes",
+                stats.flushed,
+                stats.seconds,
+                stats.rate,
+                stats.failed,
+            )
+        return stats.flushed
+
+    def _flush_messages(
+        self, page: list[tuple[int, str | bytes]], stats: FlushStats
+    ) -> list[tuple[list[int], str, str | bytes]]:
+        """Turn a page of cached rows into (row_ids, topic, body) messages."""
+        valid: list[tuple[int, Any]] = []
+        invalid: list[int] = []
+        for row_id, row in page:
+            try:
+                valid.append((row_id, self._row_body(row)))
+            except (ValueError, TypeError):
+                invalid.append(row_id)
+        if invalid:
+            # Rows that can never be published would block the queue forever
+            self.cache.delete(invalid)
+            stats.dropped += len(invalid)
+        size = max(1, self.flush_batch_size)
+        if size == 1 and self.wire_format == "json":
+            return [([row_id], TOPIC, body) for row_id, body in valid]
+        messages: list[tuple[list[int], str, str | bytes]] = []
+        for i in range(0, len(valid), size):
+            group = valid[i : i + size]
+            if self.wire_format == "compact":
+                records = [(row_id, r) for row_id, r in group if not isinstance(r, str)]
+                if records:
+                    body = pack_message([r for _, r in records], self.species)
+                    messages.append(([i for i, _ in records], COMPACT_TOPIC, body))
+                # JSON rows the compact encoding cannot hold go out one by one
+                messages.extend(
+                    ([row_id], TOPIC, r) for row_id, r in group if isinstance(r, str)
+                )
+            else:
+                body = '{"detections":[' + ",".join(b for _, b in group) + "]}"
+                messages.append(([row_id for row_id, _ in group], BATCH_TOPIC, body))
+        return messages
+
+    def _row_body(self, row: str | bytes) -> str | bytes | memoryview:
+        """
+        A cached row as a JSON string or, for wire_format "compact", a
+        record (JSON if the encoding cannot hold it); raises ValueError or
+        TypeError for rows that do not parse.
+        """
+        if isinstance(row, bytes) and not row.startswith(b"{"):
+            record = row_record(row)
+            if self.wire_format == "json":
+                return json.dumps(decode_record(record, self.species))
+            # Sent as stored; only check that it parses
+            if record_species(record) >= len(self.species):
+                raise ValueError("unknown species index")
+            return record
+        # JSON row: cached by an older version, or beyond the compact limits
+        payload = DetectionPayload(**json.loads(row))
+        text = row if isinstance(row, str) else row.decode()
+        if self.wire_format == "compact":
+            try:
+                return encode_record(payload, self.species)
+            except ValueError:
+                return text
+        return text
+
+    def watchdog_step(self, stop: threading.Event | None = None) -> float:
+        """
+        One watchdog pass: flush the cache if online (until stop is set),
+        else commit the cache's pending appends when due and reconnect if
+        the backoff allows. Returns seconds until the next pass is due.
+        """
+        if self.connected:
+            self.flush_cache(stop)
+            return self.flush_interval_sec
+        commit_in = self.cache.commit_due()
+        return min(self.flush_interval_sec, commit_in, self._reconnect_if_due())
 
     def start_watchdog(self) -> None:
-        """Start background thread that periodically flushes cache when online."""
+        """
+        Start background thread that flushes the cache every
+        flush_interval_sec while online (and as soon as the connection
+        resumes) and reconnects with backoff while there is no connection.
+        """
 
         def run() -> None:
             while True:
-                time.sleep(self.flush_interval_sec)
-                self.flush_cache()
+                try:
+                    wait = self.watchdog_step()
+                except Exception:
+                    _log.exception("Watchdog pass failed")
+                    wait = self.flush_interval_sec
+                self._wake.wait(wait)
+                self._wake.clear()
 
         t = threading.Thread(target=run, daemon=True)
         t.start()
@@ -0,0 +1,228 @@
+"""SQLite offline cache for detections that could not be published."""
+
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from birdwatch.wire import SpeciesTable
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator, Sequence
+
+
+def default_cache_path() -> Path:
+    """BIRDNET_OFFLINE_CACHE, or offline_cache.db in the working directory."""
+    return Path(os.environ.get("BIRDNET_OFFLINE_CACHE", "offline_cache.db"))
+
+
+class OfflineCache:
+    """
+    Bounded, append-mostly SQLite queue of serialized detections (compact
+    rows from birdwatch.wire, or JSON from older versions).
+
+    One long-lived connection in WAL mode with synchronous=NORMAL, so the SD
+    card sees an fsync per checkpoint rather than per detection. Appends are
+    group-committed every commit_every rows or commit_interval_sec seconds,
+    checked on append and by commit_due(), which the MQTT watchdog calls
+    while offline; commit() or close() (MQTTClient.disconnect() on
+    shutdown) commits the rest, and a crash loses at most that group. Reads
+    page through rows by primary key, and rows are deleted by id. When max_rows or max_bytes is exceeded
+    the oldest rows are evicted. species is the SpeciesTable compact rows
+    index into; entries added to it are saved with the next append. Safe to
+    share between threads.
+    """
+
+    def __init__(
+        self,
+        path: str | Path | None = None,
+        *,
+        max_rows: int | None = None,
+        max_bytes: int | None = None,
+        commit_every: int = 32,
+        commit_interval_sec: float = 5.0,
+    ) -> None:
+        self.path = Path(path) if path is not None else default_cache_path()
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.commit_every = commit_every
+        self.commit_interval_sec = commit_interval_sec
+        self.evicted = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS detections (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                payload TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS species (
+                id INTEGER PRIMARY KEY,
+                code TEXT NOT NULL,
+                scientific_name TEXT NOT NULL,
+                common_name TEXT NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+        self.species = SpeciesTable(
+            self._conn.execute(
+                "SELECT code, scientific_name, common_name FROM species ORDER BY id"
+            ).fetchall()
+        )
+        self._species_saved = len(self.species)
+        rows, size = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(LENGTH(CAST(payload AS BLOB))), 0) FROM detections"
+        ).fetchone()
+        self._rows: int = rows
+        self._bytes: int = size
+        self._uncommitted = 0
+        self._last_commit = time.monotonic()
+
+    def __len__(self) -> int:
+        return self._rows
+
+    @property
+    def size_bytes(self) -> int:
+        """Total payload bytes currently cached."""
+        return self._bytes
+
+    def append(self, payload: str | bytes) -> None:
+        """Queue one serialized detection; evicts oldest rows beyond the caps."""
+        size = len(payload.encode() if isinstance(payload, str) else payload)
+        with self._lock:
+            self._save_species()
+            self._conn.execute(
+                "INSERT INTO detections (payload, created_at) VALUES (?, ?)",
+                (payload, time.time()),
+            )
+            self._rows += 1
+            self._bytes += size
+            self._uncommitted += 1
+            self._evict()
+            if (
+                self._uncommitted >= self.commit_every
+                or time.monotonic() - self._last_commit >= self.commit_interval_sec
+            ):
+                self._commit()
+
+    def _save_species(self) -> None:
+        """Insert table entries added since the last save (lock held)."""
+        new = self.species.species[self._species_saved :]
+        if not new:
+            return
+        self._conn.executemany(
+            "INSERT INTO species (id, code, scientific_name, common_name) VALUES (?, ?, ?, ?)",
+            [(self._species_saved + i, *s) for i, s in enumerate(new)],
+        )
+        self._species_saved += len(new)
+
+    def commit(self) -> None:
+        """Commit any group-buffered appends."""
+        with self._lock:
+            self._commit()
+
+    def commit_due(self) -> float:
+        """
+        Commit buffered appends once commit_interval_sec has passed since
+        the last commit; return seconds until this should be checked again.
+        """
+        with self._lock:
+            wait = self._last_commit + self.commit_interval_sec - time.monotonic()
+            if self._uncommitted and wait <= 0:
+                self._commit()
+                return self.commit_interval_sec
+        return wait if self._uncommitted else self.commit_interval_sec
+
+    def _commit(self) -> None:
+        if self._conn.in_transaction:
+            self._conn.commit()
+        self._uncommitted = 0
+        self._last_commit = time.monotonic()
+
+    def _evict(self) -> None:
+        """Delete oldest rows until within max_rows and max_bytes (lock held)."""
+        excess_rows = self._rows - self.max_rows if self.max_rows is not None else 0
+        excess_bytes = self._bytes - self.max_bytes if self.max_bytes is not None else 0
+        if excess_rows <= 0 and excess_bytes <= 0:
+            return
+        cutoff = None
+        n = freed = 0
+        cur = self._conn.execute(
+            "SELECT id, LENGTH(CAST(payload AS BLOB)) FROM detections ORDER BY id"
+        )
+        for row_id, size in cur:
+            if n >= excess_rows and freed >= excess_bytes:
+                break
+            cutoff = row_id
+            n += 1
+            freed += size
+        cur.close()
+        if cutoff is None:
+            return
+        self._conn.execute("DELETE FROM detections WHERE id <= ?", (cutoff,))
+        self._rows -= n
+        self._bytes -= freed
+        self.evicted += n
+
+    def iter_pages(
+        self, page_size: int = 500
+    ) -> Iterator[list[tuple[int, str | bytes]]]:
+        """
+        Yield pages of (id, payload), oldest first, without loading the table.
+
+        Uses keyset pagination on id, so deleting yielded rows between pages
+        is safe.
+        """
+        self.commit()
+        last_id = 0
+        while True:
+            with self._lock:
+                page = self._conn.execute(
+                    "SELECT id, payload FROM detections WHERE id > ? ORDER BY id LIMIT ?",
+                    (last_id, page_size),
+                ).fetchall()
+            if not page:
+                return
+            yield page
+            last_id = page[-1][0]
+
+    def delete(self, ids: Sequence[int]) -> None:
+        """Delete rows by primary key and commit."""
+        if not ids:
+            return
+        with self._lock:
+            size = 0
+            removed = 0
+            # Stay under SQLite's bound-parameter limit
+            for i in range(0, len(ids), 500):
+                chunk = list(ids[i : i + 500])
+                placeholders = ",".join("?" * len(chunk))
+                size += self._conn.execute(
+                    "SELECT COALESCE(SUM(LENGTH(CAST(payload AS BLOB))), 0) "
+                    f"FROM detections WHERE id IN ({placeholders})",
+                    chunk,
+                ).fetchone()[0]
+                removed += self._conn.execute(
+                    f"DELETE FROM detections WHERE id IN ({placeholders})", chunk
+                ).rowcount
+            self._rows -= removed
+            self._bytes -= size
+            self._commit()
+
+    def close(self) -> None:
+        """Commit pending appends and close the connection."""
+        with self._lock:
+            self._commit()
+            self._conn.close()
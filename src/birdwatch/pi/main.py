@@ -5,63 +5,730 @@ Environment:
 - BIRDNET_MODEL_DIR: directory containing TFLite model and labels.txt
 - AWS_IOT_ENDPOINT, AWS_IOT_CLIENT_ID, cert/key paths for MQTT
 - Optional: BIRDNET_OFFLINE_CACHE path for SQLite cache
+- Optional: BIRDNET_FLUSH_WINDOW, BIRDNET_FLUSH_BATCH_SIZE, BIRDNET_FLUSH_RATE
+  for draining the offline cache
+- Optional: BIRDNET_CACHE_MAX_ROWS, BIRDNET_CACHE_MAX_BYTES caps (oldest evicted)
+- Optional: BIRDNET_HOP_SECONDS between analysis windows (default 3, no overlap)
+- Optional: BIRDNET_STREAMING_MEL=1 to reuse mel frames across overlapping windows
+- Optional: BIRDNET_TOP_K max detections per window (default 10)
+- Optional: BIRDNET_QUEUE_SIZE, BIRDNET_BACKPRESSURE for the analysis queue
+- Optional: BIRDNET_EVENT_GAP_SECONDS (default 6), BIRDNET_EVENT_MAX_SECONDS
+  (default 60) for merging consecutive windows into one detection event
+- Optional: BIRDNET_ASYNC=1 to run the pipeline on an asyncio event loop
+- Optional: BIRDNET_HEALTH_INTERVAL seconds between health messages (default
+  300, 0 disables), BIRDNET_METRICS_FILE to also write metrics there, and
+  BIRDNET_METRICS_PORT to serve them over HTTP on localhost
+- Optional: BIRDNET_ANALYZER_WORKERS interpreters analysing windows in
+  parallel (default 1), BIRDNET_TFLITE_THREADS threads per interpreter,
+  BIRDNET_XNNPACK=0 to disable the XNNPACK delegate
+- Optional: BIRDNET_MODEL_VARIANT fp32, fp16 or int8, or auto (default) to
+  use the most accurate variant (and fewest threads) calibrated to analyse
+  under BIRDNET_TARGET_RTF seconds per second of audio (default 0.5); the
+  choice is cached in BIRDNET_MODEL_PROFILE (default model_profile.json in
+  the model directory)
+- Optional: BIRDNET_CHANNELS input channels to capture and analyse separately
+  (default 1, e.g. 4 for a USB microphone array)
+- Optional: BIRDNET_SPECIES_FILE allow-list (one species per line) or
+  occurrence table (.csv, weekly frequencies) limiting the species reported;
+  BIRDNET_SPECIES_MIN_FREQUENCY for tables (default 0.03)
+- Optional: BIRDNET_CLIP_DIR to save a clip per detection event there,
+  capped at BIRDNET_CLIP_MAX_MB (default 200); BIRDNET_CLIP_PRE_ROLL and
+  BIRDNET_CLIP_POST_ROLL seconds (default 1), BIRDNET_CLIP_RING_SECONDS of
+  audio kept for them (default 30), BIRDNET_CLIP_FORMAT (flac or wav), and
+  BIRDNET_CLIP_UPLOAD_URL to upload clips to (every
+  BIRDNET_CLIP_UPLOAD_INTERVAL seconds, default 60)
+- Optional: BIRDNET_GATE=1 to skip the model on windows without narrowband
+  activity in 1-10 kHz; BIRDNET_GATE_SNR_DB (default 7) and
+  BIRDNET_GATE_MIN_ACTIVE seconds of activity (default 0.07) tune it
+- Optional: BIRDNET_PROCESSES=1 to run capture, BIRDNET_ANALYZER_WORKERS
+  analyzer processes and the publisher (MQTT, clips) as separate, supervised
+  processes around a shared-memory audio ring
+- Optional: BIRDNET_AUDIO_FILE to replay a WAV/FLAC file instead of
+  capturing, at BIRDNET_AUDIO_SPEED times real time (default 1, 0 unpaced);
+  the pipeline stops at the end of the file
 """
 
 from __future__ import annotations
 
+import asyncio
+import logging
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import UTC, datetime
+from functools import partial
 from pathlib import Path
+from typing import TYPE_CHECKING, Any, cast
 
-from birdwatch.analyzer import BirdNETAnalyzer
-from birdwatch.mqtt_client import DetectionPayload, MQTTClient
-from birdwatch.recorder import run_recorder
+from birdwatch.analyzer import (
+    MODEL_VARIANTS,
+    AnalyzerPool,
+    BirdNETAnalyzer,
+    frame_aligned_hop,
+)
+from birdwatch.clips import (
+    CLIP_FORMATS,
+    ClipRing,
+    ClipStore,
+    ClipWriter,
+    HttpClipUploader,
+)
+from birdwatch.events import DetectionAggregator, DetectionEvent
+from birdwatch.gate import ActivityGate
+from birdwatch.metrics import REGISTRY
+from birdwatch.mqtt_client import WIRE_FORMATS, DetectionPayload, MQTTClient
+from birdwatch.recorder import (
+    BACKPRESSURE_POLICIES,
+    BUFFER_SAMPLES,
+    SAMPLE_RATE,
+    AnalysisQueue,
+    BackpressurePolicy,
+    RecorderStats,
+    dispatch_window,
+    open_input_stream,
+    run_recorder,
+)
+from birdwatch.species import birdnet_week, load_species_filter
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from concurrent.futures import Future
+
+    import numpy as np
+
+    from birdwatch.shared_ring import SharedRingBuffer
+    from birdwatch.sources import AudioSource
+
+_log = logging.getLogger(__name__)
+
+
+class _SpeciesFilter:
+    """
+    Label indices allowed by species_file (None without one) for BirdNET's
+    current week. An occurrence table's species change with the week, so
+    update() hands an analyzer the new list once the week turns.
+    """
+
+    def __init__(
+        self,
+        species_file: str | Path | None,
+        model_dir: str | Path,
+        min_frequency: float,
+    ) -> None:
+        self.species_file = species_file
+        self.labels_path = Path(model_dir) / "labels.txt"
+        self.min_frequency = min_frequency
+        self.weekly = bool(species_file) and Path(species_file).suffix.lower() == ".csv"
+        self.week = birdnet_week()
+        self.species = self._load()
+
+    def _load(self) -> np.ndarray | None:
+        if not self.species_file:
+            return None
+        species = load_species_filter(
+            self.species_file,
+            self.labels_path,
+            week=self.week,
+            min_frequency=self.min_frequency,
+        )
+        _log.info(
+            "Species filter %s (week %d): %d species",
+            self.species_file,
+            self.week,
+            species.size,
+        )
+        return species
+
+    def update(self, analyzer: BirdNETAnalyzer | AnalyzerPool) -> None:
+        """Give analyzer this week's species if the week changed since the last load."""
+        week = birdnet_week()
+        if not self.weekly or week == self.week:
+            return
+        self.week = week
+        try:
+            species = self._load()
+        except (OSError, ValueError) as e:
+            _log.warning("Keeping last week's species: %s", e)
+            return
+        analyzer.set_species(species)
+        self.species = species
+
+
+def _select_model(
+    model_dir: str | Path,
+    model_profile: str | Path | None,
+    *,
+    hop_seconds: float,
+    workers: int,
+    channels: int,
+    tflite_threads: int | None,
+    streaming_mel: bool,
+    target_rtf: float,
+    xnnpack: bool,
+) -> tuple[str, int]:
+    """
+    (variant, threads) calibrated for this board and pipeline (see
+    birdwatch.calibration.pipeline_settings).
+    """
+    from birdwatch.calibration import pipeline_settings, select_model
+
+    threads, budget_seconds = pipeline_settings(
+        hop_seconds,
+        workers=workers,
+        channels=channels,
+        tflite_threads=tflite_threads,
+        streaming_mel=streaming_mel,
+    )
+    profile = select_model(
+        model_dir,
+        model_profile,
+        threads=threads,
+        budget_seconds=budget_seconds,
+        target_rtf=target_rtf,
+        xnnpack=xnnpack,
+    )
+    _log.info(
+        "Model %s with %d threads (real-time factor %.2f)",
+        profile.variant,
+        profile.num_threads,
+        profile.rtf,
+    )
+    return profile.variant, profile.num_threads
+
+
+class _Events:
+    """
+    Event half of the pipeline: per-window results go to a
+    DetectionAggregator, whose events are turned into DetectionPayloads and
+    handed to publish. With clip_dir, each event's peak window plus
+    pre/post roll is cut from clip_ring (fed by the audio callback) and
+    handed to a ClipWriter, which publishes the payload once the clip is
+    encoded. Used by _Detector, and on its own by the multi-process
+    publisher (see birdwatch.pi.processes).
+    """
+
+    def __init__(
+        self,
+        device_id: str,
+        publish: Callable[[DetectionPayload], object],
+        species_name: Callable[[int], str],
+        event_gap_seconds: float = 6.0,
+        event_max_seconds: float = 60.0,
+        clip_ring: ClipRing | SharedRingBuffer | None = None,
+        clip_dir: str | Path | None = None,
+        clip_max_bytes: int = 200_000_000,
+        clip_pre_roll_sec: float = 1.0,
+        clip_post_roll_sec: float = 1.0,
+        clip_format: str = "flac",
+        clip_upload_url: str | None = None,
+        clip_upload_interval_sec: float = 60.0,
+    ) -> None:
+        self.device_id = device_id
+        self.publish = publish
+        self.species_name = species_name
+        self.aggregator = DetectionAggregator(
+            self.on_event,
+            gap_timeout_sec=event_gap_seconds,
+            max_event_sec=event_max_seconds,
+        )
+        # Epoch seconds at stream position 0
+        self.capture_start: float | None = None
+        self.clip_ring = clip_ring if clip_dir else None
+        self.clips: ClipWriter | None = None
+        if clip_dir:
+            self.clips = ClipWriter(
+                ClipStore(clip_dir, clip_max_bytes, keep_pending=bool(clip_upload_url)),
+                device_id,
+                publish,
+                uploader=HttpClipUploader(clip_upload_url) if clip_upload_url else None,
+                fmt=clip_format,
+                upload_interval_sec=clip_upload_interval_sec,
+            )
+        self._pre_roll = int(clip_pre_roll_sec * SAMPLE_RATE)
+        self._post_roll = int(clip_post_roll_sec * SAMPLE_RATE)
+
+    def window_end(self, end_sample: int) -> float:
+        """
+        Wall-clock end of the window ending at stream position end_sample
+        (not the analysis time, which lags behind under load).
+        """
+        if self.capture_start is None:
+            self.capture_start = time.time() - end_sample / SAMPLE_RATE
+        return self.capture_start + end_sample / SAMPLE_RATE
+
+    def add(
+        self, results: list[tuple[int, float]], window_end: float, channel: int = 0
+    ) -> None:
+        """Feed one window's (species_index, confidence) results."""
+        for idx, conf in results:
+            self.aggregator.add(idx, conf, window_end, channel)
+
+    def on_event(self, event: DetectionEvent) -> None:
+        name = self.species_name(event.species_index)
+        # species_code: often 4-letter code; use first part of scientific name if needed
+        code = name.replace(" ", "_")[:10].lower()
+        payload = DetectionPayload(
+            device_id=self.device_id,
+            species_code=code,
+            scientific_name=name,
+            common_name=name,  # Enrichment can fill later
+            confidence=event.peak_confidence,
+            timestamp=datetime.fromtimestamp(event.start, tz=UTC).isoformat(
+                timespec="milliseconds"
+            ),
+            lat=None,
+            lon=None,
+            audio_url=None,
+            image_url=None,
+            end_timestamp=datetime.fromtimestamp(event.end, tz=UTC).isoformat(
+                timespec="milliseconds"
+            ),
+            mean_confidence=event.mean_confidence,
+            window_count=event.window_count,
+            channel=event.channel,
+        )
+        if self.clips is not None:
+            audio = self._clip_audio(event)
+            if audio is not None and self.clips.submit(payload, audio):
+                return  # published by the clip writer
+        self.publish(payload)
+
+    def _clip_audio(self, event: DetectionEvent) -> np.ndarray | None:
+        """
+        The event's peak window with pre/post roll from clip_ring, or its
+        last window if the peak has already left the ring; None if neither
+        is held.
+        """
+        ring = self.clip_ring
+        if ring is None or self.capture_start is None:
+            return None
+        n = self._pre_roll + BUFFER_SAMPLES + self._post_roll
+        for window_end in (event.peak_end, event.end):
+            end = round((window_end - self.capture_start) * SAMPLE_RATE)
+            audio = ring.read(end + self._post_roll, n, event.channel)
+            if audio is not None:
+                return audio
+        return None
+
+    def close(self) -> None:
+        """Emit the open events and publish them once their clips are written."""
+        self.aggregator.close()
+        if self.clips is not None:
+            self.clips.close()
+
+
+class _Detector:
+    """
+    Analyzer plus event aggregation, shared by the threaded and asyncio
+    runners: on_window() analyses a window and feeds the aggregator, whose
+    events are turned into DetectionPayloads and handed to publish. With
+    analyzer_workers > 1 windows go to an AnalyzerPool and on_window returns
+    once a worker has taken the window (blocking while all are busy).
+    Multi-channel windows are analysed in one batch, and each event carries
+    its channel. species_file limits detections to the species it lists
+    (occurrence tables use this week's frequencies, reloaded as the week
+    turns; see birdwatch.species).
+    With gate, an ActivityGate skips the model on windows with nothing
+    bird-like in them (see birdwatch.gate). model_variant picks the model
+    file; "auto" uses the variant and thread count calibrated on this board
+    to stay under target_rtf (cached in model_profile; see
+    birdwatch.calibration). Event and clip options go to _Events; with
+    clip_dir, clip_ring is the ClipRing for the audio callback to feed.
+    stats is for the runner's AnalysisQueue: a window handed to the pool
+    counts as processed, and in errors too if its analysis then fails.
+    """
+
+    def __init__(
+        self,
+        device_id: str,
+        model_dir: str | Path,
+        publish: Callable[[DetectionPayload], object],
+        confidence_threshold: float = 0.7,
+        hop_seconds: float = 3.0,
+        streaming_mel: bool = False,
+        top_k: int = 10,
+        event_gap_seconds: float = 6.0,
+        event_max_seconds: float = 60.0,
+        analyzer_workers: int = 1,
+        tflite_threads: int | None = None,
+        xnnpack: bool = True,
+        model_variant: str | None = None,
+        target_rtf: float = 0.5,
+        model_profile: str | Path | None = None,
+        species_file: str | Path | None = None,
+        species_min_frequency: float = 0.03,
+        gate: bool = False,
+        gate_snr_db: float = 7.0,
+        gate_min_active_sec: float = 0.07,
+        channels: int = 1,
+        clip_dir: str | Path | None = None,
+        clip_max_bytes: int = 200_000_000,
+        clip_pre_roll_sec: float = 1.0,
+        clip_post_roll_sec: float = 1.0,
+        clip_ring_seconds: float = 30.0,
+        clip_format: str = "flac",
+        clip_upload_url: str | None = None,
+        clip_upload_interval_sec: float = 60.0,
+    ) -> None:
+        self.species_filter = _SpeciesFilter(
+            species_file, model_dir, species_min_frequency
+        )
+        species = self.species_filter.species
+        self.gate = ActivityGate(gate_snr_db, gate_min_active_sec) if gate else None
+        if model_variant == "auto":
+            model_variant, tflite_threads = _select_model(
+                model_dir,
+                model_profile,
+                hop_seconds=hop_seconds,
+                workers=analyzer_workers,
+                channels=channels,
+                tflite_threads=tflite_threads,
+                streaming_mel=streaming_mel,
+                target_rtf=target_rtf,
+                xnnpack=xnnpack,
+            )
+        self.analyzer: BirdNETAnalyzer | AnalyzerPool
+        self._pool: AnalyzerPool | None = None
+        if analyzer_workers > 1:
+            # One window per worker in flight: DSP for the next window
+            # overlaps inference for the current one
+            self.analyzer = self._pool = AnalyzerPool(
+                model_dir,
+                analyzer_workers,
+                confidence_threshold=confidence_threshold,
+                top_k=top_k,
+                num_threads=tflite_threads or 1,
+                xnnpack=xnnpack,
+                variant=model_variant,
+                species=species,
+                gate=self.gate,
+            )
+        else:
+            self.analyzer = BirdNETAnalyzer(
+                model_dir=model_dir,
+                confidence_threshold=confidence_threshold,
+                streaming=streaming_mel,
+                top_k=top_k,
+                num_threads=tflite_threads,
+                xnnpack=xnnpack,
+                variant=model_variant,
+                species=species,
+                gate=self.gate,
+                # run_batch gets one row per channel that passes its gate
+                batch_size=channels,
+            )
+        if streaming_mel:
+            # Keep every window on the STFT frame grid so frames are reused exactly
+            hop_seconds = frame_aligned_hop(hop_seconds)
+        self.hop_seconds = hop_seconds
+        self._last_end: int | None = None
+        self.stats = RecorderStats()
+        self._stats_lock = threading.Lock()
+        self.events = _Events(
+            device_id,
+            publish,
+            self.analyzer.species_name,
+            event_gap_seconds,
+            event_max_seconds,
+            ClipRing(clip_ring_seconds, channels) if clip_dir else None,
+            clip_dir,
+            clip_max_bytes,
+            clip_pre_roll_sec,
+            clip_post_roll_sec,
+            clip_format,
+            clip_upload_url,
+            clip_upload_interval_sec,
+        )
+        self.aggregator = self.events.aggregator
+        self.clip_ring = self.events.clip_ring
+        self.clips = self.events.clips
+
+    # Runs on the analysis worker thread, off the audio callback.
+    def on_window(
+        self,
+        buffer: object,
+        end_sample: int,
+        channels: tuple[int, ...] | None = None,
+    ) -> None:
+        import numpy as np
+
+        self.species_filter.update(self.analyzer)
+        last_end = self._last_end
+        new_samples = None if last_end is None else end_sample - last_end
+        self._last_end = end_sample
+        window_end = self.events.window_end(end_sample)
+        buf = np.asarray(buffer, dtype=np.float32)
+        # Multi-channel buffers hold one row per channel that passed its gate
+        rows = [buf] if channels is None else list(buf)
+        ids = (0,) if channels is None else channels
+        if self._pool is not None:
+            for row, channel in zip(rows, ids, strict=True):
+                # The queue recycles buffer once this returns; the pool reads it later
+                future = self._pool.submit(row.copy())
+                future.add_done_callback(
+                    lambda f, c=channel: self._pool_done(f, window_end, c)
+                )
+            return
+        if channels is None:
+            results = [self.analyzer.run(buf, new_samples=new_samples)]
+        else:
+            # One interpreter invoke for all channels
+            results = self.analyzer.run_batch(rows)
+        for res, channel in zip(results, ids, strict=True):
+            self.events.add(res, window_end, channel)
+
+    # Runs on a pool worker thread.
+    def _pool_done(
+        self, future: Future[list[tuple[int, float]]], window_end: float, channel: int
+    ) -> None:
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is not None:
+            with self._stats_lock:
+                self.stats.errors += 1
+            _log.error(
+                "Analysis of window ending at %.3f failed",
+                window_end,
+                exc_info=error,
+            )
+            return
+        self.events.add(future.result(), window_end, channel)
+
+    def close(self) -> None:
+        """
+        Finish windows still being analysed, emit the open events and
+        publish them once their clips are written.
+        """
+        if self._pool is not None:
+            self._pool.close()
+        self.events.close()
+
+
+def _report_health(
+    mqtt: MQTTClient, device_id: str, metrics_file: str | Path | None
+) -> None:
+    """Write the metrics file (if configured) and publish a health summary."""
+    if metrics_file:
+        try:
+            REGISTRY.write(metrics_file)
+        except OSError as e:
+            _log.warning("Could not write metrics to %s: %s", metrics_file, e)
+    health = {"device_id": device_id, "timestamp": datetime.now(tz=UTC).isoformat()}
+    mqtt.publish_health({**health, **REGISTRY.health()})
 
 
 def _run_pipeline(
     device_id: str,
     model_dir: str | Path,
     mqtt: MQTTClient,
-    confidence_threshold: float = 0.7,
     noise_floor: float = 1e-4,
     noise_ceiling: float = 1.0,
+    queue_size: int = 2,
+    backpressure: BackpressurePolicy = "drop_oldest",
+    health_interval_sec: float = 300.0,
+    metrics_file: str | Path | None = None,
+    channels: int = 1,
+    source: AudioSource | None = None,
+    **detector_options: Any,
+) -> None:
+    """
+    Record, analyse and publish until interrupted, or until a finite source
+    (default: the microphone; see birdwatch.sources) ends, then publish the
+    open events and disconnect mqtt. detector_options (confidence_threshold,
+    hop_seconds, streaming_mel, top_k, event and analyzer settings) go to
+    _Detector.
+    """
+    detector = _Detector(
+        device_id,
+        model_dir,
+        mqtt.publish,
+        channels=channels,
+        **detector_options,
+    )
+    mqtt.start_watchdog()
+    detector.aggregator.start_flush_timer()
+    if health_interval_sec > 0:
+
+        def report_loop() -> None:
+            while True:
+                time.sleep(health_interval_sec)
+                _report_health(mqtt, device_id, metrics_file)
+
+        threading.Thread(
+            target=report_loop, name="birdwatch-health", daemon=True
+        ).start()
+    try:
+        run_recorder(
+            on_window=detector.on_window,
+            noise_floor=noise_floor,
+            noise_ceiling=noise_ceiling,
+            hop_seconds=detector.hop_seconds,
+            queue_size=queue_size,
+            backpressure=backpressure,
+            channels=channels,
+            stats=detector.stats,
+            clip_ring=detector.clip_ring,
+            source=source,
+        )
+    finally:
+        detector.close()
+        # Commits the offline cache's last group (the final events included)
+        mqtt.disconnect()
+
+
+async def _run_pipeline_async(
+    device_id: str,
+    model_dir: str | Path,
+    mqtt: MQTTClient,
+    noise_floor: float = 1e-4,
+    noise_ceiling: float = 1.0,
+    queue_size: int = 2,
+    backpressure: BackpressurePolicy = "drop_oldest",
+    health_interval_sec: float = 300.0,
+    metrics_file: str | Path | None = None,
+    channels: int = 1,
+    source: AudioSource | None = None,
+    **detector_options: Any,
 ) -> None:
-    analyzer = BirdNETAnalyzer(
-        model_dir=model_dir,
-        confidence_threshold=confidence_threshold,
+    """
+    _run_pipeline on one event loop (BIRDNET_ASYNC=1).
+
+    The audio callback wakes the loop with call_soon_threadsafe when it
+    queues a window; inference runs in a single-worker executor; publishing,
+    event flushing and the MQTT watchdog are tasks. Cancelling the
+    coroutine stops capture, publishes the events still open and waits for
+    the analysis in flight. When a finite source ends, the queued windows
+    are analysed and the runner shuts down the same way and returns.
+    """
+    loop = asyncio.get_running_loop()
+    outbox: asyncio.Queue[DetectionPayload] = asyncio.Queue()
+    detector = _Detector(
+        device_id,
+        model_dir,
+        lambda payload: loop.call_soon_threadsafe(outbox.put_nowait, payload),
+        channels=channels,
+        **detector_options,
+    )
+    ready = asyncio.Event()
+    queue = AnalysisQueue(
+        maxsize=queue_size,
+        policy=backpressure,
+        on_put=lambda: loop.call_soon_threadsafe(ready.set),
+        stats=detector.stats,
+        channels=channels,
+    )
+    executor = ThreadPoolExecutor(
+        max_workers=1, thread_name_prefix="birdwatch-analysis"
     )
+    stopping = threading.Event()
 
-    def on_buffer_ready(buffer: object) -> None:
-        import numpy as np
+    async def analyse() -> None:
+        while True:
+            await ready.wait()
+            ready.clear()
+            closed = queue.closed  # before draining: nothing is queued after it
+            while (item := queue.get(timeout=0)) is not None:
+                window, end_sample, window_channels = item
+                try:
+                    await loop.run_in_executor(
+                        executor,
+                        dispatch_window,
+                        detector.on_window,
+                        window,
+                        end_sample,
+                        window_channels,
+                    )
+                except Exception:
+                    queue.stats.errors += 1
+                    _log.exception("Analysis of buffered window failed")
+                else:
+                    queue.stats.processed += 1
+                finally:
+                    queue.release(window)
+            if closed:
+                return  # drained after the source ended
 
-        buf = np.asarray(buffer, dtype=np.float32)
-        results = analyzer.run(buf)
-        ts = datetime.now(tz=UTC).isoformat()
-        for idx, conf in results:
-            name = analyzer.species_name(idx)
-            # species_code: often 4-letter code; use first part of scientific name if needed
-            code = name.replace(" ", "_")[:10].lower()
-            payload = DetectionPayload(
-                device_id=device_id,
-                species_code=code,
-                scientific_name=name,
-                common_name=name,  # Enrichment can fill later
-                confidence=conf,
-                timestamp=ts,
-                lat=None,
-                lon=None,
-                audio_url=None,
-                image_url=None,
-            )
-            mqtt.publish(payload)
+    async def publish() -> None:
+        while True:
+            payload = await outbox.get()
+            await mqtt.publish_async(payload)
 
-    mqtt.start_watchdog()
-    run_recorder(
-        on_buffer_ready=on_buffer_ready,
+    async def flush_events() -> None:
+        while True:
+            await asyncio.sleep(detector.aggregator.flush_interval_sec)
+            detector.aggregator.flush()
+
+    async def watchdog() -> None:
+        while True:
+            # flush_cache() paces itself with blocking sleeps; keep it off the
+            # loop. Cancelling cannot stop the thread, so stopping does
+            timeout = await asyncio.to_thread(mqtt.watchdog_step, stopping)
+            was_online = mqtt.connected
+            deadline = loop.time() + timeout
+            while loop.time() < deadline:
+                await asyncio.sleep(min(1.0, deadline - loop.time()))
+                if mqtt.connected and not was_online:
+                    break  # connection resumed: drain the cache now
+
+    async def report_health() -> None:
+        while health_interval_sec > 0:
+            await asyncio.sleep(health_interval_sec)
+            _report_health(mqtt, device_id, metrics_file)
+
+    stream = open_input_stream(
+        queue,
         noise_floor=noise_floor,
         noise_ceiling=noise_ceiling,
+        hop_seconds=detector.hop_seconds,
+        clip_ring=detector.clip_ring,
+        source=source,
     )
 
+    async def capture() -> None:
+        # Poll like run_recorder; once a finite source ends, let analysis drain
+        while stream.active:
+            await asyncio.sleep(0.1)
+        queue.close()
+        ready.set()
+        await analysis
+
+    analysis = asyncio.create_task(analyse())
+    tasks = [analysis] + [
+        asyncio.create_task(coro())
+        for coro in (publish, flush_events, watchdog, report_health)
+    ]
+    try:
+        with stream:
+            capturing = asyncio.create_task(capture())
+            tasks.append(capturing)
+            pending = set(tasks)
+            while capturing in pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    task.result()  # re-raise a task's failure
+    finally:
+        queue.close()
+        stopping.set()  # a cache flush returns after its in-flight acks
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        executor.shutdown(wait=True)
+        detector.close()
+        await asyncio.sleep(0)  # let the payloads queued by close() arrive
+        while not outbox.empty():
+            await mqtt.publish_async(outbox.get_nowait())
+        # Commits the offline cache's last group (the final events included)
+        mqtt.disconnect()
+
+
+def _env_int(name: str) -> int | None:
+    value = os.environ.get(name)
+    return int(value) if value else None
+
 
 def main_pi() -> int:
     """Entry point for Pi: parse env and run pipeline."""
@@ -79,21 +746,140 @@ def main_pi() -> int:
     if not endpoint or not cert or not key:
         print("Set AWS_IOT_ENDPOINT, AWS_IOT_CERT_PATH, AWS_IOT_KEY_PATH for MQTT")
         return 1
-    mqtt = MQTTClient(
-        endpoint=endpoint,
-        client_id=client_id,
-        cert_path=cert,
-        key_path=key,
-        ca_path=os.environ.get("AWS_IOT_CA_PATH"),
-    )
-    try:
-        mqtt.connect()
-    except Exception as e:
-        print(f"MQTT connect failed (will use offline cache): {e}")
-    _run_pipeline(
-        device_id=device_id,
-        model_dir=model_dir,
-        mqtt=mqtt,
-        confidence_threshold=float(os.environ.get("BIRDNET_CONFIDENCE", "0.7")),
-    )
+    streaming_mel = os.environ.get("BIRDNET_STREAMING_MEL", "0") == "1"
+    analyzer_workers = int(os.environ.get("BIRDNET_ANALYZER_WORKERS", "1"))
+    if streaming_mel and analyzer_workers > 1:
+        print("BIRDNET_STREAMING_MEL=1 needs BIRDNET_ANALYZER_WORKERS=1")
+        return 1
+    channels = int(os.environ.get("BIRDNET_CHANNELS", "1"))
+    if channels < 1:
+        print("BIRDNET_CHANNELS must be at least 1")
+        return 1
+    if streaming_mel and channels > 1:
+        print("BIRDNET_STREAMING_MEL=1 needs BIRDNET_CHANNELS=1")
+        return 1
+    clip_format = os.environ.get("BIRDNET_CLIP_FORMAT", "flac")
+    if clip_format not in CLIP_FORMATS:
+        print(f"BIRDNET_CLIP_FORMAT must be one of {', '.join(CLIP_FORMATS)}")
+        return 1
+    processes = os.environ.get("BIRDNET_PROCESSES", "0") == "1"
+    if processes and os.environ.get("BIRDNET_ASYNC", "0") == "1":
+        print("BIRDNET_PROCESSES=1 and BIRDNET_ASYNC=1 are exclusive")
+        return 1
+    model_variant = os.environ.get("BIRDNET_MODEL_VARIANT", "auto")
+    if model_variant not in ("auto", *MODEL_VARIANTS):
+        print(
+            f"BIRDNET_MODEL_VARIANT must be auto or one of {', '.join(MODEL_VARIANTS)}"
+        )
+        return 1
+    source = None
+    audio_file = os.environ.get("BIRDNET_AUDIO_FILE")
+    if audio_file:
+        from birdwatch.sources import FileSource
+
+        speed = float(os.environ.get("BIRDNET_AUDIO_SPEED", "1"))
+        try:
+            source = FileSource(audio_file, speed=speed or None)
+        except (OSError, RuntimeError, ValueError) as e:
+            print(f"BIRDNET_AUDIO_FILE: {e}")
+            return 1
+    backpressure = os.environ.get("BIRDNET_BACKPRESSURE", "drop_oldest")
+    if backpressure not in BACKPRESSURE_POLICIES:
+        print(f"BIRDNET_BACKPRESSURE must be one of {', '.join(BACKPRESSURE_POLICIES)}")
+        return 1
+    wire_format = os.environ.get("BIRDNET_WIRE_FORMAT", "json")
+    if wire_format not in WIRE_FORMATS:
+        print(f"BIRDNET_WIRE_FORMAT must be one of {', '.join(WIRE_FORMATS)}")
+        return 1
+    top_k = int(os.environ.get("BIRDNET_TOP_K", "10"))
+    if top_k < 1:
+        print("BIRDNET_TOP_K must be >= 1")
+        return 1
+    flush_window = int(os.environ.get("BIRDNET_FLUSH_WINDOW", "32"))
+    if flush_window < 1:
+        print("BIRDNET_FLUSH_WINDOW must be >= 1")
+        return 1
+    mqtt_kwargs: dict[str, Any] = {
+        "endpoint": endpoint,
+        "client_id": client_id,
+        "cert_path": cert,
+        "key_path": key,
+        "ca_path": os.environ.get("AWS_IOT_CA_PATH"),
+        "cache_max_rows": _env_int("BIRDNET_CACHE_MAX_ROWS"),
+        "cache_max_bytes": _env_int("BIRDNET_CACHE_MAX_BYTES"),
+        "flush_window": flush_window,
+        "flush_batch_size": int(os.environ.get("BIRDNET_FLUSH_BATCH_SIZE", "1")),
+        "flush_max_messages_per_sec": float(os.environ.get("BIRDNET_FLUSH_RATE", "50")),
+        "wire_format": wire_format,
+    }
+    options: dict[str, Any] = {
+        "device_id": device_id,
+        "model_dir": model_dir,
+        "confidence_threshold": float(os.environ.get("BIRDNET_CONFIDENCE", "0.7")),
+        "hop_seconds": float(os.environ.get("BIRDNET_HOP_SECONDS", "3.0")),
+        "queue_size": int(os.environ.get("BIRDNET_QUEUE_SIZE", "2")),
+        "streaming_mel": streaming_mel,
+        "top_k": top_k,
+        "backpressure": cast("BackpressurePolicy", backpressure),
+        "event_gap_seconds": float(os.environ.get("BIRDNET_EVENT_GAP_SECONDS", "6")),
+        "event_max_seconds": float(os.environ.get("BIRDNET_EVENT_MAX_SECONDS", "60")),
+        "health_interval_sec": float(os.environ.get("BIRDNET_HEALTH_INTERVAL", "300")),
+        "metrics_file": os.environ.get("BIRDNET_METRICS_FILE"),
+        "analyzer_workers": analyzer_workers,
+        "tflite_threads": _env_int("BIRDNET_TFLITE_THREADS"),
+        "xnnpack": os.environ.get("BIRDNET_XNNPACK", "1") == "1",
+        "model_variant": model_variant,
+        "target_rtf": float(os.environ.get("BIRDNET_TARGET_RTF", "0.5")),
+        "model_profile": os.environ.get("BIRDNET_MODEL_PROFILE"),
+        "channels": channels,
+        "species_file": os.environ.get("BIRDNET_SPECIES_FILE"),
+        "species_min_frequency": float(
+            os.environ.get("BIRDNET_SPECIES_MIN_FREQUENCY", "0.03")
+        ),
+        "gate": os.environ.get("BIRDNET_GATE", "0") == "1",
+        "gate_snr_db": float(os.environ.get("BIRDNET_GATE_SNR_DB", "7")),
+        "gate_min_active_sec": float(os.environ.get("BIRDNET_GATE_MIN_ACTIVE", "0.07")),
+        "clip_dir": os.environ.get("BIRDNET_CLIP_DIR"),
+        "clip_max_bytes": int(
+            float(os.environ.get("BIRDNET_CLIP_MAX_MB", "200")) * 1e6
+        ),
+        "clip_pre_roll_sec": float(os.environ.get("BIRDNET_CLIP_PRE_ROLL", "1")),
+        "clip_post_roll_sec": float(os.environ.get("BIRDNET_CLIP_POST_ROLL", "1")),
+        "clip_ring_seconds": float(os.environ.get("BIRDNET_CLIP_RING_SECONDS", "30")),
+        "clip_format": clip_format,
+        "clip_upload_url": os.environ.get("BIRDNET_CLIP_UPLOAD_URL"),
+        "clip_upload_interval_sec": float(
+            os.environ.get("BIRDNET_CLIP_UPLOAD_INTERVAL", "60")
+        ),
+        "source": source,
+    }
+    metrics_port = _env_int("BIRDNET_METRICS_PORT")
+    if processes:
+        from birdwatch.pi.processes import run_pipeline_processes
+
+        # The publisher process builds (and connects) its own client
+        run_pipeline_processes(
+            mqtt_factory=partial(MQTTClient, **mqtt_kwargs),
+            metrics_port=metrics_port,
+            **options,
+        )
+        return 0
+    mqtt = MQTTClient(**mqtt_kwargs)
+
+    def connect() -> None:
+        try:
+            mqtt.connect()
+        except Exception as e:
+            print(f"MQTT connect failed (will use offline cache): {e}")
+
+    # Connect (and load the AWS IoT SDK) while the model loads; the
+    # watchdog retries with backoff if this attempt fails
+    threading.Thread(target=connect, name="birdwatch-connect", daemon=True).start()
+    options["mqtt"] = mqtt
+    if metrics_port:
+        REGISTRY.serve(metrics_port)
+    if os.environ.get("BIRDNET_ASYNC", "0") == "1":
+        asyncio.run(_run_pipeline_async(**options))
+    else:
+        _run_pipeline(**options)
     return 0
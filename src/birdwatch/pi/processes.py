@@ -0,0 +1,729 @@
+"""
+Multi-process Pi pipeline (BIRDNET_PROCESSES=1): capture, analysis and
+publishing run in separate processes around a SharedRingBuffer, under a
+Supervisor that restarts them.
+
+A slow publish, an SQLite commit or a GC pause in the analyzer no longer
+shares a GIL with the audio callback. Windows never travel through a pipe:
+the capture process writes audio into shared memory and announces each due
+window as (end sample, channels) in WindowSlots; analyzers claim windows
+and read them in place, and send only their results to the publisher, which
+owns the aggregator, clips and MQTTClient.
+
+Each child's metrics live in its own process: capture and the analyzers
+send a snapshot of theirs over their pipe every METRICS_INTERVAL_SEC (and on
+exit), and the publisher adds them to the ones it reports.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import logging
+import multiprocessing
+import signal
+import threading
+import time
+from dataclasses import dataclass
+from multiprocessing.connection import wait
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from birdwatch.metrics import REGISTRY
+from birdwatch.recorder import (
+    _STATS_METRICS,
+    BUFFER_SAMPLES,
+    SAMPLE_RATE,
+    SECONDS,
+    WindowScheduler,
+    _callback_seconds,
+    _noise_gate_ok,
+)
+from birdwatch.shared_ring import SharedRingBuffer
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from multiprocessing.connection import Connection
+    from multiprocessing.context import BaseContext
+
+    from birdwatch.mqtt_client import MQTTClient
+    from birdwatch.recorder import BackpressurePolicy
+    from birdwatch.sources import AudioSource
+
+_log = logging.getLogger(__name__)
+
+# How often capture and the analyzers send their metrics to the publisher
+METRICS_INTERVAL_SEC = 10.0
+
+
+@dataclass
+class RestartPolicy:
+    """
+    What the Supervisor does when a child exits with an error or stops
+    heartbeating: restart it after backoff_sec, doubled for each restart in
+    the last window_sec (capped at max_backoff_sec), and give up, stopping
+    the pipeline, once it has been restarted max_restarts times in
+    window_sec. A child is silent once its heartbeat is heartbeat_timeout_sec
+    old; the first heartbeat may take startup_grace_sec more (model load,
+    calibration).
+    """
+
+    max_restarts: int = 5
+    window_sec: float = 600.0
+    backoff_sec: float = 1.0
+    max_backoff_sec: float = 60.0
+    heartbeat_timeout_sec: float = 30.0
+    startup_grace_sec: float = 120.0
+
+    def delay(self, recent_restarts: int) -> float:
+        """Seconds to wait before the next restart."""
+        return min(self.backoff_sec * 2**recent_restarts, self.max_backoff_sec)
+
+
+class Heartbeat:
+    """A child's slot in the Supervisor's shared heartbeat array."""
+
+    def __init__(self, cells: Any, slot: int) -> None:
+        self._cells = cells
+        self._slot = slot
+
+    def beat(self) -> None:
+        """Tell the Supervisor this process is making progress."""
+        self._cells[self._slot] = time.monotonic()
+
+
+@dataclass
+class _Child:
+    name: str
+    target: Callable[..., None]
+    args: tuple[Any, ...]
+    process: multiprocessing.process.BaseProcess | None = None
+    restart_at: float | None = None
+    finished: bool = False
+
+
+def _child_main(target: Callable[..., None], *args: Any) -> None:
+    # Ctrl-C reaches the whole process group; the Supervisor shuts down in order
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    target(*args)
+
+
+class Supervisor:
+    """
+    Start child processes and keep them running under a RestartPolicy.
+
+    Each child is target(heartbeat, *args) in its own process (spawned by
+    default, so no threads or locks are inherited) and calls
+    heartbeat.beat() while it makes progress. poll() restarts children that
+    exit non-zero or whose heartbeat goes stale (they are killed first) and
+    reports those that exit 0 as finished. restarts[i] counts the restarts
+    of the i-th child added, in shared memory for the children to report.
+    """
+
+    def __init__(
+        self,
+        size: int,
+        policy: RestartPolicy | None = None,
+        ctx: BaseContext | None = None,
+    ) -> None:
+        self.policy = policy or RestartPolicy()
+        self.ctx = ctx or multiprocessing.get_context("spawn")
+        self.heartbeats = self.ctx.RawArray("d", size)
+        self.restarts = self.ctx.RawArray("i", size)
+        self._children: list[_Child] = []
+        self._history: dict[str, list[float]] = {}
+
+    def add(self, name: str, target: Callable[..., None], *args: Any) -> None:
+        """Register a child; it starts with start()."""
+        if len(self._children) == len(self.heartbeats):
+            raise ValueError(
+                f"Supervisor was sized for {len(self.heartbeats)} children"
+            )
+        slot = len(self._children)
+        child = _Child(name, target, (Heartbeat(self.heartbeats, slot), *args))
+        self._children.append(child)
+        self._history[name] = []
+
+    def start(self) -> None:
+        """Start every registered child."""
+        for child in self._children:
+            self._start(child)
+
+    def _start(self, child: _Child) -> None:
+        slot = self._children.index(child)
+        # Silent only after the startup grace plus one heartbeat timeout
+        self.heartbeats[slot] = time.monotonic() + self.policy.startup_grace_sec
+        child.process = self.ctx.Process(  # type: ignore[attr-defined]
+            target=_child_main,
+            args=(child.target, *child.args),
+            name=f"birdwatch-{child.name}",
+            daemon=True,
+        )
+        child.process.start()
+        child.restart_at = None
+
+    def _child(self, name: str) -> _Child:
+        return next(c for c in self._children if c.name == name)
+
+    def poll(self) -> list[str]:
+        """
+        Check every child once; return the names of those that finished
+        (exited 0) since the last poll. Raises RuntimeError when a child
+        needs more restarts than the policy allows.
+        """
+        now = time.monotonic()
+        finished = []
+        for slot, child in enumerate(self._children):
+            process = child.process
+            if child.finished:
+                continue
+            if process is None:
+                if child.restart_at is not None and now >= child.restart_at:
+                    _log.warning("Restarting %s", child.name)
+                    self.restarts[slot] += 1
+                    self._start(child)
+                continue
+            if process.is_alive():
+                age = now - self.heartbeats[slot]
+                if age <= self.policy.heartbeat_timeout_sec:
+                    continue
+                _log.error("%s silent for %.0f s; killing it", child.name, age)
+                process.kill()
+                process.join(5)
+            elif process.exitcode == 0:
+                child.finished = True
+                child.process = None
+                finished.append(child.name)
+                continue
+            else:
+                _log.error("%s exited with code %s", child.name, process.exitcode)
+            child.process = None
+            history = [
+                t for t in self._history[child.name] if now - t < self.policy.window_sec
+            ]
+            if len(history) >= self.policy.max_restarts:
+                raise RuntimeError(
+                    f"{child.name} failed {len(history) + 1} times in "
+                    f"{self.policy.window_sec:.0f} s; giving up"
+                )
+            child.restart_at = now + self.policy.delay(len(history))
+            self._history[child.name] = [*history, now]
+        return finished
+
+    def join(self, name: str, timeout: float) -> bool:
+        """
+        Wait up to timeout for the named child to exit (it is not
+        restarted); terminate it if it does not. Returns True if it exited.
+        """
+        child = self._child(name)
+        child.finished = True
+        process, child.process = child.process, None
+        if process is None:
+            return True
+        process.join(timeout)
+        if process.is_alive():
+            _log.warning("%s did not stop in %.0f s; terminating it", name, timeout)
+            process.terminate()
+            process.join(5)
+            return False
+        return True
+
+
+class WindowSlots:
+    """
+    Bounded queue of due windows, as (end_sample, channel mask) pairs in
+    shared memory, from the capture process to the analyzers.
+
+    put() applies the backpressure policy like AnalysisQueue: when full,
+    drop_oldest overwrites the oldest window (claim() skips it), drop_newest
+    discards the new one and block waits. claim() holds a lock only for a
+    few loads and stores, so an analyzer killed while waiting for work
+    cannot wedge the others (as one killed inside Queue.get can).
+    """
+
+    def __init__(self, size: int, ctx: BaseContext) -> None:
+        if size < 1:
+            raise ValueError("size must be >= 1")
+        self.size = size
+        # published, claimed, closed, then (end_sample, mask) per slot
+        self._cells = ctx.RawArray("q", 3 + 2 * size)
+        self._lock = ctx.Lock()
+        self._ready = ctx.Semaphore(0)
+
+    def __len__(self) -> int:
+        return max(0, min(self._cells[0] - self._cells[1], self.size))
+
+    def put(self, end_sample: int, mask: int, policy: BackpressurePolicy) -> bool:
+        """Queue a window; return False if a window was dropped to make room."""
+        cells = self._cells
+        full = len(self) >= self.size
+        if full and policy == "drop_newest":
+            return False
+        if full and policy == "block":
+            while len(self) >= self.size and not cells[2]:
+                time.sleep(0.01)
+            full = False
+        # Under the lock, so claim() never reads a slot half-written
+        with self._lock:
+            published = cells[0]
+            slot = 3 + 2 * (published % self.size)
+            cells[slot] = end_sample
+            cells[slot + 1] = mask
+            cells[0] = published + 1
+        self._ready.release()
+        return not full
+
+    def claim(self, timeout: float) -> tuple[int, int] | None:
+        """
+        Take the oldest queued window; None after timeout, or at once when
+        closed and drained.
+        """
+        if not self._ready.acquire(timeout=timeout):
+            return None
+        cells = self._cells
+        with self._lock:
+            published, claimed = cells[0], cells[1]
+            # Windows overwritten by drop_oldest are gone
+            claimed = max(claimed, published - self.size)
+            if claimed >= published:
+                cells[1] = claimed
+                if cells[2]:
+                    self._ready.release()  # wake the next analyzer to exit too
+                return None
+            slot = 3 + 2 * (claimed % self.size)
+            cells[1] = claimed + 1
+            return cells[slot], cells[slot + 1]
+
+    @property
+    def closed(self) -> bool:
+        return bool(self._cells[2])
+
+    def close(self) -> None:
+        """Let waiting analyzers drain the queue and exit."""
+        self._cells[2] = 1
+        self._ready.release()
+
+
+def _send_metrics(conn: Connection, sent: float | None = None) -> float:
+    """
+    Send this process's metrics snapshot to the publisher, unless the last
+    send (at monotonic time sent) was under METRICS_INTERVAL_SEC ago; return
+    the time of the last send.
+    """
+    now = time.monotonic()
+    if sent is not None and now - sent < METRICS_INTERVAL_SEC:
+        return sent
+    conn.send(("metrics", REGISTRY.snapshot()))
+    return now
+
+
+def _capture(
+    heartbeat: Heartbeat,
+    ring: SharedRingBuffer,
+    slots: WindowSlots,
+    metrics: Connection,
+    stop: Any,
+    source: AudioSource | None,
+    hop_seconds: float,
+    noise_floor: float,
+    noise_ceiling: float,
+    block_duration_ms: int,
+    backpressure: BackpressurePolicy,
+) -> None:
+    """
+    Capture process: write blocks to ring and announce due windows. Each
+    start re-anchors ring, which bumps its epoch: the audio is not
+    continuous with what came before.
+    """
+    if source is None:
+        from birdwatch.sources import SoundDeviceSource
+
+        source = SoundDeviceSource()
+    ring.anchor()
+    scheduler = WindowScheduler(hop_seconds)
+    skipped = 0
+
+    def callback(indata: Any, overflow: bool) -> None:
+        nonlocal skipped
+        start = time.perf_counter()
+        heartbeat.beat()
+        if overflow:
+            ring.count("overruns")
+        ring.write(indata)
+        if scheduler.advance(indata.shape[0]):
+            end = ring.total_samples
+            mask = 0
+            for c in range(ring.channels):
+                if _noise_gate_ok(
+                    ring.rms(end, BUFFER_SAMPLES, c), noise_floor, noise_ceiling
+                ):
+                    mask |= 1 << c
+            if mask:
+                accepted = slots.put(end, mask, backpressure)
+                if accepted or backpressure == "drop_oldest":
+                    ring.count("enqueued")
+                if not accepted:
+                    ring.count("dropped")
+                    scheduler.skip(scheduler.hop_samples)
+        ring.count("skipped_samples", scheduler.skipped_samples - skipped)
+        skipped = scheduler.skipped_samples
+        _callback_seconds.observe(time.perf_counter() - start)
+
+    block_samples = int(SAMPLE_RATE * block_duration_ms / 1000)
+    sent = time.monotonic()
+    with source.open(callback, ring.channels, block_samples) as stream:
+        while stream.active and not stop.is_set():
+            time.sleep(block_duration_ms / 1000)
+            sent = _send_metrics(metrics, sent)
+    _send_metrics(metrics)
+
+
+def _analyze(
+    heartbeat: Heartbeat,
+    ring: SharedRingBuffer,
+    slots: WindowSlots,
+    results: Connection,
+    model_dir: str | Path,
+    streaming: bool,
+    species_file: str | Path | None,
+    species_min_frequency: float,
+    gate: bool,
+    gate_snr_db: float,
+    gate_min_active_sec: float,
+    analyzer_kwargs: dict[str, Any],
+) -> None:
+    """
+    Analyzer process: claim windows, analyse them in place in ring, send
+    (end_sample, channels, results, outcome) to the publisher. The streaming
+    front end starts over whenever ring's epoch changes (capture restarted).
+    """
+    from birdwatch.analyzer import BirdNETAnalyzer
+    from birdwatch.gate import ActivityGate
+    from birdwatch.pi.main import _SpeciesFilter
+
+    species_filter = _SpeciesFilter(species_file, model_dir, species_min_frequency)
+    analyzer = BirdNETAnalyzer(
+        model_dir,
+        streaming=streaming,
+        species=species_filter.species,
+        gate=ActivityGate(gate_snr_db, gate_min_active_sec) if gate else None,
+        **analyzer_kwargs,
+    )
+    last_end: int | None = None
+    epoch = ring.epoch
+    sent = time.monotonic()
+    while True:
+        heartbeat.beat()
+        sent = _send_metrics(results, sent)
+        item = slots.claim(timeout=1.0)
+        if item is None:
+            if slots.closed and not len(slots):
+                _send_metrics(results)
+                return
+            continue
+        end, mask = item
+        species_filter.update(analyzer)
+        if ring.epoch != epoch:
+            epoch = ring.epoch
+            last_end = None
+        channels = tuple(c for c in range(ring.channels) if mask >> c & 1)
+        views = [ring.window(end, BUFFER_SAMPLES, c) for c in channels]
+        found: list[list[tuple[int, float]]] = []
+        outcome = "stale"  # overwritten before (or while) it was analysed
+        if all(v is not None for v in views):
+            try:
+                if ring.channels == 1:
+                    new = None if last_end is None else end - last_end
+                    found = [analyzer.run(views[0], new_samples=new)]  # type: ignore[arg-type]
+                else:
+                    # One interpreter invoke for all channels
+                    found = analyzer.run_batch(views)  # type: ignore[arg-type]
+                if ring.valid(end, BUFFER_SAMPLES):
+                    outcome = "processed"
+            except Exception:
+                _log.exception("Analysis of window ending at %d failed", end)
+                outcome = "errors"
+        views.clear()
+        last_end = end
+        if outcome != "processed":
+            found = []
+        results.send((end, channels, found, outcome))
+
+
+def _publish(
+    heartbeat: Heartbeat,
+    ring: SharedRingBuffer,
+    slots: WindowSlots,
+    connections: list[Connection],
+    done: Any,
+    restarts: Any,
+    names: list[str],
+    mqtt_factory: Callable[[], MQTTClient],
+    device_id: str,
+    labels_path: Path,
+    health_interval_sec: float,
+    metrics_file: str | Path | None,
+    metrics_port: int | None,
+    events_kwargs: dict[str, Any],
+) -> None:
+    """
+    Publisher process: turn analyzer results into events and publish them
+    (with clips cut from ring), add the other processes' metrics to its own
+    (connections are those of names, in order), report health, until done
+    is set and every result has been read.
+    """
+    from birdwatch.analyzer import _load_labels
+    from birdwatch.pi.main import _Events, _report_health
+
+    mqtt = mqtt_factory()
+
+    def connect() -> None:
+        try:
+            mqtt.connect()
+        except Exception as e:
+            _log.warning("MQTT connect failed (will use offline cache): %s", e)
+
+    threading.Thread(target=connect, name="birdwatch-connect", daemon=True).start()
+    mqtt.start_watchdog()
+    labels = _load_labels(labels_path)
+    events = _Events(
+        device_id,
+        mqtt.publish,
+        lambda i: labels[i] if 0 <= i < len(labels) else f"unknown_{i}",
+        clip_ring=ring,
+        **events_kwargs,
+    )
+    events.aggregator.start_flush_timer()
+    for field, name, help in _STATS_METRICS:
+        REGISTRY.counter(
+            f"birdwatch_{name}_total",
+            help,
+            lambda f=field: getattr(ring.stats(), f),
+        )
+    REGISTRY.gauge(
+        "birdwatch_queue_depth", "Windows waiting for analysis", slots.__len__
+    )
+    stale = REGISTRY.counter(
+        "birdwatch_windows_stale_total",
+        "Windows overwritten in the shared ring before they were analysed",
+    )
+    for role in sorted({n.split("-")[0] for n in names}):
+        slots_of_role = [i for i, n in enumerate(names) if n.split("-")[0] == role]
+        REGISTRY.counter(
+            f"birdwatch_{role}_restarts_total",
+            f"Restarts of the {role} process(es)",
+            lambda s=slots_of_role: sum(restarts[i] for i in s),
+        )
+
+    def pass_rate() -> float:
+        windows = REGISTRY.counter("birdwatch_gate_windows_total").value
+        passed = REGISTRY.counter("birdwatch_gate_passed_total").value
+        return round(passed / windows, 4) if windows else 1.0
+
+    if metrics_port:
+        REGISTRY.serve(metrics_port)
+    if health_interval_sec > 0:
+
+        def report_loop() -> None:
+            while True:
+                time.sleep(health_interval_sec)
+                _report_health(mqtt, device_id, metrics_file)
+
+        threading.Thread(
+            target=report_loop, name="birdwatch-health", daemon=True
+        ).start()
+    try:
+        while True:
+            heartbeat.beat()
+            ready = wait(connections, timeout=0.5)
+            if not ready and done.is_set():
+                break
+            for conn in ready:
+                message = conn.recv()  # type: ignore[union-attr]
+                if message[0] == "metrics":
+                    snapshot = message[1]
+                    REGISTRY.absorb(names[connections.index(conn)], snapshot)
+                    if "birdwatch_gate_pass_rate" in snapshot:
+                        # Over all analyzers, from the summed counters
+                        REGISTRY.gauge(
+                            "birdwatch_gate_pass_rate",
+                            "Fraction of windows the activity gate sent to the model",
+                            pass_rate,
+                        )
+                    continue
+                end, channels, found, outcome = message
+                if outcome == "stale":
+                    stale.inc()
+                    continue
+                ring.count(outcome)
+                # Capture (re)starts re-anchor the stream on the wall clock
+                events.capture_start = ring.capture_start
+                window_end = events.window_end(end)
+                for res, channel in zip(found, channels, strict=True):
+                    events.add(res, window_end, channel)
+    finally:
+        events.close()
+        # Commits the offline cache's last group (the final events included)
+        mqtt.disconnect()
+        if metrics_file:
+            # The last word, with every child's final snapshot
+            with contextlib.suppress(OSError):
+                REGISTRY.write(metrics_file)
+
+
+def run_pipeline_processes(
+    device_id: str,
+    model_dir: str | Path,
+    mqtt_factory: Callable[[], MQTTClient],
+    *,
+    noise_floor: float = 1e-4,
+    noise_ceiling: float = 1.0,
+    queue_size: int = 2,
+    backpressure: BackpressurePolicy = "drop_oldest",
+    health_interval_sec: float = 300.0,
+    metrics_file: str | Path | None = None,
+    metrics_port: int | None = None,
+    channels: int = 1,
+    source: AudioSource | None = None,
+    confidence_threshold: float = 0.7,
+    hop_seconds: float = 3.0,
+    streaming_mel: bool = False,
+    top_k: int = 10,
+    analyzer_workers: int = 1,
+    tflite_threads: int | None = None,
+    xnnpack: bool = True,
+    model_variant: str | None = None,
+    target_rtf: float = 0.5,
+    model_profile: str | Path | None = None,
+    species_file: str | Path | None = None,
+    species_min_frequency: float = 0.03,
+    gate: bool = False,
+    gate_snr_db: float = 7.0,
+    gate_min_active_sec: float = 0.07,
+    clip_ring_seconds: float = 30.0,
+    restart_policy: RestartPolicy | None = None,
+    start_method: str = "spawn",
+    **events_kwargs: Any,
+) -> None:
+    """
+    Run the pipeline as one capture process, analyzer_workers analyzer
+    processes and one publisher process until interrupted, or until a
+    finite source ends; raise RuntimeError if a process keeps failing (see
+    RestartPolicy). Options are those of _run_pipeline; event and clip
+    options (events_kwargs) go to the publisher's _Events.
+
+    The shared ring holds clip_ring_seconds when clips are on, and at least
+    enough for every queued and in-flight window. mqtt_factory builds the
+    MQTTClient in the publisher process (e.g. functools.partial(MQTTClient,
+    ...)); it and source must be picklable for the spawn start method.
+    """
+    from birdwatch.analyzer import frame_aligned_hop
+    from birdwatch.pi.main import _select_model
+
+    if streaming_mel and analyzer_workers > 1:
+        raise ValueError("streaming_mel needs a single analyzer process")
+    if streaming_mel:
+        hop_seconds = frame_aligned_hop(hop_seconds)
+    if model_variant == "auto":
+        model_variant, tflite_threads = _select_model(
+            model_dir,
+            model_profile,
+            hop_seconds=hop_seconds,
+            workers=analyzer_workers,
+            channels=channels,
+            tflite_threads=tflite_threads,
+            streaming_mel=streaming_mel,
+            target_rtf=target_rtf,
+            xnnpack=xnnpack,
+        )
+    ctx = multiprocessing.get_context(start_method)
+    in_flight = SECONDS + hop_seconds * (queue_size + analyzer_workers) + 1.0
+    clips = bool(events_kwargs.get("clip_dir"))
+    ring = SharedRingBuffer(
+        max(in_flight, clip_ring_seconds if clips else 0.0), channels
+    )
+    slots = WindowSlots(queue_size, ctx)
+    stop, done = ctx.Event(), ctx.Event()
+    supervisor = Supervisor(analyzer_workers + 2, restart_policy, ctx)
+    names = [
+        "capture",
+        *(f"analyzer-{i}" for i in range(analyzer_workers)),
+        "publisher",
+    ]
+    # One pipe per child slot, kept open here so restarts reuse it: capture's
+    # carries its metrics, each analyzer's its results and metrics
+    pipes = [ctx.Pipe(duplex=False) for _ in range(analyzer_workers + 1)]
+    supervisor.add(
+        "capture",
+        _capture,
+        ring,
+        slots,
+        pipes[0][1],
+        stop,
+        source,
+        hop_seconds,
+        noise_floor,
+        noise_ceiling,
+        100,
+        backpressure,
+    )
+    analyzer_kwargs = {
+        "confidence_threshold": confidence_threshold,
+        "top_k": top_k,
+        # Parallel processes run one thread each unless told otherwise
+        "num_threads": tflite_threads or (1 if analyzer_workers > 1 else None),
+        "xnnpack": xnnpack,
+        "variant": model_variant,
+        "batch_size": channels,
+    }
+    for i, (_, send) in enumerate(pipes[1:]):
+        supervisor.add(
+            f"analyzer-{i}",
+            _analyze,
+            ring,
+            slots,
+            send,
+            model_dir,
+            streaming_mel,
+            species_file,
+            species_min_frequency,
+            gate,
+            gate_snr_db,
+            gate_min_active_sec,
+            analyzer_kwargs,
+        )
+    supervisor.add(
+        "publisher",
+        _publish,
+        ring,
+        slots,
+        [recv for recv, _ in pipes],
+        done,
+        supervisor.restarts,
+        names,
+        mqtt_factory,
+        device_id,
+        Path(model_dir) / "labels.txt",
+        health_interval_sec,
+        metrics_file,
+        metrics_port,
+        events_kwargs,
+    )
+    supervisor.start()
+    try:
+        while "capture" not in supervisor.poll():
+            time.sleep(0.5)
+        _log.info("Audio source ended")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        # Stop capture, let the analyzers drain the queue, then the
+        # publisher the results; it publishes the open events on its way out
+        stop.set()
+        supervisor.join("capture", 5)
+        slots.close()
+        for name in names[1:-1]:
+            supervisor.join(name, 30)
+        done.set()
+        supervisor.join("publisher", 60)
+        ring.close()
+        ring.unlink()
@@ -0,0 +1,89 @@
+"""``birdwatch --startup-profile``: time a cold start up to the first inference."""
+
+from __future__ import annotations
+
+import contextlib
+import os
+import time
+from typing import Any
+
+
+def _process_age() -> float | None:
+    """Seconds since this process started (Linux /proc), or None if unknown."""
+    try:
+        with open("/proc/self/stat", encoding="ascii") as f:
+            # Fields after the parenthesised command name; starttime is field 22
+            fields = f.read().rsplit(")", 1)[1].split()
+        with open("/proc/uptime", encoding="ascii") as f:
+            uptime = float(f.read().split()[0])
+        return uptime - int(fields[19]) / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def profile_startup(
+    model_dir: str, start: float | None = None, **analyzer_kwargs: Any
+) -> list[tuple[str, float]]:
+    """
+    Run the Pi pipeline's startup steps once and return (step, seconds) for
+    each, in order: importing the pipeline, loading the AWS IoT SDK, loading
+    the model, and the first and second inference on a silent window. start
+    is the perf_counter() time to measure the first step from (default: now).
+    """
+    steps: list[tuple[str, float]] = []
+    last = time.perf_counter() if start is None else start
+
+    def mark(step: str) -> None:
+        nonlocal last
+        now = time.perf_counter()
+        steps.append((step, now - last))
+        last = now
+
+    import numpy as np
+
+    import birdwatch.pi.main  # noqa: F401
+    from birdwatch.analyzer import INPUT_SAMPLES, BirdNETAnalyzer
+    from birdwatch.mqtt_client import _load_mqtt
+
+    mark("import pipeline")
+    with contextlib.suppress(RuntimeError):  # SDK not installed: nothing to load
+        _load_mqtt()
+    mark("load AWS IoT SDK")
+    analyzer = BirdNETAnalyzer(model_dir=model_dir, **analyzer_kwargs)
+    mark("load model")
+    window = np.zeros(INPUT_SAMPLES, dtype=np.float32)
+    analyzer.run(window)
+    mark("first inference")
+    analyzer.run(window)
+    mark("second inference")
+    return steps
+
+
+def main_startup_profile(start: float | None = None) -> int:
+    """
+    Entry point for ``birdwatch --startup-profile``. start is the
+    perf_counter() time at which the CLI was entered.
+    """
+    entered = time.perf_counter()
+    age = _process_age()
+    start = entered if start is None else start
+    model_dir = os.environ.get("BIRDNET_MODEL_DIR")
+    if not model_dir:
+        print("Set BIRDNET_MODEL_DIR to profile startup")
+        return 1
+    threads = os.environ.get("BIRDNET_TFLITE_THREADS")
+    steps = profile_startup(
+        model_dir,
+        start,
+        num_threads=int(threads) if threads else None,
+        xnnpack=os.environ.get("BIRDNET_XNNPACK", "1") == "1",
+    )
+    if age is not None:
+        # Interpreter start-up and imports before the CLI was entered
+        steps.insert(0, ("python startup", max(0.0, age - (entered - start))))
+    first = next(i for i, (step, _) in enumerate(steps) if step == "first inference")
+    for step, seconds in steps:
+        print(f"{step:28s} {seconds * 1000:9.1f} ms")
+    total = sum(seconds for _, seconds in steps[: first + 1])
+    print(f"{'time to first inference':28s} {total * 1000:9.1f} ms")
+    return 0
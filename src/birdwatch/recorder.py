@@ -2,14 +2,29 @@
 
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
+import logging
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Literal
 
 import numpy as np
-import sounddevice as sd
+
+from birdwatch.metrics import REGISTRY
 
 if TYPE_CHECKING:
     from collections.abc import Callable
 
+    from birdwatch.clips import ClipRing
+    from birdwatch.sources import AudioSource, AudioStream
+
+_log = logging.getLogger(__name__)
+
+_callback_seconds = REGISTRY.histogram(
+    "birdwatch_audio_callback_seconds", "Audio callback duration"
+)
+
 # BirdNET expects 48 kHz mono, 3 s
 SAMPLE_RATE = 48_000
 CHANNELS = 1
@@ -17,20 +32,40 @@ DTYPE = np.float32
 SECONDS = 3.0
 BUFFER_SAMPLES = int(SAMPLE_RATE * SECONDS)
 
+# What AnalysisQueue.put does when the queue is full
+BackpressurePolicy = Literal["drop_oldest", "drop_newest", "block"]
+BACKPRESSURE_POLICIES: tuple[str, ...] = ("drop_oldest", "drop_newest", "block")
+
 
 class RingBuffer:
     """
     Lock-free ring buffer for continuous 48 kHz mono float32 audio.
 
     Holds exactly BUFFER_SAMPLES (3 s at 48 kHz). New samples overwrite oldest.
+    Reads never allocate unless asked to: read_into() fills a caller buffer,
+    segments() returns views, and snapshot() cycles through `snapshots`
+    preallocated buffers (double-buffered by default). RMS is kept as a
+    running sum of squares updated in write().
     """
 
-    __slots__ = ("_buf", "_idx", "_full")
+    __slots__ = ("_buf", "_idx", "_full", "_sumsq", "_snapshots", "_snap_idx")
 
-    def __init__(self) -> None:
+    def __init__(self, snapshots: int = 2) -> None:
         self._buf: np.ndarray = np.zeros(BUFFER_SAMPLES, dtype=DTYPE)
         self._idx = 0
         self._full = False
+        self._sumsq = 0.0
+        self._snapshots = [
+            np.empty(BUFFER_SAMPLES, dtype=DTYPE) for _ in range(snapshots)
+        ]
+        self._snap_idx = 0
+
+    def _store(self, start: int, data: np.ndarray) -> None:
+        """Copy data to _buf[start:], swapping its energy into the running sum."""
+        seg = self._buf[start : start + data.size]
+        self._sumsq -= float(np.dot(seg, seg))
+        seg[:] = data
+        self._sumsq += float(np.dot(seg, seg))
 
     def write(self, chunk: np.ndarray) -> None:
         """Append chunk (1D float32); may wrap around."""
@@ -39,26 +74,101 @@ class RingBuffer:
             self._buf[:] = chunk[-BUFFER_SAMPLES:]
             self._idx = 0
             self._full = True
+            self._sumsq = float(np.dot(self._buf, self._buf))
             return
         k = min(n, BUFFER_SAMPLES - self._idx)
-        self._buf[self._idx : self._idx + k] = chunk[:k]
+        self._store(self._idx, chunk[:k])
         self._idx = (self._idx + k) % BUFFER_SAMPLES
         if n > k:
-            self._buf[: n - k] = chunk[k:]
+            self._store(0, chunk[k:])
             self._idx = n - k
         if self._idx == 0 or n > k:
             self._full = True
+            # Once per lap, resum so float round-off in the running sum cannot drift
+            self._sumsq = float(np.dot(self._buf, self._buf))
+
+    def segments(self) -> tuple[np.ndarray, np.ndarray]:
+        """Return (older, newer) views whose concatenation equals read(); no copy."""
+        if not self._full:
+            return self._buf, self._buf[:0]
+        return self._buf[self._idx :], self._buf[: self._idx]
+
+    def read_into(self, out: np.ndarray) -> np.ndarray:
+        """Fill preallocated out (BUFFER_SAMPLES float32) in chronological order."""
+        older, newer = self.segments()
+        k = older.size
+        out[:k] = older
+        out[k:] = newer
+        return out
 
     def read(self) -> np.ndarray:
         """Return a copy of the current 3 s buffer in chronological order."""
-        if not self._full:
-            return self._buf.copy()
-        return np.roll(self._buf, -self._idx)
+        return self.read_into(np.empty(BUFFER_SAMPLES, dtype=DTYPE))
+
+    def snapshot(self) -> np.ndarray:
+        """
+        Return the current window in the next preallocated snapshot buffer.
+
+        The array stays valid until `snapshots` further calls, so with the
+        default double buffering a consumer can hold one window while the
+        next is taken.
+        """
+        if not self._snapshots:
+            return self.read()
+        out = self._snapshots[self._snap_idx]
+        self._snap_idx = (self._snap_idx + 1) % len(self._snapshots)
+        return self.read_into(out)
 
     def rms(self) -> float:
-        """Root-mean-square amplitude of current buffer (noise gate)."""
-        view = self.read()
-        return float(np.sqrt(np.mean(view * view)))
+        """Root-mean-square amplitude of current buffer (noise gate); O(1)."""
+        return float(np.sqrt(max(self._sumsq, 0.0) / BUFFER_SAMPLES))
+
+
+class WindowScheduler:
+    """
+    Decide when the ring holds a new analysis window, counting samples.
+
+    The first window is due once window_samples have been written, then one
+    every hop_samples (hop == window means no overlap; a 1 s hop on a 3 s
+    window overlaps by 2 s). If several hops elapse between checks, only the
+    latest window is due and the hops in between count as skipped, as do
+    windows the consumer could not accept (see skip()).
+    """
+
+    __slots__ = (
+        "hop_samples",
+        "window_samples",
+        "total_samples",
+        "skipped_samples",
+        "_next_due",
+    )
+
+    def __init__(
+        self,
+        hop_seconds: float = SECONDS,
+        window_samples: int = BUFFER_SAMPLES,
+    ) -> None:
+        self.hop_samples = round(hop_seconds * SAMPLE_RATE)
+        if self.hop_samples < 1:
+            raise ValueError("hop_seconds must be positive")
+        self.window_samples = window_samples
+        self.total_samples = 0
+        self.skipped_samples = 0
+        self._next_due = window_samples
+
+    def advance(self, n: int) -> bool:
+        """Account for n newly written samples; return True if a window is due."""
+        self.total_samples += n
+        if self.total_samples < self._next_due:
+            return False
+        hops = (self.total_samples - self._next_due) // self.hop_samples + 1
+        self.skipped_samples += (hops - 1) * self.hop_samples
+        self._next_due += hops * self.hop_samples
+        return True
+
+    def skip(self, n: int) -> None:
+        """Record n samples of new audio that were never analysed downstream."""
+        self.skipped_samples += n
 
 
 def _noise_gate_ok(rms: float, floor: float, ceiling: float) -> bool:
@@ -66,39 +176,362 @@ def _noise_gate_ok(rms: float, floor: float, ceiling: float) -> bool:
     return floor <= rms <= ceiling
 
 
+@dataclass
+class RecorderStats:
+    """Counters for the capture → analysis hand-off (read them from any thread)."""
+
+    overruns: int = 0  # input overflows (audio lost) reported by the source
+    enqueued: int = 0  # windows accepted by the analysis queue
+    dropped: int = 0  # windows discarded by the backpressure policy
+    processed: int = 0  # windows analysed by the worker
+    errors: int = 0  # windows whose analysis raised
+    skipped_samples: int = 0  # new audio never analysed because the consumer lagged
+
+
+class AnalysisQueue:
+    """
+    Bounded queue of 3 s windows between the audio callback and the worker.
+
+    When full, ``policy`` decides what happens to a new window:
+    ``drop_oldest`` discards the oldest queued window, ``drop_newest``
+    discards the incoming one, and ``block`` waits for space (this stalls the
+    audio callback, so input overruns show up in ``stats.overruns``).
+
+    Window buffers are recycled: acquire() hands out a free preallocated
+    buffer, and dropped or released() windows go back to the free list, so
+    steady-state capture does not allocate.
+
+    on_put, if given, is called (on the producer's thread) after each queued
+    window, e.g. to wake an asyncio consumer with loop.call_soon_threadsafe.
+
+    With channels > 1, buffers are (channels, BUFFER_SAMPLES) and each put()
+    names the input channels its leading rows hold.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 2,
+        policy: BackpressurePolicy = "drop_oldest",
+        stats: RecorderStats | None = None,
+        on_put: Callable[[], None] | None = None,
+        channels: int = CHANNELS,
+    ) -> None:
+        if maxsize < 1:
+            raise ValueError("maxsize must be >= 1")
+        if policy not in BACKPRESSURE_POLICIES:
+            raise ValueError(
+                f"policy must be one of {', '.join(BACKPRESSURE_POLICIES)}; got {policy!r}"
+            )
+        self.maxsize = maxsize
+        self.policy = policy
+        self.stats = stats or RecorderStats()
+        self.on_put = on_put
+        self.channels = channels
+        self._items: deque[tuple[np.ndarray, int, tuple[int, ...] | None]] = deque()
+        self._free: list[np.ndarray] = []
+        self._cond = threading.Condition()
+        self._closed = False
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def acquire(self) -> np.ndarray:
+        """
+        Return a free window buffer to fill and put(): BUFFER_SAMPLES float32,
+        or (channels, BUFFER_SAMPLES) for a multi-channel queue.
+        """
+        with self._cond:
+            if self._free:
+                return self._free.pop()
+        if self.channels > 1:
+            return np.empty((self.channels, BUFFER_SAMPLES), dtype=DTYPE)
+        return np.empty(BUFFER_SAMPLES, dtype=DTYPE)
+
+    def release(self, window: np.ndarray) -> None:
+        """Return a consumed window buffer to the free list."""
+        with self._cond:
+            # Queued + in flight + being filled bounds the buffers ever needed
+            if len(self._free) < self.maxsize + 2:
+                self._free.append(window)
+
+    def put(
+        self,
+        window: np.ndarray,
+        end_sample: int = 0,
+        channels: tuple[int, ...] | None = None,
+    ) -> bool:
+        """
+        Queue window, tagged with its stream position (samples written up to
+        and including its last sample) and, for multi-channel windows, the
+        channel of each filled row; return False if a window was dropped to
+        make room.
+        """
+        with self._cond:
+            if self._closed:
+                return False
+            dropped = False
+            if len(self._items) >= self.maxsize:
+                if self.policy == "drop_newest":
+                    self._free.append(window)
+                    self.stats.dropped += 1
+                    return False
+                if self.policy == "drop_oldest":
+                    self._free.append(self._items.popleft()[0])
+                    self.stats.dropped += 1
+                    dropped = True
+                else:
+                    self._cond.wait_for(
+                        lambda: len(self._items) < self.maxsize or self._closed
+                    )
+                    if self._closed:
+                        return False
+            self._items.append((window, end_sample, channels))
+            self.stats.enqueued += 1
+            self._cond.notify_all()
+        if self.on_put is not None:
+            self.on_put()
+        return not dropped
+
+    def get(
+        self, timeout: float | None = None
+    ) -> tuple[np.ndarray, int, tuple[int, ...] | None] | None:
+        """
+        Pop the oldest (window, end_sample, channels); None on timeout or
+        once drained. channels is None for mono windows.
+        """
+        with self._cond:
+            if not self._cond.wait_for(
+                lambda: self._items or self._closed, timeout=timeout
+            ):
+                return None
+            if not self._items:
+                return None
+            item = self._items.popleft()
+            self._cond.notify_all()
+            return item
+
+    @property
+    def closed(self) -> bool:
+        """True once close() has been called."""
+        return self._closed
+
+    def close(self) -> None:
+        """Wake all waiters; the worker exits after draining queued windows."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+
+def dispatch_window(
+    on_window: Callable[..., None],
+    window: np.ndarray,
+    end_sample: int,
+    channels: tuple[int, ...] | None,
+) -> None:
+    """
+    Call on_window(window, end_sample) for a mono window, or
+    on_window(rows, end_sample, channels) with the filled rows of a
+    multi-channel one.
+    """
+    if channels is None:
+        on_window(window, end_sample)
+    else:
+        on_window(window[: len(channels)], end_sample, channels)
+
+
+def start_analysis_worker(
+    queue: AnalysisQueue,
+    on_window: Callable[..., None],
+) -> threading.Thread:
+    """
+    Start a daemon thread that drains queue into on_window until closed
+    (see dispatch_window for the arguments).
+
+    Each window is released back to the queue's pool once on_window
+    returns; copy it if it must outlive the call.
+    """
+
+    def run() -> None:
+        while (item := queue.get()) is not None:
+            window, end_sample, channels = item
+            try:
+                dispatch_window(on_window, window, end_sample, channels)
+            except Exception:
+                queue.stats.errors += 1
+                _log.exception("Analysis of buffered window failed")
+            else:
+                queue.stats.processed += 1
+            finally:
+                queue.release(window)
+
+    t = threading.Thread(target=run, name="birdwatch-analysis", daemon=True)
+    t.start()
+    return t
+
+
+# RecorderStats field, metric name (birdwatch_<name>_total), help
+_STATS_METRICS = (
+    ("overruns", "audio_overruns", "Audio input overflows"),
+    ("enqueued", "windows_enqueued", "Windows queued for analysis"),
+    ("dropped", "windows_dropped", "Windows dropped by the backpressure policy"),
+    ("processed", "windows_processed", "Windows analysed"),
+    ("errors", "window_errors", "Windows whose analysis raised"),
+    ("skipped_samples", "skipped_samples", "New audio samples never analysed"),
+)
+
+
+def _register_queue_metrics(queue: AnalysisQueue) -> None:
+    """Expose queue depth and RecorderStats counters through the registry."""
+    stats = queue.stats
+    REGISTRY.gauge(
+        "birdwatch_queue_depth", "Windows waiting for analysis", queue.__len__
+    )
+    for field, name, help in _STATS_METRICS:
+        REGISTRY.counter(
+            f"birdwatch_{name}_total", help, lambda f=field: getattr(stats, f)
+        )
+
+
+def _without_position(
+    on_buffer_ready: Callable[[np.ndarray], None],
+) -> Callable[[np.ndarray, int], None]:
+    def on_window(window: np.ndarray, _end_sample: int) -> None:
+        on_buffer_ready(window)
+
+    return on_window
+
+
 def run_recorder(
     *,
-    on_buffer_ready: Callable[[np.ndarray], None],
+    on_buffer_ready: Callable[[np.ndarray], None] | None = None,
+    on_window: Callable[..., None] | None = None,
     noise_floor: float = 1e-4,
     noise_ceiling: float = 1.0,
     block_duration_ms: int = 100,
+    hop_seconds: float = SECONDS,
+    queue_size: int = 2,
+    backpressure: BackpressurePolicy = "drop_oldest",
+    stats: RecorderStats | None = None,
+    channels: int = CHANNELS,
+    clip_ring: ClipRing | None = None,
+    source: AudioSource | None = None,
 ) -> None:
     """
-    Run blocking recorder: capture 48 kHz mono, maintain ring buffer, call
-    on_buffer_ready with 3 s float32 array when ready; skip if RMS outside
-    [noise_floor, noise_ceiling].
+    Run blocking recorder: capture 48 kHz mono, maintain ring buffer, and
+    queue a 3 s float32 window for on_buffer_ready every hop_seconds of new
+    audio; skip if RMS outside [noise_floor, noise_ceiling].
+
+    on_buffer_ready runs on a dedicated worker thread, never on the audio
+    callback. At most queue_size windows wait for it; backpressure selects
+    what happens when it falls behind (see AnalysisQueue). Pass stats to
+    observe overrun, drop and skipped-sample counters while the recorder runs.
+    Window arrays come from a recycled pool and are reused once
+    on_buffer_ready returns.
+
+    Pass on_window instead of on_buffer_ready to also receive each window's
+    stream position (samples captured up to its last sample); the difference
+    between consecutive positions is how much of a window is new audio.
+
+    With channels > 1, every input channel gets its own ring and noise gate,
+    and on_window(windows, end_sample, channel_ids) receives one row per
+    channel that passed the gate, so the consumer can analyse them in one
+    batch. clip_ring, if given, receives every captured block (see
+    open_input_stream).
+
+    source defaults to the microphone (SoundDeviceSource). With a finite
+    source (a file, a synthetic signal of given length) the recorder returns
+    once it ends and the queued windows are analysed.
     """
-    ring = RingBuffer()
+    if on_window is None:
+        if channels > 1:
+            raise ValueError("multi-channel capture needs on_window")
+        if on_buffer_ready is None:
+            raise ValueError("on_buffer_ready or on_window is required")
+        on_window = _without_position(on_buffer_ready)
+    elif on_buffer_ready is not None:
+        raise ValueError("pass only one of on_buffer_ready or on_window")
+    queue = AnalysisQueue(
+        maxsize=queue_size, policy=backpressure, stats=stats, channels=channels
+    )
+    worker = start_analysis_worker(queue, on_window)
+    try:
+        with open_input_stream(
+            queue,
+            noise_floor=noise_floor,
+            noise_ceiling=noise_ceiling,
+            block_duration_ms=block_duration_ms,
+            hop_seconds=hop_seconds,
+            clip_ring=clip_ring,
+            source=source,
+        ) as stream:
+            while stream.active:
+                time.sleep(block_duration_ms / 1000)
+    finally:
+        queue.close()
+        worker.join(timeout=5)
+
+
+def open_input_stream(
+    queue: AnalysisQueue,
+    *,
+    noise_floor: float = 1e-4,
+    noise_ceiling: float = 1.0,
+    block_duration_ms: int = 100,
+    hop_seconds: float = SECONDS,
+    clip_ring: ClipRing | None = None,
+    source: AudioSource | None = None,
+) -> AudioStream:
+    """
+    Return a (not yet started) stream from source (default: the microphone)
+    whose callback keeps a ring buffer and puts a 3 s window on queue every hop_seconds of new audio
+    that passes the noise gate. Use it as a context manager; the consumer
+    drains queue (see run_recorder for the threaded one).
+
+    Captures queue.channels channels, each with its own ring and gate; all
+    channels share one window schedule, and the channels that pass are
+    copied into one queued buffer. If clip_ring is given, every block is
+    also appended to it (for detection clips with pre/post roll).
+    """
+    if source is None:
+        from birdwatch.sources import SoundDeviceSource
+
+        source = SoundDeviceSource()
+    n_channels = queue.channels
+    rings = [RingBuffer(snapshots=0) for _ in range(n_channels)]
+    scheduler = WindowScheduler(hop_seconds)
     block_samples = int(SAMPLE_RATE * block_duration_ms / 1000)
+    _register_queue_metrics(queue)
 
-    def callback(
-        indata: np.ndarray,
-        _frames: int,
-        _time: object,
-        _status: sd.CallbackFlags,
-    ) -> None:
-        chunk = indata[:, 0].astype(DTYPE) if indata.ndim > 1 else indata.astype(DTYPE)
-        ring.write(chunk)
-        rms = ring.rms()
-        if _noise_gate_ok(rms, noise_floor, noise_ceiling):
-            on_buffer_ready(ring.read())
-
-    with sd.InputStream(
-        samplerate=SAMPLE_RATE,
-        channels=CHANNELS,
-        dtype=DTYPE,
-        blocksize=block_samples,
-        callback=callback,
-    ):
-        while True:
-            sd.sleep(int(block_duration_ms))
+    def callback(indata: np.ndarray, overflow: bool) -> None:
+        start = time.perf_counter()
+        if overflow:
+            queue.stats.overruns += 1
+        if indata.ndim == 1:
+            indata = indata[:, np.newaxis]
+        for c, ring in enumerate(rings):
+            ring.write(indata[:, c])
+        if clip_ring is not None:
+            clip_ring.write(indata)
+        active: list[int] = []
+        if scheduler.advance(indata.shape[0]):
+            active = [
+                c
+                for c, ring in enumerate(rings)
+                if _noise_gate_ok(ring.rms(), noise_floor, noise_ceiling)
+            ]
+        if active:
+            window = queue.acquire()
+            if n_channels == 1:
+                accepted = queue.put(
+                    rings[0].read_into(window), scheduler.total_samples
+                )
+            else:
+                for row, c in enumerate(active):
+                    rings[c].read_into(window[row])
+                accepted = queue.put(window, scheduler.total_samples, tuple(active))
+            if not accepted:
+                scheduler.skip(scheduler.hop_samples)
+        queue.stats.skipped_samples = scheduler.skipped_samples
+        _callback_seconds.observe(time.perf_counter() - start)
+
+    return source.open(callback, n_channels, block_samples)
@@ -0,0 +1,187 @@
+"""Audio ring buffer in shared memory, written by one process and read by others."""
+
+from __future__ import annotations
+
+import contextlib
+import time
+from dataclasses import fields
+from multiprocessing import shared_memory
+from typing import Any
+
+import numpy as np
+
+from birdwatch.recorder import DTYPE, SAMPLE_RATE, RecorderStats
+
+# Header slots (int64). Counters mirror RecorderStats; each has one writer
+# (the capture process for overruns..skipped_samples, the publisher for the
+# rest), so plain stores are enough.
+_CHANNELS, _CAPACITY, _TOTAL, _START_NS, _EPOCH = range(5)
+_COUNTERS = {f.name: 5 + i for i, f in enumerate(fields(RecorderStats))}
+_HEADER = 5 + len(_COUNTERS)
+
+
+class SharedRingBuffer:
+    """
+    The last `seconds` of multi-channel 48 kHz float32 audio in a
+    multiprocessing.shared_memory block: one capture process writes, any
+    number of processes read.
+
+    Every sample is stored twice, capacity apart, so any span of up to
+    capacity samples is one contiguous view: window() hands analyzers
+    their input without a copy. total_samples (the sequence counter) is
+    published only after a block's samples are in place. Readers never
+    lock; they check valid() after using a view, since the writer may have
+    lapped it meanwhile (the newest `margin_sec` of capacity is kept as
+    slack for that). read() has ClipRing's signature, so detection clips
+    can be cut from the same memory.
+
+    Pickling (e.g. as a multiprocessing.Process argument) attaches to the
+    same block by name. The creating process calls unlink() when done.
+    """
+
+    def __init__(
+        self,
+        seconds: float = 30.0,
+        channels: int = 1,
+        *,
+        name: str | None = None,
+        margin_sec: float = 1.0,
+    ) -> None:
+        if name is None:
+            capacity = int(seconds * SAMPLE_RATE)
+            if capacity <= margin_sec * SAMPLE_RATE:
+                raise ValueError(f"ring must hold more than {margin_sec} s")
+            size = 8 * _HEADER + 4 * channels * 2 * capacity
+            self._shm = shared_memory.SharedMemory(create=True, size=size)
+            self._owner = True
+            self._header = np.ndarray((_HEADER,), np.int64, self._shm.buf)
+            self._header[:] = 0
+            self._header[_CHANNELS] = channels
+            self._header[_CAPACITY] = capacity
+        else:
+            self._shm = shared_memory.SharedMemory(name=name)
+            self._owner = False
+            self._header = np.ndarray((_HEADER,), np.int64, self._shm.buf)
+        self.channels = int(self._header[_CHANNELS])
+        self.capacity = int(self._header[_CAPACITY])
+        self.margin_sec = margin_sec
+        self._margin = int(margin_sec * SAMPLE_RATE)
+        self._buf = np.ndarray(
+            (self.channels, 2 * self.capacity), DTYPE, self._shm.buf, offset=8 * _HEADER
+        )
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        return (_attach, (self._shm.name, self.margin_sec))
+
+    @property
+    def name(self) -> str:
+        """Name of the shared memory block (see SharedRingBuffer(name=...))."""
+        return self._shm.name
+
+    @property
+    def total_samples(self) -> int:
+        """Samples written per channel since the ring was created."""
+        return int(self._header[_TOTAL])
+
+    @property
+    def epoch(self) -> int:
+        """Number of anchor() calls: changes whenever the audio is discontinuous."""
+        return int(self._header[_EPOCH])
+
+    @property
+    def capture_start(self) -> float:
+        """Epoch seconds at stream position 0 (see anchor())."""
+        return int(self._header[_START_NS]) / 1e9
+
+    def anchor(self, now: float | None = None) -> None:
+        """
+        Tie the current stream position to now (epoch seconds) and bump
+        epoch; the writer calls this whenever capture (re)starts, before
+        writing.
+        """
+        now = time.time() if now is None else now
+        self._header[_START_NS] = round((now - self.total_samples / SAMPLE_RATE) * 1e9)
+        self._header[_EPOCH] += 1
+
+    def write(self, block: np.ndarray) -> None:
+        """Append a (frames, channels) or 1-D block."""
+        if block.ndim == 1:
+            block = block[:, np.newaxis]
+        cap = self.capacity
+        written = block.shape[0]
+        block = block[-cap:]
+        n = block.shape[0]
+        start = (self.total_samples + written - n) % cap
+        # Both copies: [start, start + n) and the same span shifted by cap,
+        # wrapped into the doubled buffer
+        self._buf[:, start : start + n] = block.T
+        second = (start + cap) % (2 * cap)
+        k = min(n, 2 * cap - second)
+        self._buf[:, second : second + k] = block[:k].T
+        self._buf[:, : n - k] = block[k:].T
+        # Publish the new position only after the samples are in place
+        self._header[_TOTAL] += written
+
+    def valid(self, end_sample: int, n: int) -> bool:
+        """True while samples [end_sample - n, end_sample) are still held."""
+        return (
+            end_sample <= self.total_samples
+            and self.total_samples - (end_sample - n) <= self.capacity - self._margin
+        )
+
+    def window(self, end_sample: int, n: int, channel: int = 0) -> np.ndarray | None:
+        """
+        View of channel's samples [end_sample - n, end_sample), no copy;
+        None if they are not (or no longer) held. Check valid() again after
+        using the view.
+        """
+        if end_sample < n or not self.valid(end_sample, n):
+            return None
+        start = (end_sample - n) % self.capacity
+        return self._buf[channel, start : start + n]
+
+    def read(self, end_sample: int, n: int, channel: int = 0) -> np.ndarray | None:
+        """
+        Copy of channel's samples [end_sample - n, end_sample), trimmed to
+        what has been captured; None if they are no longer held.
+        """
+        start = max(0, end_sample - n)
+        end = min(end_sample, self.total_samples)
+        view = self.window(end, end - start, channel) if end > start else None
+        if view is None:
+            return None
+        out = view.copy()
+        return out if self.valid(end, end - start) else None
+
+    def rms(self, end_sample: int, n: int, channel: int = 0) -> float:
+        """Root-mean-square of channel's span (for the noise gate); 0 if not held."""
+        view = self.window(end_sample, n, channel)
+        if view is None:
+            return 0.0
+        return float(np.sqrt(np.dot(view, view) / n))
+
+    def count(self, counter: str, n: int = 1) -> None:
+        """Add n to a RecorderStats counter kept in the header."""
+        self._header[_COUNTERS[counter]] += n
+
+    def stats(self) -> RecorderStats:
+        """Snapshot of the header counters."""
+        return RecorderStats(
+            **{name: int(self._header[i]) for name, i in _COUNTERS.items()}
+        )
+
+    def close(self) -> None:
+        """Detach this process's mapping."""
+        self._buf = self._header = None  # type: ignore[assignment]
+        # A view may still be held; the mapping then goes with the process
+        with contextlib.suppress(BufferError):
+            self._shm.close()
+
+    def unlink(self) -> None:
+        """Free the block (creator only), after close()."""
+        if self._owner:
+            self._shm.unlink()
+
+
+def _attach(name: str, margin_sec: float) -> SharedRingBuffer:
+    return SharedRingBuffer(name=name, margin_sec=margin_sec)
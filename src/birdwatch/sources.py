@@ -0,0 +1,312 @@
+"""
+Audio sources for the recorder: the live microphone, WAV/FLAC replay and a
+synthetic signal generator.
+
+A source opens a stream that calls on_block(block, overflow) with
+(frames, channels) float32 blocks at 48 kHz, from its own thread, until the
+stream is closed or the source runs out. Streams are context managers whose
+``active`` is False once they end, like sounddevice's InputStream. File and
+synthetic sources are paced at real time (or speed times faster, or
+unpaced), so the whole pipeline can be soak-tested without a microphone.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import TYPE_CHECKING, Protocol
+
+import numpy as np
+
+from birdwatch.recorder import DTYPE, SAMPLE_RATE
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterator, Sequence
+    from types import TracebackType
+
+_log = logging.getLogger(__name__)
+
+
+class AudioStream(Protocol):
+    """A started-on-enter, stopped-on-exit stream of audio blocks."""
+
+    @property
+    def active(self) -> bool: ...
+
+    def __enter__(self) -> AudioStream: ...
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> object: ...
+
+
+class AudioSource(Protocol):
+    """Anything that can open an AudioStream delivering blocks to on_block."""
+
+    def open(
+        self,
+        on_block: Callable[[np.ndarray, bool], None],
+        channels: int,
+        block_samples: int,
+    ) -> AudioStream: ...
+
+
+class SoundDeviceSource:
+    """
+    Live capture through PortAudio (sounddevice, imported on first open).
+    device is a sounddevice device index or name; None is the default input.
+    """
+
+    def __init__(self, device: int | str | None = None) -> None:
+        self.device = device
+
+    def open(
+        self,
+        on_block: Callable[[np.ndarray, bool], None],
+        channels: int,
+        block_samples: int,
+    ) -> AudioStream:
+        import sounddevice as sd
+
+        def callback(
+            indata: np.ndarray,
+            _frames: int,
+            _time: object,
+            status: sd.CallbackFlags,
+        ) -> None:
+            on_block(indata, bool(status.input_overflow))
+
+        return sd.InputStream(
+            samplerate=SAMPLE_RATE,
+            device=self.device,
+            channels=channels,
+            dtype=DTYPE,
+            blocksize=block_samples,
+            callback=callback,
+        )
+
+
+class _PacedStream:
+    """
+    Deliver blocks from an iterator on a thread, one per block duration
+    divided by speed (speed None: as fast as on_block returns). A block more
+    than max_lag_sec late is dropped, and the next delivered block is
+    flagged as an overflow, as PortAudio does when the callback falls behind.
+    """
+
+    def __init__(
+        self,
+        blocks: Iterator[np.ndarray],
+        on_block: Callable[[np.ndarray, bool], None],
+        speed: float | None,
+        max_lag_sec: float,
+    ) -> None:
+        self._blocks = blocks
+        self._on_block = on_block
+        self._speed = speed
+        self._max_lag_sec = max_lag_sec
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="birdwatch-source", daemon=True
+        )
+        self.delivered = 0  # blocks passed to on_block
+        self.dropped = 0  # blocks lost to lag
+
+    @property
+    def active(self) -> bool:
+        return self._thread.is_alive() and not self._stop.is_set()
+
+    def _run(self) -> None:
+        start = time.perf_counter()
+        audio_sec = 0.0
+        overflow = False
+        try:
+            for block in self._blocks:
+                if self._stop.is_set():
+                    return
+                audio_sec += block.shape[0] / SAMPLE_RATE
+                if self._speed:
+                    # A block is available once all of it has been "captured"
+                    late = time.perf_counter() - start - audio_sec / self._speed
+                    if late < 0:
+                        if self._stop.wait(-late):
+                            return
+                    elif late > self._max_lag_sec:
+                        self.dropped += 1
+                        overflow = True
+                        continue
+                self._on_block(block, overflow)
+                self.delivered += 1
+                overflow = False
+        except Exception:
+            _log.exception("Audio source failed")
+
+    def __enter__(self) -> _PacedStream:
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self._stop.set()
+        self._thread.join()
+
+
+class _BlockSource(ABC):
+    """Base for sources that generate their blocks in Python (see _PacedStream)."""
+
+    def __init__(self, speed: float | None = 1.0, max_lag_sec: float = 0.5) -> None:
+        if speed is not None and speed <= 0:
+            raise ValueError("speed must be positive (or None for unpaced)")
+        self.speed = speed
+        self.max_lag_sec = max_lag_sec
+
+    @abstractmethod
+    def blocks(self, channels: int, block_samples: int) -> Iterator[np.ndarray]:
+        """(block_samples, channels) float32 blocks until the source ends."""
+
+    def open(
+        self,
+        on_block: Callable[[np.ndarray, bool], None],
+        channels: int,
+        block_samples: int,
+    ) -> _PacedStream:
+        return _PacedStream(
+            self.blocks(channels, block_samples),
+            on_block,
+            self.speed,
+            self.max_lag_sec,
+        )
+
+
+class FileSource(_BlockSource):
+    """
+    Replay an audio file (WAV, FLAC, anything soundfile reads), streamed from
+    disk block by block and resampled to 48 kHz only if needed. A mono file
+    feeds every channel; otherwise the file needs at least as many channels
+    as are captured. With loop=True the file repeats until the stream is
+    closed.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        *,
+        speed: float | None = 1.0,
+        loop: bool = False,
+        max_lag_sec: float = 0.5,
+    ) -> None:
+        import soundfile as sf
+
+        super().__init__(speed, max_lag_sec)
+        self.path = Path(path)
+        self.loop = loop
+        info = sf.info(str(self.path))
+        self.file_channels = info.channels
+        self.duration_sec = info.frames / info.samplerate
+
+    def open(
+        self,
+        on_block: Callable[[np.ndarray, bool], None],
+        channels: int,
+        block_samples: int,
+    ) -> _PacedStream:
+        if self.file_channels != 1 and self.file_channels < channels:
+            raise ValueError(
+                f"{self.path} has {self.file_channels} channels; {channels} requested"
+            )
+        return super().open(on_block, channels, block_samples)
+
+    def blocks(self, channels: int, block_samples: int) -> Iterator[np.ndarray]:
+        import soundfile as sf
+
+        used = 1 if self.file_channels == 1 else channels
+        while True:
+            with sf.SoundFile(str(self.path)) as f:
+                resampler = None
+                if f.samplerate != SAMPLE_RATE:
+                    import soxr
+
+                    resampler = soxr.ResampleStream(
+                        f.samplerate, SAMPLE_RATE, used, dtype="float32"
+                    )
+                block = max(1, round(block_samples * f.samplerate / SAMPLE_RATE))
+                last = False
+                while not last:
+                    data = f.read(block, dtype="float32", always_2d=True)
+                    last = len(data) < block
+                    data = data[:, :used]
+                    if resampler is not None:
+                        data = resampler.resample_chunk(data, last=last)
+                    if len(data):
+                        yield np.repeat(data, channels, axis=1) if used == 1 else data
+            if not self.loop:
+                return
+
+
+class SyntheticSource(_BlockSource):
+    """
+    Deterministic test signal: the sum of sine tones (tones_hz), a linear
+    chirp from chirp_hz[0] to chirp_hz[1] lasting chirp_sec and repeated
+    every chirp_every_sec, each at amplitude, plus Gaussian noise of standard
+    deviation noise (independent per channel, seeded). duration_sec None
+    generates until the stream is closed.
+    """
+
+    def __init__(
+        self,
+        duration_sec: float | None = None,
+        *,
+        tones_hz: Sequence[float] = (),
+        chirp_hz: tuple[float, float] | None = None,
+        chirp_sec: float = 0.5,
+        chirp_every_sec: float = 3.0,
+        amplitude: float = 0.1,
+        noise: float = 0.01,
+        seed: int = 0,
+        speed: float | None = 1.0,
+        max_lag_sec: float = 0.5,
+    ) -> None:
+        super().__init__(speed, max_lag_sec)
+        if chirp_hz is not None and not 0 < chirp_sec <= chirp_every_sec:
+            raise ValueError("need 0 < chirp_sec <= chirp_every_sec")
+        self.duration_sec = duration_sec
+        self.tones_hz = tuple(tones_hz)
+        self.chirp_hz = chirp_hz
+        self.chirp_sec = chirp_sec
+        self.chirp_every_sec = chirp_every_sec
+        self.amplitude = amplitude
+        self.noise = noise
+        self.seed = seed
+
+    def signal(self, start: int, n: int) -> np.ndarray:
+        """The noiseless signal for samples [start, start + n), float64."""
+        t = (start + np.arange(n)) / SAMPLE_RATE
+        out = np.zeros(n)
+        for f in self.tones_hz:
+            out += self.amplitude * np.sin(2 * np.pi * f * t)
+        if self.chirp_hz is not None:
+            f0, f1 = self.chirp_hz
+            tau = np.mod(t, self.chirp_every_sec)
+            phase = 2 * np.pi * (f0 * tau + (f1 - f0) * tau**2 / (2 * self.chirp_sec))
+            out += np.where(tau < self.chirp_sec, self.amplitude * np.sin(phase), 0.0)
+        return out
+
+    def blocks(self, channels: int, block_samples: int) -> Iterator[np.ndarray]:
+        rng = np.random.default_rng(self.seed)
+        total = (
+            None
+            if self.duration_sec is None
+            else round(self.duration_sec * SAMPLE_RATE)
+        )
+        start = 0
+        while total is None or start < total:
+            n = block_samples if total is None else min(block_samples, total - start)
+            block = rng.normal(0.0, self.noise, (n, channels))
+            block += self.signal(start, n)[:, np.newaxis]
+            yield block.astype(DTYPE)
+            start += n
@@ -0,0 +1,105 @@
+"""Per-site species filters: allow-lists and occurrence tables compiled to label indices."""
+
+from __future__ import annotations
+
+import csv
+import logging
+from datetime import date
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+_log = logging.getLogger(__name__)
+
+# BirdNET's calendar: 4 "weeks" per month, 48 per year
+WEEKS_PER_YEAR = 48
+
+
+def birdnet_week(day: date | None = None) -> int:
+    """Return BirdNET's week (1..48) for day (default today)."""
+    day = day or date.today()
+    return (day.month - 1) * 4 + min(4, (day.day - 1) // 7 + 1)
+
+
+def _label_index(labels: Sequence[str]) -> dict[str, int]:
+    """
+    Map lowercased names to label indices. BirdNET labels are
+    "Scientific name_Common Name"; the full label and either half match.
+    """
+    index: dict[str, int] = {}
+    for i, label in enumerate(labels):
+        names = (label, *label.split("_", 1))
+        for name in names:
+            index.setdefault(name.strip().lower(), i)
+    return index
+
+
+def _read_names(path: Path) -> list[str]:
+    """Non-empty lines of path, without # comments."""
+    with open(path, encoding="utf-8") as f:
+        lines = (line.split("#", 1)[0].strip() for line in f)
+        return [line for line in lines if line]
+
+
+def load_species_filter(
+    path: str | Path,
+    labels: Sequence[str] | str | Path,
+    *,
+    week: int | None = None,
+    min_frequency: float = 0.03,
+) -> np.ndarray:
+    """
+    Compile a species filter file into sorted label indices for
+    BirdNETAnalyzer(species=...).
+
+    A .csv file is an occurrence table: a species column followed by one
+    frequency column per BirdNET week (1..48), e.g. exported from eBird
+    frequency data or the BirdNET meta-model for the node's location.
+    Species whose frequency for week (default: their best week) is at least
+    min_frequency are kept; rows for species missing from labels are
+    skipped. Any other file is an allow-list with one species per line;
+    there an unknown name is an error. labels is the label list or the
+    model's labels.txt.
+    """
+    path = Path(path)
+    if isinstance(labels, str | Path):
+        labels = _read_names(Path(labels))
+    index = _label_index(labels)
+    selected: set[int] = set()
+    if path.suffix.lower() == ".csv":
+        if week is not None and not 1 <= week <= WEEKS_PER_YEAR:
+            raise ValueError(f"week must be 1..{WEEKS_PER_YEAR}, got {week}")
+        skipped = 0
+        with open(path, encoding="utf-8", newline="") as f:
+            reader = csv.reader(f)
+            next(reader, None)  # header
+            for row in reader:
+                if not row or not row[0].strip():
+                    continue
+                freqs = [float(v) if v.strip() else 0.0 for v in row[1:]]
+                if week is None:
+                    freq = max(freqs, default=0.0)
+                elif week <= len(freqs):
+                    freq = freqs[week - 1]
+                else:
+                    freq = 0.0
+                i = index.get(row[0].strip().lower())
+                if i is None:
+                    skipped += 1
+                elif freq >= min_frequency:
+                    selected.add(i)
+        if skipped:
+            _log.debug("%d species in %s are not in the labels", skipped, path)
+    else:
+        names = _read_names(path)
+        unknown = [n for n in names if n.lower() not in index]
+        if unknown:
+            raise ValueError(f"Unknown species in {path}: {', '.join(unknown[:5])}")
+        selected.update(index[n.lower()] for n in names)
+    if not selected:
+        raise ValueError(f"Species filter {path} matches no labels")
+    return np.array(sorted(selected), dtype=np.intp)
@@ -0,0 +1,267 @@
+"""
+Compact binary encoding of detections, shared by offline cache rows and
+packed MQTT messages (birdnet/detections/compact).
+
+A record is a fixed little-endian struct (species index, flags, channel,
+start as epoch milliseconds, duration in milliseconds, confidences and
+window count) followed by the optional fields its flags announce and the
+device id. Species are numbered by a SpeciesTable; a packed message
+carries the entries its records use, so it decodes on its own.
+"""
+
+from __future__ import annotations
+
+import struct
+import threading
+from datetime import UTC, datetime, timedelta
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Mapping, Sequence
+
+    from birdwatch.mqtt_client import DetectionPayload
+
+VERSION = 1
+
+Species = tuple[str, str, str]  # species_code, scientific_name, common_name
+
+_RECORD = struct.Struct("<HBBqIffI")
+_FLOAT64 = struct.Struct("<d")
+_U8 = struct.Struct("<B")
+_U16 = struct.Struct("<H")
+_MESSAGE = struct.Struct("<BBH")  # version, reserved, species entries
+_HAS_LAT, _HAS_LON, _HAS_END, _HAS_MEAN, _HAS_AUDIO, _HAS_IMAGE = (
+    1 << i for i in range(6)
+)
+_EPOCH = datetime(1970, 1, 1, tzinfo=UTC)
+_MS = timedelta(milliseconds=1)
+
+
+class SpeciesTable:
+    """Species tuples numbered in order of first use; safe to share between threads."""
+
+    def __init__(self, species: Iterable[Species] = ()) -> None:
+        self.species: list[Species] = list(species)
+        self._index = {s: i for i, s in enumerate(self.species)}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.species)
+
+    def __getitem__(self, index: int) -> Species:
+        return self.species[index]
+
+    def index(self, species: Species) -> int:
+        """Number of species, adding it to the table on first use."""
+        i = self._index.get(species)
+        if i is not None:
+            return i
+        with self._lock:
+            i = self._index.get(species)
+            if i is None:
+                i = len(self.species)
+                if i > 0xFFFF:
+                    raise ValueError("species table is full")
+                self.species.append(species)
+                self._index[species] = i
+        return i
+
+
+def _ms(timestamp: str) -> int:
+    """Epoch milliseconds of an ISO8601 timestamp (naive means UTC)."""
+    dt = datetime.fromisoformat(timestamp)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=UTC)
+    return round((dt - _EPOCH) / _MS)
+
+
+def _iso(ms: int) -> str:
+    return (_EPOCH + ms * _MS).isoformat(timespec="milliseconds")
+
+
+def _text(value: str, prefix: struct.Struct) -> bytes:
+    data = value.encode()
+    if len(data) >= 1 << (8 * prefix.size):
+        raise ValueError(f"string too long for the compact encoding: {value[:40]!r}")
+    return prefix.pack(len(data)) + data
+
+
+def _read_text(
+    data: bytes | memoryview, offset: int, prefix: struct.Struct
+) -> tuple[str, int]:
+    (n,) = prefix.unpack_from(data, offset)
+    offset += prefix.size
+    if offset + n > len(data):
+        raise ValueError("truncated string")
+    return bytes(data[offset : offset + n]).decode(), offset + n
+
+
+def encode_record(payload: DetectionPayload, table: SpeciesTable) -> bytes:
+    """One detection as a compact record; raises ValueError if it cannot be encoded."""
+    start = _ms(payload.timestamp)
+    flags = 0
+    tail = []
+    if payload.lat is not None:
+        flags |= _HAS_LAT
+        tail.append(_FLOAT64.pack(payload.lat))
+    if payload.lon is not None:
+        flags |= _HAS_LON
+        tail.append(_FLOAT64.pack(payload.lon))
+    duration = 0
+    if payload.end_timestamp is not None:
+        flags |= _HAS_END
+        duration = _ms(payload.end_timestamp) - start
+    if payload.mean_confidence is not None:
+        flags |= _HAS_MEAN
+    tail.append(_text(payload.device_id, _U8))
+    if payload.audio_url is not None:
+        flags |= _HAS_AUDIO
+        tail.append(_text(payload.audio_url, _U16))
+    if payload.image_url is not None:
+        flags |= _HAS_IMAGE
+        tail.append(_text(payload.image_url, _U16))
+    species = (payload.species_code, payload.scientific_name, payload.common_name)
+    try:
+        head = _RECORD.pack(
+            table.index(species),
+            flags,
+            payload.channel,
+            start,
+            duration,
+            payload.confidence,
+            payload.mean_confidence or 0.0,
+            payload.window_count,
+        )
+    except struct.error as e:
+        raise ValueError(f"cannot encode detection: {e}") from e
+    record = head + b"".join(tail)
+    if len(record) > 0xFFFF:
+        raise ValueError(f"record too long for a message: {len(record)} bytes")
+    return record
+
+
+def record_species(record: bytes | memoryview) -> int:
+    """Species index of a record; raises ValueError if it is malformed."""
+    head, _ = _parse(record)
+    return head[0]
+
+
+def _parse(record: bytes | memoryview) -> tuple[tuple[Any, ...], dict[str, Any]]:
+    """The record's fixed fields and its optional ones, checking its length."""
+    try:
+        head = _RECORD.unpack_from(record)
+        flags = head[1]
+        offset = _RECORD.size
+        extra: dict[str, Any] = {"lat": None, "lon": None}
+        for flag, name in ((_HAS_LAT, "lat"), (_HAS_LON, "lon")):
+            if flags & flag:
+                (extra[name],) = _FLOAT64.unpack_from(record, offset)
+                offset += _FLOAT64.size
+        extra["device_id"], offset = _read_text(record, offset, _U8)
+        for flag, name in ((_HAS_AUDIO, "audio_url"), (_HAS_IMAGE, "image_url")):
+            extra[name] = None
+            if flags & flag:
+                extra[name], offset = _read_text(record, offset, _U16)
+    except struct.error as e:
+        raise ValueError(f"truncated record: {e}") from e
+    if offset != len(record):
+        raise ValueError(f"record has {len(record) - offset} trailing bytes")
+    return head, extra
+
+
+def decode_record(
+    record: bytes | memoryview, table: SpeciesTable | Mapping[int, Species]
+) -> dict[str, Any]:
+    """
+    A record as DetectionPayload fields (asdict() form), timestamps as
+    ISO8601 with milliseconds; raises ValueError if it is malformed.
+    """
+    head, extra = _parse(record)
+    index, flags, channel, start, duration, confidence, mean, windows = head
+    try:
+        code, scientific, common = table[index]
+    except (IndexError, KeyError) as e:
+        raise ValueError(f"unknown species index {index}") from e
+    return {
+        "device_id": extra["device_id"],
+        "species_code": code,
+        "scientific_name": scientific,
+        "common_name": common,
+        # float32 on the wire; round off the representation noise
+        "confidence": round(confidence, 6),
+        "timestamp": _iso(start),
+        "lat": extra["lat"],
+        "lon": extra["lon"],
+        "audio_url": extra["audio_url"],
+        "image_url": extra["image_url"],
+        "end_timestamp": _iso(start + duration) if flags & _HAS_END else None,
+        "mean_confidence": round(mean, 6) if flags & _HAS_MEAN else None,
+        "window_count": windows,
+        "channel": channel,
+    }
+
+
+def encode_row(payload: DetectionPayload, table: SpeciesTable) -> bytes:
+    """A versioned offline cache row: the version byte, then the record."""
+    return _U8.pack(VERSION) + encode_record(payload, table)
+
+
+def row_record(row: bytes) -> memoryview:
+    """The record in a cache row; raises ValueError for an unknown version."""
+    if not row or row[0] != VERSION:
+        raise ValueError(f"unsupported cache row version {row[:1]!r}")
+    return memoryview(row)[1:]
+
+
+def pack_message(records: Sequence[bytes | memoryview], table: SpeciesTable) -> bytes:
+    """
+    A packed MQTT message: header, the table entries the records use
+    (keeping their indices), then the length-prefixed records. Raises
+    ValueError for more than 65535 records or a record over 65535 bytes.
+    """
+    if len(records) > 0xFFFF:
+        raise ValueError(f"too many records for one message: {len(records)}")
+    if any(len(r) > 0xFFFF for r in records):
+        raise ValueError("record too long for a message")
+    used = sorted({_RECORD.unpack_from(r)[0] for r in records})
+    parts = [_MESSAGE.pack(VERSION, 0, len(used))]
+    for index in used:
+        parts.append(_U16.pack(index))
+        parts.extend(_text(s, _U8) for s in table[index])
+    parts.append(_U16.pack(len(records)))
+    for record in records:
+        parts.append(_U16.pack(len(record)))
+        parts.append(record)
+    return b"".join(parts)
+
+
+def unpack_message(data: bytes) -> list[dict[str, Any]]:
+    """Decode a packed message into DetectionPayload fields; ValueError if malformed."""
+    try:
+        version, _, n_species = _MESSAGE.unpack_from(data)
+        if version != VERSION:
+            raise ValueError(f"unsupported message version {version}")
+        offset = _MESSAGE.size
+        table: dict[int, Species] = {}
+        for _ in range(n_species):
+            (index,) = _U16.unpack_from(data, offset)
+            offset += _U16.size
+            names = []
+            for _ in range(3):
+                name, offset = _read_text(data, offset, _U8)
+                names.append(name)
+            table[index] = (names[0], names[1], names[2])
+        (n_records,) = _U16.unpack_from(data, offset)
+        offset += _U16.size
+        view = memoryview(data)
+        detections = []
+        for _ in range(n_records):
+            (n,) = _U16.unpack_from(data, offset)
+            offset += _U16.size
+            detections.append(decode_record(view[offset : offset + n], table))
+            offset += n
+    except struct.error as e:
+        raise ValueError(f"truncated message: {e}") from e
+    if offset != len(data):
+        raise ValueError(f"message has {len(data) - offset} trailing bytes")
+    return detections
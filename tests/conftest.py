@@ -1 +1,67 @@
 """Pytest configuration and shared fixtures."""
+
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from birdwatch import analyzer as analyzer_mod
+from birdwatch.analyzer import N_MELS, MelFrontend
+
+
+class FakeInterpreter:
+    """Stand-in for tflite.Interpreter: logits = per-class bias + input mean."""
+
+    def __init__(self, n_classes: int = 8, batchable: bool = True) -> None:
+        self.bias = np.linspace(-6.0, 6.0, n_classes).astype(np.float32)
+        self.batchable = batchable
+        self.invokes = 0
+        self.allocations = 0
+        self._shape = [1, N_MELS, MelFrontend().n_frames]
+        self._input: np.ndarray | None = None
+        self._output: np.ndarray | None = None
+
+    def allocate_tensors(self) -> None:
+        self.allocations += 1
+
+    def get_input_details(self) -> list[dict]:
+        return [{"index": 0, "shape": np.array(self._shape)}]
+
+    def get_output_details(self) -> list[dict]:
+        return [{"index": 1, "shape": np.array([self._shape[0], self.bias.size])}]
+
+    def resize_tensor_input(self, index: int, shape: list[int]) -> None:
+        if not self.batchable and shape[0] != 1:
+            raise RuntimeError("batch dimension is fixed")
+        self._shape = list(shape)
+
+    def set_tensor(self, index: int, value: np.ndarray) -> None:
+        assert list(value.shape) == self._shape
+        self._input = value.copy()
+
+    def invoke(self) -> None:
+        assert self._input is not None
+        self.invokes += 1
+        means = self._input.reshape(self._input.shape[0], -1).mean(axis=1)
+        self._output = self.bias[np.newaxis, :] + 0.01 * means[:, np.newaxis]
+
+    def get_tensor(self, index: int) -> np.ndarray:
+        assert self._output is not None
+        return self._output.copy()
+
+
+@pytest.fixture
+def model_dir(tmp_path: Path) -> Path:
+    """Directory with a placeholder model file and an 8-species labels.txt."""
+    (tmp_path / "BirdNET_GLOBAL_6K_V2.4_Model_FP16.tflite").write_bytes(b"")
+    labels = [f"Species {i}" for i in range(8)]
+    (tmp_path / "labels.txt").write_text("\n".join(labels), encoding="utf-8")
+    return tmp_path
+
+
+@pytest.fixture
+def fake_interpreter(monkeypatch: pytest.MonkeyPatch) -> FakeInterpreter:
+    """Patch the TFLite loader to return a FakeInterpreter."""
+    interp = FakeInterpreter()
+    monkeypatch.setattr(analyzer_mod, "_load_interpreter", lambda _path, **_kw: interp)
+    return interp
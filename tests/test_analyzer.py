@@ -0,0 +1,147 @@
+"""Tests for BirdNETAnalyzer against a stand-in interpreter."""
+
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from birdwatch import analyzer as analyzer_mod
+from birdwatch.analyzer import (
+    INPUT_SAMPLES,
+    AnalyzerPool,
+    BirdNETAnalyzer,
+    postprocess_logits,
+)
+from tests.conftest import FakeInterpreter
+
+
+def _buffers(n: int) -> list[np.ndarray]:
+    rng = np.random.default_rng(3)
+    return [
+        (rng.standard_normal(INPUT_SAMPLES) * 0.1).astype(np.float32) for _ in range(n)
+    ]
+
+
+def test_run_returns_sorted_detections_above_threshold(
+    model_dir: Path, fake_interpreter: FakeInterpreter
+) -> None:
+    analyzer = BirdNETAnalyzer(model_dir=model_dir, confidence_threshold=0.7)
+    results = analyzer.run(_buffers(1)[0])
+    confidences = [c for _, c in results]
+    assert results and all(c >= 0.7 for c in confidences)
+    assert confidences == sorted(confidences, reverse=True)
+    assert results[0][0] == 7  # largest bias
+    assert analyzer.species_name(7) == "Species 7"
+
+
+def test_run_batch_uses_one_invoke_and_matches_run(
+    model_dir: Path, fake_interpreter: FakeInterpreter
+) -> None:
+    analyzer = BirdNETAnalyzer(model_dir=model_dir, confidence_threshold=0.5)
+    buffers = _buffers(4)
+    expected = [analyzer.run(b) for b in buffers]
+    before = fake_interpreter.invokes
+    batched = analyzer.run_batch(buffers)
+    assert fake_interpreter.invokes == before + 1
+    for got, want in zip(batched, expected, strict=True):
+        assert [i for i, _ in got] == [i for i, _ in want]
+        np.testing.assert_allclose([c for _, c in got], [c for _, c in want], rtol=1e-5)
+    assert analyzer.run(buffers[0]) == expected[0]  # padded to the batch of four
+
+
+def test_batch_size_is_allocated_once_whatever_the_gate_passes(
+    model_dir: Path, fake_interpreter: FakeInterpreter
+) -> None:
+    outcomes = iter([True, False, True] * 2 + [False] * 3 + [True] * 3 + [True])
+
+    def gate(features: np.ndarray) -> bool:
+        return next(outcomes)
+
+    analyzer = BirdNETAnalyzer(
+        model_dir=model_dir, confidence_threshold=0.5, gate=gate, batch_size=3
+    )
+    allocations = fake_interpreter.allocations
+    buffers = _buffers(3)
+    results = [analyzer.run_batch(buffers) for _ in range(4)]
+    assert [[bool(r) for r in res] for res in results] == [
+        [True, False, True],
+        [True, False, True],
+        [False, False, False],
+        [True, True, True],
+    ]
+    assert results[0][0] == results[3][0]  # padding rows don't change results
+    assert analyzer.run(buffers[0]) == results[3][0]
+    assert fake_interpreter.allocations == allocations
+    assert fake_interpreter.invokes == 4
+
+
+def test_run_batch_falls_back_to_per_window_invokes(
+    model_dir: Path, fake_interpreter: FakeInterpreter
+) -> None:
+    fake_interpreter.batchable = False
+    analyzer = BirdNETAnalyzer(model_dir=model_dir, confidence_threshold=0.5)
+    results = analyzer.run_batch(_buffers(3))
+    assert len(results) == 3
+    assert fake_interpreter.invokes == 3
+    assert analyzer.run_batch([]) == []
+
+
+def test_postprocess_logits_matches_full_sigmoid_sort() -> None:
+    rng = np.random.default_rng(4)
+    logits = rng.normal(-4.0, 3.0, size=(5, 6_522)).astype(np.float32)
+    logits[2] = -20.0  # a window with nothing above threshold
+    results = postprocess_logits(logits, confidence_threshold=0.7, top_k=10)
+    assert results[2] == []
+    for row, got in zip(logits, results, strict=True):
+        probs = 1.0 / (1.0 + np.exp(-row))
+        want = [
+            (int(i), float(probs[i]))
+            for i in np.argsort(probs)[::-1]
+            if probs[i] >= 0.7
+        ][:10]
+        assert got == want
+
+
+def test_postprocess_logits_single_window_and_extreme_thresholds() -> None:
+    logits = np.array([0.0, 3.0, -3.0], dtype=np.float32)
+    assert [i for i, _ in postprocess_logits(logits, 0.0, top_k=2)[0]] == [1, 0]
+    assert postprocess_logits(logits, 1.0)[0] == []
+
+
+def test_species_mask_limits_detections(
+    model_dir: Path, fake_interpreter: FakeInterpreter
+) -> None:
+    analyzer = BirdNETAnalyzer(
+        model_dir=model_dir, confidence_threshold=0.5, species=[6, 2]
+    )
+    assert [i for i, _ in analyzer.run(_buffers(1)[0])] == [6]
+    with pytest.raises(ValueError):
+        BirdNETAnalyzer(model_dir=model_dir, species=[8])
+    with pytest.raises(ValueError, match="top_k"):
+        BirdNETAnalyzer(model_dir=model_dir, top_k=0)
+    logits = np.array([[5.0, 4.0, 3.0, 2.0]], dtype=np.float32)
+    masked = postprocess_logits(logits, 0.5, species=np.array([1, 3]))
+    assert [i for i, _ in masked[0]] == [1, 3]
+
+
+def test_analyzer_pool_matches_single_analyzer(
+    model_dir: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    loaded: list[dict] = []
+
+    def load(_path: Path, **kwargs: object) -> FakeInterpreter:
+        loaded.append(kwargs)
+        return FakeInterpreter()
+
+    monkeypatch.setattr(analyzer_mod, "_load_interpreter", load)
+    windows = _buffers(6)
+    single = BirdNETAnalyzer(model_dir=model_dir, confidence_threshold=0.5)
+    expected = [single.run(w) for w in windows]
+    with AnalyzerPool(
+        model_dir, workers=3, confidence_threshold=0.5, num_threads=1
+    ) as pool:
+        assert pool.map(windows) == expected
+        assert pool.species_name(7) == "Species 7"
+    assert len(loaded) == 4 and loaded[-1] == {"num_threads": 1, "xnnpack": True}
+    with pytest.raises(ValueError):
+        AnalyzerPool(model_dir, workers=2, streaming=True)
@@ -0,0 +1,77 @@
+"""Tests for offline archive analysis (windowing, CSV output, resume)."""
+
+import csv
+from pathlib import Path
+
+import numpy as np
+import soundfile as sf
+
+from birdwatch.analyzer import INPUT_SAMPLES, SAMPLE_RATE
+from birdwatch.archive import (
+    _done_path,
+    analyze_archive,
+    find_audio_files,
+    iter_windows,
+)
+from tests.conftest import FakeInterpreter
+
+
+def _write_tone(path: Path, seconds: float, rate: int, channels: int = 1) -> None:
+    t = np.arange(int(seconds * rate)) / rate
+    tone = (0.3 * np.sin(2 * np.pi * 3_000 * t)).astype(np.float32)
+    sf.write(path, np.repeat(tone[:, None], channels, axis=1), rate)
+
+
+def test_iter_windows_blockwise_at_48k(tmp_path: Path) -> None:
+    path = tmp_path / "a.wav"
+    _write_tone(path, 7.5, SAMPLE_RATE, channels=2)
+    windows = list(iter_windows(path, block_seconds=1.0))
+    # Two full windows plus a 1.5 s zero-padded tail
+    assert [o for o, _ in windows] == [0.0, 3.0, 6.0]
+    assert all(w.shape == (INPUT_SAMPLES,) for _, w in windows)
+    assert np.all(windows[-1][1][int(1.6 * SAMPLE_RATE) :] == 0.0)
+
+
+def test_iter_windows_resamples_other_rates(tmp_path: Path) -> None:
+    path = tmp_path / "b.flac"
+    _write_tone(path, 6.0, 44_100)
+    windows = list(iter_windows(path, block_seconds=0.7))
+    assert [o for o, _ in windows] == [0.0, 3.0]
+    rms = float(np.sqrt(np.mean(windows[0][1][1000:-1000] ** 2)))
+    assert abs(rms - 0.3 / np.sqrt(2)) < 0.01
+
+
+def test_analyze_archive_writes_csv_and_resumes(
+    tmp_path: Path, model_dir: Path, fake_interpreter: FakeInterpreter
+) -> None:
+    audio = tmp_path / "audio"
+    (audio / "night").mkdir(parents=True)
+    _write_tone(audio / "one.wav", 6.0, SAMPLE_RATE)
+    _write_tone(audio / "night" / "two.flac", 3.0, SAMPLE_RATE)
+    (audio / "notes.txt").write_text("not audio")
+    assert len(find_audio_files(audio)) == 2
+
+    out = tmp_path / "detections.csv"
+    assert analyze_archive(audio, out, model_dir, confidence_threshold=0.9, jobs=1) == 2
+    with open(out, newline="") as f:
+        rows = list(csv.reader(f))
+    assert tuple(rows[0]) == ("file", "offset_s", "species", "confidence")
+    assert {r[1] for r in rows[1:]} == {"0.000", "3.000"}
+    assert all(float(r[3]) >= 0.9 for r in rows[1:])
+
+    _write_tone(audio / "three.wav", 3.0, SAMPLE_RATE)
+    assert analyze_archive(audio, out, model_dir, confidence_threshold=0.9, jobs=1) == 1
+    with open(out, newline="") as f:
+        resumed = list(csv.reader(f))
+    assert resumed[: len(rows)] == rows
+    assert resumed.count(rows[0]) == 1  # header written once
+
+    # An unreadable file is skipped and retried by the next run; the same
+    # archive under another spelling of its path is not analysed again
+    (audio / "cut.wav").write_bytes(b"")
+    other = audio / "night" / ".." / "."
+    assert analyze_archive(other, out, model_dir, jobs=1) == 0
+    assert "cut.wav" not in _done_path(out).read_text()
+    (audio / "cut.wav").unlink()
+    _write_tone(audio / "cut.wav", 3.0, SAMPLE_RATE)
+    assert analyze_archive(other, out, model_dir, jobs=1) == 1
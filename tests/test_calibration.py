@@ -0,0 +1,146 @@
+"""Tests for model variants and on-device calibration (birdwatch.calibration)."""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from birdwatch import analyzer as analyzer_mod
+from birdwatch import calibration
+from birdwatch.analyzer import MODEL_VARIANTS, BirdNETAnalyzer, find_model_variants
+from birdwatch.calibration import calibrate, select_model, thread_counts
+from birdwatch.pi.main import _Detector, _select_model
+from tests.conftest import FakeInterpreter
+
+# Simulated seconds per invoke with one thread; n threads divide it by n
+SECONDS = {"fp32": 2.0, "fp16": 1.0, "int8": 0.4}
+
+
+class _TimedInterpreter(FakeInterpreter):
+    def __init__(self, clock: list[float], seconds: float) -> None:
+        super().__init__()
+        self.clock = clock
+        self.seconds = seconds
+
+    def invoke(self) -> None:
+        super().invoke()
+        self.clock[0] += self.seconds
+
+
+@pytest.fixture
+def timed_models(model_dir: Path, monkeypatch: pytest.MonkeyPatch) -> list[str]:
+    """All three variants in model_dir, on a simulated clock; returns loads."""
+    for name in MODEL_VARIANTS.values():
+        (model_dir / name).write_bytes(b"")
+    clock = [0.0]
+    loads: list[str] = []
+    variant_of = {name: v for v, name in MODEL_VARIANTS.items()}
+
+    def load(path: Path, num_threads: int | None = None, **_kw: object):
+        variant = variant_of[Path(path).name]
+        loads.append(f"{variant}/{num_threads}")
+        return _TimedInterpreter(clock, SECONDS[variant] / (num_threads or 1))
+
+    monkeypatch.setattr(analyzer_mod, "_load_interpreter", load)
+    monkeypatch.setattr(
+        calibration, "time", SimpleNamespace(perf_counter=lambda: clock[0])
+    )
+    return loads
+
+
+def test_model_variants_are_found_and_fp16_is_the_default(
+    model_dir: Path, fake_interpreter: FakeInterpreter
+) -> None:
+    assert list(find_model_variants(model_dir)) == ["fp16"]
+    assert BirdNETAnalyzer(model_dir).variant == "fp16"
+    (model_dir / MODEL_VARIANTS["fp16"]).unlink()
+    (model_dir / MODEL_VARIANTS["int8"]).write_bytes(b"")
+    (model_dir / MODEL_VARIANTS["fp32"]).write_bytes(b"")
+    assert list(find_model_variants(model_dir)) == ["fp32", "int8"]
+    assert BirdNETAnalyzer(model_dir).variant == "fp32"
+    analyzer = BirdNETAnalyzer(model_dir, variant="int8")
+    assert analyzer.model_path.name == MODEL_VARIANTS["int8"]
+    with pytest.raises(ValueError, match="variant must be one of"):
+        BirdNETAnalyzer(model_dir, variant="fp8")
+    assert thread_counts(1) == [1]
+    assert thread_counts(4) == [1, 2, 4]
+    assert thread_counts(6) == [1, 2, 4, 6]
+
+
+def test_calibrate_picks_the_most_accurate_variant_that_keeps_up(
+    model_dir: Path, timed_models: list[str]
+) -> None:
+    # 1.5 s per 3 s window: FP32 needs two threads, and nothing after is timed
+    profile = calibrate(model_dir, threads=[1, 2], target_rtf=0.5, windows=1)
+    assert (profile.variant, profile.num_threads) == ("fp32", 2)
+    assert profile.seconds_per_window == pytest.approx(1.0)
+    assert profile.rtf == pytest.approx(1 / 3)
+    assert list(profile.measured) == ["fp32/1", "fp32/2"]
+
+    profile = calibrate(model_dir, threads=[1, 2], target_rtf=0.1, windows=1)
+    assert (profile.variant, profile.num_threads) == ("int8", 2)
+    # Nothing fits: the fastest pair, after timing every one
+    profile = calibrate(model_dir, threads=[1, 2], target_rtf=0.01, windows=1)
+    assert (profile.variant, profile.num_threads) == ("int8", 2)
+    assert len(profile.measured) == 6
+    profile = calibrate(
+        model_dir, variants=["fp16"], threads=[1], target_rtf=0.5, windows=1
+    )
+    assert (profile.variant, profile.num_threads) == ("fp16", 1)
+    with pytest.raises(ValueError, match="Unknown model variants: fp8"):
+        calibrate(model_dir, variants=["fp8"])
+
+
+def test_select_model_caches_the_profile_until_settings_change(
+    model_dir: Path, timed_models: list[str]
+) -> None:
+    profile = select_model(model_dir, threads=[1, 2], target_rtf=0.5)
+    assert (profile.variant, profile.num_threads) == ("fp32", 2)
+    cached = json.loads((model_dir / calibration.PROFILE_NAME).read_text())
+    assert cached["variant"] == "fp32"
+    timed_models.clear()
+    assert select_model(model_dir, threads=[1, 2], target_rtf=0.5) == profile
+    assert timed_models == []
+    # A different budget (or board, or model file) recalibrates
+    again = select_model(model_dir, threads=[1, 2], budget_seconds=1.5)
+    assert (again.variant, again.num_threads) == ("fp16", 2)
+    assert timed_models
+    (model_dir / calibration.PROFILE_NAME).write_text("{not json")
+    assert select_model(model_dir, threads=[1, 2], budget_seconds=1.5) == again
+
+    detector = _Detector(
+        "pi-01", model_dir, print, model_variant="auto", tflite_threads=2
+    )
+    assert isinstance(detector.analyzer, BirdNETAnalyzer)
+    assert detector.analyzer.variant == "fp32"
+    assert timed_models[-1] == "fp32/2"
+
+
+def test_calibrate_command_writes_the_profile_the_pipeline_uses(
+    model_dir: Path,
+    timed_models: list[str],
+    monkeypatch: pytest.MonkeyPatch,
+    capsys: pytest.CaptureFixture[str],
+) -> None:
+    monkeypatch.setenv("BIRDNET_ANALYZER_WORKERS", "2")
+    monkeypatch.setenv("BIRDNET_CHANNELS", "2")
+    monkeypatch.setenv("BIRDNET_XNNPACK", "0")
+    assert calibration.main_calibrate([str(model_dir)]) == 0
+    assert "Wrote" in capsys.readouterr().out
+    timed_models.clear()
+    variant, threads = _select_model(
+        model_dir,
+        None,
+        hop_seconds=3.0,
+        workers=2,
+        channels=2,
+        tflite_threads=None,
+        streaming_mel=False,
+        target_rtf=0.5,
+        xnnpack=False,
+    )
+    assert timed_models == []  # the cached profile matched
+    assert (variant, threads) == ("fp16", 1)  # one thread each for 2 workers
@@ -0,0 +1,195 @@
+"""Tests for birdwatch.clips."""
+
+from __future__ import annotations
+
+import io
+import os
+import sys
+import threading
+import wave
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from birdwatch.clips import (
+    ClipRing,
+    ClipStore,
+    ClipWriter,
+    HttpClipUploader,
+    encode_clip,
+)
+from birdwatch.mqtt_client import DetectionPayload
+
+
+def _payload(code: str = "turdus_mig") -> DetectionPayload:
+    return DetectionPayload(
+        device_id="pi-01",
+        species_code=code,
+        scientific_name="Turdus migratorius",
+        common_name="American Robin",
+        confidence=0.9,
+        timestamp="2025-05-01T06:00:03+00:00",
+        lat=None,
+        lon=None,
+        audio_url=None,
+        image_url=None,
+    )
+
+
+def test_clip_ring_reads_across_wraparound_and_forgets_old_audio() -> None:
+    ring = ClipRing(seconds=3.0, channels=2, sample_rate=100)
+    stream = np.arange(1000, dtype=np.float32)
+    for start in range(0, 1000, 70):
+        block = stream[start : start + 70]
+        ring.write(np.stack([block, -block], axis=1))
+    np.testing.assert_array_equal(ring.read(1000, 150), stream[850:1000])
+    np.testing.assert_array_equal(ring.read(990, 50, channel=1), -stream[940:990])
+    np.testing.assert_array_equal(ring.read(1010, 20), stream[990:1000])  # trimmed
+    assert ring.read(800, 50) is None  # overwritten (or within the margin)
+
+
+def test_encode_clip_flac_and_wav_round_trip() -> None:
+    import soundfile as sf
+
+    audio = np.sin(np.linspace(0, 100, 4800)).astype(np.float32) * 0.5
+    flac = encode_clip(audio, "flac", sample_rate=48_000)
+    decoded, rate = sf.read(io.BytesIO(flac), dtype="float32")
+    assert rate == 48_000
+    np.testing.assert_allclose(decoded, audio, atol=1e-4)
+    with wave.open(io.BytesIO(encode_clip(audio, "wav")), "rb") as w:
+        assert (w.getnframes(), w.getsampwidth()) == (4800, 2)
+    with pytest.raises(ValueError):
+        encode_clip(audio, "mp3")
+
+
+def test_clip_store_evicts_uploaded_clips_first_and_survives_restart(
+    tmp_path: Path,
+) -> None:
+    store = ClipStore(tmp_path, max_bytes=250)
+    a = store.add("a.flac", b"x" * 100)
+    store.add("b.flac", b"x" * 100)
+    store.mark_uploaded(a)
+    store.add("c.flac", b"x" * 100)  # over the cap: uploaded a goes first
+    assert sorted(p.name for p in store.pending()) == ["b.flac", "c.flac"]
+    assert len(store) == 2 and store.size_bytes == 200
+    store.add("d.flac", b"x" * 100)  # now the oldest pending clip goes
+    reopened = ClipStore(tmp_path, max_bytes=250)
+    assert sorted(p.name for p in reopened.pending()) == ["c.flac", "d.flac"]
+    assert reopened.unique_name("c", ".flac") == "c-2.flac"
+    # Clips whose URL is out are kept until uploaded; new ones are refused
+    keeping = ClipStore(tmp_path, max_bytes=250, keep_pending=True)
+    with pytest.raises(OSError, match="not yet uploaded"):
+        keeping.add("e.flac", b"x" * 100)
+    keeping.mark_uploaded(keeping.pending()[0])
+    keeping.add("e.flac", b"x" * 100)
+    assert sorted(p.name for p in keeping.pending()) == ["d.flac", "e.flac"]
+
+
+class _Uploads(BaseHTTPRequestHandler):
+    received: list[tuple[str, int]] = []
+
+    def do_PUT(self) -> None:
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        self.received.append((self.path, len(body)))
+        self.send_response(200 if "fail" not in self.path else 500)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args: object) -> None:
+        pass
+
+
+def test_clip_writer_publishes_with_url_and_uploads_in_batches(tmp_path: Path) -> None:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Uploads)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}/bucket"
+    published: list[DetectionPayload] = []
+    writer = ClipWriter(
+        ClipStore(tmp_path),
+        "pi-01",
+        published.append,
+        uploader=HttpClipUploader(base),
+        upload_interval_sec=3600,
+    )
+    try:
+        audio = np.zeros(4800, dtype=np.float32)
+        assert writer.submit(_payload("turdus_mig"), audio)
+        assert writer.submit(_payload("fail"), audio)
+        assert writer.submit(_payload("junco_hyem"), audio)
+        writer.close()
+        assert [p.audio_url for p in published] == [
+            f"{base}/audio/pi-01/2025-05-01T060003.000_{code}_ch0.flac"
+            for code in ("turdus_mig", "fail", "junco_hyem")
+        ]
+        # The batch stops at the failed PUT; the rest stay pending for later
+        assert writer.upload_pending() == 1
+        assert [p.name for p in writer.store.pending()] == [
+            "2025-05-01T060003.000_fail_ch0.flac",
+            "2025-05-01T060003.000_junco_hyem_ch0.flac",
+        ]
+        assert _Uploads.received[0][0].startswith("/bucket/audio/pi-01/")
+        assert os.listdir(tmp_path / "uploaded") == [
+            "2025-05-01T060003.000_turdus_mig_ch0.flac"
+        ]
+    finally:
+        server.shutdown()
+
+
+def test_clip_writer_refuses_clips_instead_of_blocking(tmp_path: Path) -> None:
+    release = threading.Event()
+    published: list[DetectionPayload] = []
+
+    def slow_publish(payload: DetectionPayload) -> None:
+        release.wait(5)
+        published.append(payload)
+
+    writer = ClipWriter(ClipStore(tmp_path), "pi-01", slow_publish, max_pending=1)
+    audio = np.zeros(480, dtype=np.float32)
+    results = [writer.submit(_payload(str(i)), audio) for i in range(4)]
+    assert results[0] and not all(results)
+    release.set()
+    writer.close()
+    assert len(published) == sum(results)
+
+
+def test_clip_writer_names_clips_apart_and_survives_a_failed_publish(
+    tmp_path: Path,
+) -> None:
+    published: list[DetectionPayload] = []
+
+    def publish(payload: DetectionPayload) -> None:
+        if not published:
+            published.append(payload)
+            raise ConnectionError("broker gone")
+        published.append(payload)
+
+    writer = ClipWriter(ClipStore(tmp_path), "pi-01", publish)
+    audio = np.zeros(480, dtype=np.float32)
+    first = _payload()
+    first.timestamp = "2025-05-01T06:00:03.250+00:00"
+    for payload in (first, _payload(), _payload()):
+        assert writer.submit(payload, audio)
+    writer.close()
+    assert len(published) == 3
+    assert sorted(os.listdir(tmp_path / "pending")) == [
+        "2025-05-01T060003.000_turdus_mig_ch0-2.flac",
+        "2025-05-01T060003.000_turdus_mig_ch0.flac",
+        "2025-05-01T060003.250_turdus_mig_ch0.flac",
+    ]
+
+
+def test_clip_writer_names_wav_fallback_clips_as_wav(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setitem(sys.modules, "soundfile", None)  # not installed
+    published: list[DetectionPayload] = []
+    writer = ClipWriter(ClipStore(tmp_path), "pi-01", published.append, fmt="flac")
+    assert writer.fmt == "wav"
+    assert writer.submit(_payload(), np.zeros(480, dtype=np.float32))
+    writer.close()
+    (path,) = (tmp_path / "pending").iterdir()
+    assert path.name == "2025-05-01T060003.000_turdus_mig_ch0.wav"
+    with wave.open(str(path), "rb") as w:
+        assert w.getnframes() == 480
@@ -0,0 +1,67 @@
+"""Tests for birdwatch.events."""
+
+from __future__ import annotations
+
+import pytest
+
+from birdwatch.events import DetectionAggregator, DetectionEvent
+
+
+def _aggregator(**kwargs: float) -> tuple[DetectionAggregator, list[DetectionEvent]]:
+    events: list[DetectionEvent] = []
+    return DetectionAggregator(events.append, clock=lambda: 0.0, **kwargs), events
+
+
+def test_consecutive_windows_merge_into_one_event() -> None:
+    agg, events = _aggregator()
+    for t, conf in ((103.0, 0.8), (106.0, 0.95), (109.0, 0.75)):
+        agg.add(1, conf, t)
+    assert agg.flush(now=109.0) == 0  # still within the gap timeout
+    assert agg.flush(now=116.0) == 1
+    (event,) = events
+    assert (event.start, event.end) == (100.0, 109.0)
+    assert event.window_count == 3
+    assert event.peak_confidence == pytest.approx(0.95)
+    assert event.mean_confidence == pytest.approx(2.5 / 3)
+
+
+def test_out_of_order_windows_extend_the_event_backwards() -> None:
+    agg, events = _aggregator()
+    for t in (106.0, 103.0, 109.0):
+        agg.add(1, 0.8, t)
+    agg.flush(force=True)
+    (event,) = events
+    assert (event.start, event.end) == (100.0, 109.0)
+
+
+def test_gap_splits_events_and_species_are_independent() -> None:
+    agg, events = _aggregator(gap_timeout_sec=6.0)
+    agg.add(1, 0.8, 3.0)
+    agg.add(2, 0.9, 3.0)
+    agg.add(1, 0.8, 20.0)  # 17 s after the last hit: closes the first event
+    assert [(e.species_index, e.end) for e in events] == [(1, 3.0)]
+    agg.close()
+    assert sorted((e.species_index, e.end) for e in events[1:]) == [
+        (1, 20.0),
+        (2, 3.0),
+    ]
+
+
+def test_max_event_length_starts_new_event() -> None:
+    agg, events = _aggregator(max_event_sec=10.0)
+    for t in range(3, 19, 3):
+        agg.add(0, 0.9, float(t))
+    agg.flush(force=True)
+    assert [(e.start, e.end, e.window_count) for e in events] == [
+        (0.0, 9.0, 3),
+        (9.0, 18.0, 3),
+    ]
+
+
+def test_channels_keep_separate_events() -> None:
+    agg, events = _aggregator()
+    agg.add(1, 0.8, 3.0, channel=0)
+    agg.add(1, 0.9, 3.0, channel=2)
+    agg.add(1, 0.7, 6.0, channel=2)
+    agg.close()
+    assert sorted((e.channel, e.window_count) for e in events) == [(0, 1), (2, 2)]
@@ -0,0 +1,91 @@
+"""Tests for the spectral activity pre-gate (birdwatch.gate)."""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from birdwatch.analyzer import INPUT_SAMPLES, SAMPLE_RATE, BirdNETAnalyzer, MelFrontend
+from birdwatch.gate import ActivityGate
+from tests.conftest import FakeInterpreter
+
+T = np.arange(INPUT_SAMPLES) / SAMPLE_RATE
+
+
+def _noise(
+    rng: np.random.Generator, std: float, below_hz: float | None = None
+) -> np.ndarray:
+    noise = rng.normal(0.0, std, INPUT_SAMPLES)
+    if below_hz is not None:
+        spec = np.fft.rfft(noise)
+        spec[np.fft.rfftfreq(INPUT_SAMPLES, 1 / SAMPLE_RATE) > below_hz] = 0
+        noise = np.fft.irfft(spec, INPUT_SAMPLES)
+    return noise
+
+
+def _chirps(amplitude: float) -> np.ndarray:
+    """0.3 s upsweeps from 3 to 5 kHz, one per second."""
+    tau = np.mod(T, 1.0)
+    phase = 2 * np.pi * (3000 * tau + 2000 * tau**2 / (2 * 0.3))
+    return np.where(tau < 0.3, amplitude * np.sin(phase), 0.0)
+
+
+def _windows() -> dict[str, np.ndarray]:
+    rng = np.random.default_rng(0)
+    gusts = 1 + 0.8 * np.sin(2 * np.pi * 0.3 * T)
+    drops = (rng.random(INPUT_SAMPLES) < 0.002) * rng.normal(0, 0.5, INPUT_SAMPLES)
+    return {
+        "white noise": _noise(rng, 0.05),
+        "wind": _noise(rng, 0.5, below_hz=300) * gusts + _noise(rng, 0.001),
+        "rain": _noise(rng, 0.01) + drops,
+        "steady tone": 0.05 * np.sin(2 * np.pi * 4000 * T) + _noise(rng, 0.01),
+        "call in noise": _chirps(0.025) + _noise(rng, 0.05),
+        "call in wind": _chirps(0.02) + _noise(rng, 0.5, below_hz=300) * gusts,
+        "call in rain": _chirps(0.01) + _noise(rng, 0.01) + drops,
+    }
+
+
+def test_gate_passes_calls_and_rejects_noise() -> None:
+    frontend = MelFrontend()
+    gate = ActivityGate()
+    passed = {
+        name: gate(frontend(window.astype(np.float32)))
+        for name, window in _windows().items()
+    }
+    assert passed == {
+        "white noise": False,
+        "wind": False,
+        "rain": False,
+        "steady tone": False,
+        "call in noise": True,
+        "call in wind": True,
+        "call in rain": True,
+    }
+    assert (gate.windows, gate.passed) == (7, 3)
+    assert gate.pass_rate == pytest.approx(3 / 7)
+    with pytest.raises(ValueError, match="mel bands"):
+        ActivityGate(fmin=5000.0, fmax=5001.0)
+
+
+def test_analyzer_skips_the_model_for_rejected_windows(
+    model_dir: Path, fake_interpreter: FakeInterpreter
+) -> None:
+    windows = _windows()
+    call = windows["call in noise"].astype(np.float32)
+    rain = windows["rain"].astype(np.float32)
+    gate = ActivityGate()
+    analyzer = BirdNETAnalyzer(model_dir=model_dir, confidence_threshold=0.5, gate=gate)
+    assert analyzer.run(rain) == []
+    assert fake_interpreter.invokes == 0
+    assert analyzer.run(call)
+    assert fake_interpreter.invokes == 1
+    # Only the passing rows of a batch reach the model, in one invoke
+    results = analyzer.run_batch([rain, call, rain, call])
+    assert fake_interpreter.invokes == 2
+    assert results[0] == results[2] == []
+    assert results[1] == results[3] == analyzer.run(call)
+    assert analyzer.run_batch([rain, rain]) == [[], []]
+    assert fake_interpreter.invokes == 3
+    assert (gate.windows, gate.passed) == (9, 4)
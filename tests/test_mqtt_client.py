@@ -1,16 +1,20 @@
 """Tests for MQTT client (payload, offline cache)."""
 
 import json
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
 from dataclasses import asdict
 from pathlib import Path
+from types import SimpleNamespace
 
-from birdwatch.mqtt_client import (
-    DetectionPayload,
-    _append_cache,
-    _delete_cached,
-    _init_db,
-    _load_cache,
-)
+import pytest
+
+from birdwatch import mqtt_client
+from birdwatch.mqtt_client import DetectionPayload, MQTTClient
+from birdwatch.offline_cache import OfflineCache
+from birdwatch.wire import encode_row, unpack_message
 
 
 def test_detection_payload_roundtrip() -> None:
@@ -34,26 +38,307 @@ def test_detection_payload_roundtrip() -> None:
     assert p2.device_id == p.device_id and p2.confidence == p.confidence
 
 
-def test_offline_cache(tmp_path: Path) -> None:
-    cache = tmp_path / "test_cache.db"
-    _init_db(cache)
-    p = DetectionPayload(
+def _payload(i: int = 0) -> DetectionPayload:
+    return DetectionPayload(
         device_id="pi-01",
         species_code="code",
         scientific_name="Sci",
         common_name="Common",
         confidence=0.9,
-        timestamp="2026-02-08T12:00:00Z",
+        timestamp=f"2026-02-08T12:00:{i % 60:02d}Z",
         lat=None,
         lon=None,
         audio_url=None,
         image_url=None,
     )
-    _append_cache(cache, p)
-    rows = _load_cache(cache)
-    assert len(rows) == 1
-    payload_json, created_at = rows[0]
+
+
+def test_offline_cache(tmp_path: Path) -> None:
+    cache = OfflineCache(tmp_path / "test_cache.db")
+    cache.append(json.dumps(asdict(_payload())))
+    pages = list(cache.iter_pages())
+    assert len(pages) == 1 and len(pages[0]) == 1
+    row_id, payload_json = pages[0][0]
     loaded = json.loads(payload_json)
     assert loaded["device_id"] == "pi-01"
-    _delete_cached(cache, [created_at])
-    assert len(_load_cache(cache)) == 0
+    cache.delete([row_id])
+    assert len(cache) == 0
+    assert list(cache.iter_pages()) == []
+
+
+def test_offline_cache_group_commit_survives_reopen(tmp_path: Path) -> None:
+    path = tmp_path / "cache.db"
+    cache = OfflineCache(path, commit_every=100, commit_interval_sec=3600)
+    for i in range(10):
+        cache.append(json.dumps(asdict(_payload(i))))
+    cache.close()
+    reopened = OfflineCache(path)
+    assert len(reopened) == 10
+    assert reopened.size_bytes > 0
+
+
+def test_offline_cache_commits_a_quiet_group_when_due(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    conn = FakeConnection()
+    client = _client(tmp_path, monkeypatch, conn)
+    client.flush_cache()
+    client.cache.commit_interval_sec = 0.05
+    conn.callbacks["on_connection_interrupted"](conn, ConnectionError("wifi"))
+    assert client.publish(_payload(1)) is False
+    assert len(OfflineCache(tmp_path / "cache.db")) == 0  # not yet committed
+    assert 0 < client.watchdog_step() <= 0.05
+    time.sleep(0.06)
+    client.watchdog_step()
+    assert len(OfflineCache(tmp_path / "cache.db")) == 1
+
+
+def test_offline_cache_pages_and_deletes_by_id(tmp_path: Path) -> None:
+    cache = OfflineCache(tmp_path / "cache.db")
+    for i in range(25):
+        cache.append(f"payload-{i}")
+    seen: list[str] = []
+    for page in cache.iter_pages(page_size=10):
+        assert len(page) <= 10
+        seen.extend(str(p) for _, p in page)
+        cache.delete([row_id for row_id, _ in page[::2]])
+    assert seen == [f"payload-{i}" for i in range(25)]
+    assert len(cache) == 12
+
+
+def test_offline_cache_evicts_oldest_beyond_caps(tmp_path: Path) -> None:
+    cache = OfflineCache(tmp_path / "rows.db", max_rows=5)
+    for i in range(8):
+        cache.append(f"p{i}")
+    assert len(cache) == 5 and cache.evicted == 3
+    assert [p for page in cache.iter_pages() for _, p in page] == [
+        f"p{i}" for i in range(3, 8)
+    ]
+
+    by_size = OfflineCache(tmp_path / "bytes.db", max_bytes=100)
+    for _ in range(30):
+        by_size.append("x" * 10)
+    assert by_size.size_bytes <= 100 and len(by_size) == 10
+
+
+class FakeConnection:
+    """Records publishes; acks immediately unless fail_after is reached."""
+
+    def __init__(self, fail_after: int | None = None) -> None:
+        self.fail_after = fail_after
+        self.published: list[tuple[str, str]] = []
+        self.callbacks: dict[str, object] = {}
+
+    def connect(self) -> Future:
+        future: Future = Future()
+        future.set_result({"session_present": False})
+        return future
+
+    def publish(self, topic: str, payload: str, qos: object) -> tuple[Future, int]:
+        future: Future = Future()
+        if self.fail_after is not None and len(self.published) >= self.fail_after:
+            future.set_exception(ConnectionError("link down"))
+        else:
+            self.published.append((topic, payload))
+            future.set_result({"packet_id": len(self.published)})
+        return future, len(self.published)
+
+
+def _client(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, conn: FakeConnection, **kwargs
+) -> MQTTClient:
+    def mtls_from_path(**kwargs: object) -> FakeConnection:
+        conn.callbacks = kwargs
+        return conn
+
+    builder = SimpleNamespace(mtls_from_path=mtls_from_path)
+    monkeypatch.setattr(mqtt_client, "mqtt_connection_builder", builder)
+    qos = SimpleNamespace(AT_LEAST_ONCE=1)
+    monkeypatch.setattr(mqtt_client, "mqtt_crt", SimpleNamespace(QoS=qos))
+    client = MQTTClient(
+        endpoint="example",
+        client_id="pi-01",
+        cert_path="cert",
+        key_path="key",
+        cache_path=tmp_path / "cache.db",
+        flush_max_messages_per_sec=None,
+        flush_max_bytes_per_sec=None,
+        **kwargs,
+    )
+    client.connect()
+    for i in range(10):
+        client.cache.append(json.dumps(asdict(_payload(i))))
+    return client
+
+
+def test_flush_cache_pipelines_and_deletes_acked_rows(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    conn = FakeConnection()
+    client = _client(tmp_path, monkeypatch, conn, flush_window=4)
+    client.cache.append("not json")
+    assert client.flush_cache() == 10
+    assert len(client.cache) == 0
+    assert [t for t, _ in conn.published] == [mqtt_client.TOPIC] * 10
+    assert client.last_flush is not None and client.last_flush.dropped == 1
+
+
+def test_flush_cache_batches_detections(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    conn = FakeConnection()
+    client = _client(tmp_path, monkeypatch, conn, flush_batch_size=4)
+    assert client.flush_cache() == 10
+    assert [t for t, _ in conn.published] == [mqtt_client.BATCH_TOPIC] * 3
+    sizes = [len(json.loads(body)["detections"]) for _, body in conn.published]
+    assert sizes == [4, 4, 2]
+
+
+def test_publish_caches_compact_rows_and_flushes_them_in_either_format(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    conn = FakeConnection()
+    client = _client(tmp_path, monkeypatch, conn, flush_batch_size=4)
+    conn.callbacks["on_connection_interrupted"](conn, ConnectionError("wifi"))
+    for i in range(10, 16):
+        assert client.publish(_payload(i)) is False
+    client.cache.close()
+    # Compact rows and their species table survive a restart
+    client = _client(
+        tmp_path, monkeypatch, conn, flush_batch_size=4, wire_format="compact"
+    )
+    assert len(client.species) == 1
+    assert client.flush_cache() == 26
+    bodies = [body for _, body in conn.published]
+    assert [t for t, _ in conn.published] == [mqtt_client.COMPACT_TOPIC] * 7
+    detections = [d for body in bodies for d in unpack_message(body)]
+    assert len(detections) == 26
+    # Older JSON rows (as _client caches them) are re-encoded on the way
+    assert detections[10]["timestamp"] == "2026-02-08T12:00:10.000+00:00"
+    assert detections[-1]["timestamp"] == "2026-02-08T12:00:09.000+00:00"
+    # The JSON path decodes compact rows for the existing handler
+    conn.published.clear()
+    client.wire_format = "json"
+    client.cache.append(encode_row(_payload(20), client.species))
+    assert client.publish(_payload(21))
+    assert client.flush_cache() == 1
+    (_, live), (topic, batch) = conn.published
+    assert json.loads(live)["timestamp"] == "2026-02-08T12:00:21Z"
+    assert topic == mqtt_client.BATCH_TOPIC
+    assert [d["timestamp"] for d in json.loads(batch)["detections"]] == [
+        "2026-02-08T12:00:20.000+00:00"
+    ]
+    with pytest.raises(ValueError, match="wire_format"):
+        _client(tmp_path, monkeypatch, conn, wire_format="xml")
+
+
+def test_payloads_beyond_the_compact_limits_are_cached_as_json(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    conn = FakeConnection()
+    client = _client(
+        tmp_path, monkeypatch, conn, flush_batch_size=4, wire_format="compact"
+    )
+    client.flush_cache()
+    conn.published.clear()
+    odd = _payload(1)
+    odd.channel = 300
+    assert client.publish(odd)  # sent as JSON on the plain topic
+    conn.callbacks["on_connection_interrupted"](conn, ConnectionError("wifi"))
+    assert client.publish(odd) is False
+    assert client.publish(_payload(2)) is False
+    conn.callbacks["on_connection_resumed"](conn, 0, True)
+    assert client.flush_cache() == 2
+    topics = [t for t, _ in conn.published]
+    assert topics == [mqtt_client.TOPIC, mqtt_client.COMPACT_TOPIC, mqtt_client.TOPIC]
+    assert json.loads(conn.published[2][1])["channel"] == 300
+
+
+def test_flush_settings_are_checked(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    with pytest.raises(ValueError, match="flush_batch_size"):
+        _client(tmp_path, monkeypatch, FakeConnection(), flush_batch_size=70_000)
+    with pytest.raises(ValueError, match="flush_window"):
+        _client(tmp_path, monkeypatch, FakeConnection(), flush_window=0)
+
+
+@pytest.mark.filterwarnings("ignore::pytest.PytestUnhandledThreadExceptionWarning")
+def test_watchdog_survives_a_failing_pass(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    client = _client(tmp_path, monkeypatch, FakeConnection(), flush_interval_sec=0.01)
+    passes = []
+
+    def watchdog_step(stop: threading.Event | None = None) -> float:
+        passes.append(1)
+        if len(passes) < 3:
+            raise sqlite3.OperationalError("disk I/O error")
+        raise SystemExit  # ends the watchdog thread
+
+    monkeypatch.setattr(client, "watchdog_step", watchdog_step)
+    threads = threading.active_count()
+    client.start_watchdog()
+    deadline = time.monotonic() + 2.0
+    while threading.active_count() > threads and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert len(passes) == 3
+
+
+def test_flush_cache_returns_soon_after_stop_is_set(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    conn = FakeConnection()
+    client = _client(tmp_path, monkeypatch, conn)
+    client.flush_max_messages_per_sec = 1.0
+    stop = threading.Event()
+    threading.Timer(0.2, stop.set).start()
+    start = time.monotonic()
+    flushed = client.flush_cache(stop)
+    assert time.monotonic() - start < 1.0
+    assert 1 <= flushed <= 2 and len(client.cache) == 10 - flushed
+
+
+def test_flush_cache_keeps_unacked_rows(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    conn = FakeConnection(fail_after=3)
+    client = _client(tmp_path, monkeypatch, conn, flush_window=1)
+    assert client.flush_cache() == 3
+    assert len(client.cache) == 7
+    assert client.last_flush is not None and client.last_flush.failed == 1
+
+
+def test_publish_goes_to_cache_while_interrupted(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    conn = FakeConnection()
+    client = _client(tmp_path, monkeypatch, conn)
+    assert client.connected and client.publish(_payload(10))
+    conn.callbacks["on_connection_interrupted"](conn, ConnectionError("wifi"))
+    assert not client.connected
+    assert client.publish(_payload(11)) is False
+    assert client.flush_cache() == 0
+    assert len(conn.published) == 1 and len(client.cache) == 11
+    conn.callbacks["on_connection_resumed"](conn, 0, True)
+    assert client.connected and client.flush_cache() == 11
+
+
+def test_publish_health_is_false_while_offline(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    conn = FakeConnection()
+    client = _client(tmp_path, monkeypatch, conn)
+    conn.callbacks["on_connection_interrupted"](conn, ConnectionError("wifi"))
+    monkeypatch.setattr(mqtt_client, "mqtt_crt", None)
+    assert client.publish_health({"uptime_s": 1}) is False
+    assert conn.published == []
+
+
+def test_backoff_grows_with_jitter_up_to_cap() -> None:
+    backoff = mqtt_client._Backoff(base=1.0, cap=8.0)
+    delays = [backoff.next_delay() for _ in range(50)]
+    assert all(0.0 <= d <= 8.0 for d in delays)
+    assert delays[0] <= 1.0 and len(set(delays)) > 1
+    backoff.reset()
+    assert backoff.next_delay() <= 1.0
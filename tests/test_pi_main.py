@@ -0,0 +1,305 @@
+"""Tests for the Pi pipeline runners (birdwatch.pi.main)."""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import subprocess
+import sys
+import threading
+from concurrent.futures import Future
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from birdwatch import mqtt_client
+from birdwatch.mqtt_client import DetectionPayload, MQTTClient
+from birdwatch.offline_cache import OfflineCache
+from birdwatch.pi import main as main_mod
+from birdwatch.pi.startup import profile_startup
+from birdwatch.recorder import BUFFER_SAMPLES, SAMPLE_RATE, AnalysisQueue
+from birdwatch.sources import SyntheticSource
+from tests.conftest import FakeInterpreter
+
+
+class FakeStream:
+    """Stands in for the PortAudio stream: queues n windows from a thread."""
+
+    def __init__(self, queue: AnalysisQueue, n: int) -> None:
+        self.queue = queue
+        self.n = n
+        self._thread = threading.Thread(target=self._run)
+
+    def _run(self) -> None:
+        rng = np.random.default_rng(0)
+        for i in range(1, self.n + 1):
+            window = self.queue.acquire()
+            window[:] = rng.normal(0, 0.1, BUFFER_SAMPLES)
+            self.queue.put(window, i * BUFFER_SAMPLES)
+
+    def __enter__(self) -> FakeStream:
+        self._thread.start()
+        return self
+
+    @property
+    def active(self) -> bool:
+        return True  # a microphone: runs until cancelled
+
+    def __exit__(self, *exc: object) -> None:
+        self._thread.join()
+
+
+class FakeMQTT:
+    connected = False
+
+    def __init__(self) -> None:
+        self.published: list[DetectionPayload] = []
+
+    def watchdog_step(self, stop: threading.Event | None = None) -> float:
+        return 60.0
+
+    def start_watchdog(self) -> None:
+        pass
+
+    def publish(self, payload: DetectionPayload) -> bool:
+        self.published.append(payload)
+        return True
+
+    async def publish_async(self, payload: DetectionPayload) -> bool:
+        self.published.append(payload)
+        return True
+
+    def disconnect(self) -> None:
+        pass
+
+
+def test_async_runner_analyses_windows_and_publishes_on_shutdown(
+    model_dir: Path,
+    fake_interpreter: FakeInterpreter,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(
+        main_mod, "open_input_stream", lambda queue, **_kw: FakeStream(queue, 3)
+    )
+    mqtt = FakeMQTT()
+
+    async def scenario() -> None:
+        task = asyncio.create_task(
+            main_mod._run_pipeline_async("pi-01", model_dir, mqtt, queue_size=4)  # type: ignore[arg-type]
+        )
+        for _ in range(500):
+            if fake_interpreter.invokes == 3:
+                break
+            await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(scenario())
+    assert fake_interpreter.invokes == 3
+    # Back-to-back windows of each species merge into one event
+    assert mqtt.published
+    assert {p.window_count for p in mqtt.published} == {3}
+    assert "species_7" in {p.species_code for p in mqtt.published}
+
+
+def test_pipeline_runs_to_the_end_of_a_synthetic_source(
+    model_dir: Path, fake_interpreter: FakeInterpreter
+) -> None:
+    mqtt = FakeMQTT()
+    main_mod._run_pipeline(
+        "pi-01",
+        model_dir,
+        mqtt,  # type: ignore[arg-type]
+        queue_size=4,
+        backpressure="block",
+        health_interval_sec=0,
+        source=SyntheticSource(9.0, chirp_hz=(3000.0, 5000.0), speed=None),
+    )
+    assert fake_interpreter.invokes == 3
+    assert {p.window_count for p in mqtt.published} == {3}
+
+
+@pytest.mark.parametrize("run_async", [False, True])
+def test_runners_commit_the_offline_cache_on_shutdown(
+    model_dir: Path,
+    fake_interpreter: FakeInterpreter,
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    run_async: bool,
+) -> None:
+    # Never connected: every detection goes to the offline cache
+    monkeypatch.setattr(mqtt_client, "mqtt_connection_builder", SimpleNamespace())
+    mqtt = MQTTClient("example", "pi-01", "cert", "key", cache_path=tmp_path / "c.db")
+    monkeypatch.setattr(mqtt, "start_watchdog", lambda: None)
+    options = {
+        "queue_size": 4,
+        "backpressure": "block",
+        "health_interval_sec": 0,
+        "source": SyntheticSource(9.0, chirp_hz=(3000.0, 5000.0), speed=None),
+    }
+    if run_async:
+        asyncio.run(main_mod._run_pipeline_async("pi-01", model_dir, mqtt, **options))
+    else:
+        main_mod._run_pipeline("pi-01", model_dir, mqtt, **options)
+    # Fewer rows than one commit group, committed by the shutdown path
+    assert 0 < len(OfflineCache(tmp_path / "c.db")) < mqtt.cache.commit_every
+
+
+def test_async_runner_returns_at_the_end_of_a_finite_source(
+    model_dir: Path, fake_interpreter: FakeInterpreter
+) -> None:
+    mqtt = FakeMQTT()
+    asyncio.run(
+        asyncio.wait_for(
+            main_mod._run_pipeline_async(
+                "pi-01",
+                model_dir,
+                mqtt,  # type: ignore[arg-type]
+                queue_size=4,
+                backpressure="block",
+                health_interval_sec=0,
+                source=SyntheticSource(9.0, chirp_hz=(3000.0, 5000.0), speed=None),
+            ),
+            timeout=30,
+        )
+    )
+    assert fake_interpreter.invokes == 3
+    assert {p.window_count for p in mqtt.published} == {3}
+
+
+def test_detector_analyses_channels_in_one_batch(
+    model_dir: Path, fake_interpreter: FakeInterpreter
+) -> None:
+    published: list[DetectionPayload] = []
+    detector = main_mod._Detector("pi-01", model_dir, published.append)
+    rng = np.random.default_rng(0)
+    rows = rng.normal(0, 0.1, (2, BUFFER_SAMPLES)).astype(np.float32)
+    detector.on_window(rows, BUFFER_SAMPLES, (0, 3))
+    assert fake_interpreter.invokes == 1
+    detector.close()
+    assert {p.channel for p in published} == {0, 3}
+    assert {p.species_code for p in published if p.channel == 3} == {
+        p.species_code for p in published if p.channel == 0
+    }
+
+
+def test_detector_counts_windows_the_pool_fails_to_analyse(
+    model_dir: Path, fake_interpreter: FakeInterpreter, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    published: list[DetectionPayload] = []
+    detector = main_mod._Detector(
+        "pi-01", model_dir, published.append, analyzer_workers=2
+    )
+
+    def fail(window: np.ndarray) -> Future[list[tuple[int, float]]]:
+        future: Future[list[tuple[int, float]]] = Future()
+        future.set_exception(RuntimeError("invoke failed"))
+        return future
+
+    monkeypatch.setattr(detector._pool, "submit", fail)
+    detector.on_window(np.zeros(BUFFER_SAMPLES, np.float32), BUFFER_SAMPLES)
+    assert detector.stats.errors == 1
+    detector.close()
+    assert published == []
+
+
+def test_detector_reloads_the_occurrence_table_when_the_week_turns(
+    model_dir: Path, fake_interpreter: FakeInterpreter, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    table = model_dir / "occurrence.csv"
+    weeks = ",".join(str(w) for w in range(1, 49))
+    rows = [
+        "Species 5," + ",".join(["0.5"] * 48),
+        "Species 6," + ",".join(["0.5"] * 8 + ["0"] * 40),  # winter only
+    ]
+    table.write_text("\n".join([f"species,{weeks}", *rows]) + "\n")
+    week = [2]
+    monkeypatch.setattr(main_mod, "birdnet_week", lambda: week[0])
+    detector = main_mod._Detector(
+        "pi-01", model_dir, lambda payload: None, species_file=table
+    )
+    window = np.zeros(BUFFER_SAMPLES, np.float32)
+    detector.on_window(window, BUFFER_SAMPLES)
+    assert detector.analyzer.species.tolist() == [5, 6]
+    week[0] = 26
+    detector.on_window(window, 2 * BUFFER_SAMPLES)
+    assert detector.analyzer.species.tolist() == [5]
+    detector.close()
+
+
+@pytest.mark.parametrize("setting", ["BIRDNET_TOP_K", "BIRDNET_FLUSH_WINDOW"])
+def test_main_pi_rejects_a_setting_below_one(
+    setting: str,
+    model_dir: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    capsys: pytest.CaptureFixture[str],
+) -> None:
+    monkeypatch.setenv("BIRDNET_MODEL_DIR", str(model_dir))
+    for name in ("AWS_IOT_ENDPOINT", "AWS_IOT_CERT_PATH", "AWS_IOT_KEY_PATH"):
+        monkeypatch.setenv(name, "x")
+    monkeypatch.setenv(setting, "0")
+    assert main_mod.main_pi() == 1
+    assert f"{setting} must be >= 1" in capsys.readouterr().out
+
+
+def test_pipeline_import_defers_heavy_modules() -> None:
+    code = (
+        "import sys, birdwatch.pi.main; "
+        "print(sorted(m for m in ('scipy', 'librosa', 'numba', 'awscrt', "
+        "'sounddevice') "
+        "if m in sys.modules))"
+    )
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)}
+    out = subprocess.run(
+        [sys.executable, "-c", code],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert out.stdout.strip() == "[]"
+
+
+def test_profile_startup_times_each_step(
+    model_dir: Path, fake_interpreter: FakeInterpreter
+) -> None:
+    steps = profile_startup(str(model_dir))
+    assert [step for step, _ in steps] == [
+        "import pipeline",
+        "load AWS IoT SDK",
+        "load model",
+        "first inference",
+        "second inference",
+    ]
+    assert all(seconds >= 0 for _, seconds in steps)
+    assert fake_interpreter.invokes == 2
+
+
+def test_detector_saves_a_clip_per_event(
+    model_dir: Path, fake_interpreter: FakeInterpreter, tmp_path: Path
+) -> None:
+    published: list[DetectionPayload] = []
+    detector = main_mod._Detector(
+        "pi-01",
+        model_dir,
+        published.append,
+        clip_dir=tmp_path / "clips",
+        clip_format="wav",
+        clip_upload_url="https://clips.example.com",
+    )
+    assert detector.clip_ring is not None
+    audio = np.random.default_rng(0).normal(0, 0.1, 2 * BUFFER_SAMPLES)
+    detector.clip_ring.write(audio.astype(np.float32))
+    detector.on_window(audio[-BUFFER_SAMPLES:], 2 * BUFFER_SAMPLES)
+    detector.close()
+    assert published
+    clips = sorted((tmp_path / "clips" / "pending").iterdir())
+    assert len(clips) == len(published)
+    for payload in published:
+        assert payload.audio_url is not None
+        assert payload.audio_url.startswith("https://clips.example.com/audio/pi-01/")
+    # 1 s pre-roll + the window; the post-roll has not been captured yet
+    assert clips[0].stat().st_size == 44 + 2 * (SAMPLE_RATE + BUFFER_SAMPLES)
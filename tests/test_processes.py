@@ -0,0 +1,187 @@
+"""Tests for the shared-memory ring and the multi-process pipeline (birdwatch.pi.processes)."""
+
+from __future__ import annotations
+
+import json
+import multiprocessing
+import pickle
+import time
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from birdwatch.clips import ClipRing
+from birdwatch.metrics import REGISTRY
+from birdwatch.pi.processes import (
+    Heartbeat,
+    RestartPolicy,
+    Supervisor,
+    WindowSlots,
+    run_pipeline_processes,
+)
+from birdwatch.recorder import BUFFER_SAMPLES, SAMPLE_RATE
+from birdwatch.shared_ring import SharedRingBuffer
+from birdwatch.sources import SyntheticSource
+from tests.conftest import FakeInterpreter
+
+# Fork so children inherit the test's patches (the pipeline spawns by default)
+CTX = multiprocessing.get_context("fork")
+
+
+def test_shared_ring_serves_contiguous_windows_and_detects_laps() -> None:
+    ring = SharedRingBuffer(4.0, channels=2)
+    clip_ring = ClipRing(4.0, channels=2)
+    audio = np.arange(10 * SAMPLE_RATE, dtype=np.float32)
+    blocks = np.stack([audio, -audio], axis=1)
+    try:
+        for i in range(0, blocks.shape[0], 4_800):
+            ring.write(blocks[i : i + 4_800])
+            clip_ring.write(blocks[i : i + 4_800])
+        end = ring.total_samples
+        window = ring.window(end, BUFFER_SAMPLES, 1)
+        assert window is not None and window.flags.c_contiguous
+        np.testing.assert_array_equal(window, -audio[end - BUFFER_SAMPLES : end])
+        # Attaching by name (as a child process does) sees the same samples
+        attached = pickle.loads(pickle.dumps(ring))
+        np.testing.assert_array_equal(
+            attached.window(end, BUFFER_SAMPLES), audio[-BUFFER_SAMPLES:]
+        )
+        # Same answers as ClipRing, including spans no longer (or not yet) held
+        for end_sample, n in (
+            (end, 50_000),
+            (end + 1_000, 9_000),
+            (end - 150_000, 48_000),
+        ):
+            expected = clip_ring.read(end_sample, n, 1)
+            got = ring.read(end_sample, n, 1)
+            assert (got is None) == (expected is None)
+            if expected is not None:
+                np.testing.assert_array_equal(got, expected)
+        ring.write(np.zeros((2 * SAMPLE_RATE, 2), dtype=np.float32))
+        assert not ring.valid(end, BUFFER_SAMPLES)
+        assert ring.window(end, BUFFER_SAMPLES) is None
+        ring.count("overruns", 2)
+        assert attached.stats().overruns == 2
+        # A capture restart re-anchors, which readers see as a new epoch
+        epoch = attached.epoch
+        ring.anchor()
+        assert attached.epoch == epoch + 1
+        attached.close()
+    finally:
+        ring.close()
+        ring.unlink()
+
+
+def test_window_slots_apply_the_backpressure_policy() -> None:
+    slots = WindowSlots(2, CTX)
+    assert slots.put(100, 1, "drop_oldest") and slots.put(200, 1, "drop_oldest")
+    assert not slots.put(300, 3, "drop_oldest")  # overwrote 100
+    assert not slots.put(400, 1, "drop_newest")
+    assert len(slots) == 2
+    assert slots.claim(0.1) == (200, 1)
+    assert slots.claim(0.1) == (300, 3)
+    assert slots.claim(0.1) is None
+    slots.close()
+    assert slots.closed and slots.claim(0.1) is None
+
+
+def _crash(heartbeat: Heartbeat, runs: object) -> None:
+    with runs.get_lock():  # type: ignore[attr-defined]
+        runs.value += 1  # type: ignore[attr-defined]
+    raise SystemExit(1)
+
+
+def _hang(heartbeat: Heartbeat, runs: object) -> None:
+    with runs.get_lock():  # type: ignore[attr-defined]
+        runs.value += 1  # type: ignore[attr-defined]
+    heartbeat.beat()
+    time.sleep(60)
+
+
+def test_supervisor_restarts_crashed_and_silent_children_then_gives_up() -> None:
+    policy = RestartPolicy(
+        max_restarts=2,
+        backoff_sec=0.05,
+        heartbeat_timeout_sec=0.3,
+        startup_grace_sec=0.0,
+    )
+    crashes, hangs = CTX.Value("i", 0), CTX.Value("i", 0)
+    supervisor = Supervisor(2, policy, CTX)
+    supervisor.add("crash", _crash, crashes)
+    supervisor.add("hang", _hang, hangs)
+    supervisor.start()
+    with pytest.raises(RuntimeError, match="crash failed 3 times"):
+        deadline = time.monotonic() + 20
+        while time.monotonic() < deadline:
+            supervisor.poll()
+            time.sleep(0.02)
+    assert crashes.value == 3
+    assert list(supervisor.restarts)[0] == 2
+    # The hanging child was killed and restarted at least once meanwhile
+    deadline = time.monotonic() + 5
+    while hangs.value < 2 and time.monotonic() < deadline:
+        supervisor.poll()
+        time.sleep(0.05)
+    assert hangs.value >= 2
+    assert not supervisor.join("hang", 0.1)
+
+
+class _QueueMQTT:
+    """MQTTClient stand-in for the publisher process: payloads go to a queue."""
+
+    connected = False
+
+    def __init__(self, out: multiprocessing.Queue) -> None:
+        self.out = out
+
+    def connect(self) -> None:
+        pass
+
+    def start_watchdog(self) -> None:
+        pass
+
+    def publish(self, payload: object) -> bool:
+        self.out.put(payload)
+        return True
+
+    def disconnect(self) -> None:
+        pass
+
+
+def test_pipeline_processes_analyse_a_source_and_publish_events(
+    model_dir: Path, fake_interpreter: FakeInterpreter, tmp_path: Path
+) -> None:
+    out = CTX.Queue()
+    metrics_file = tmp_path / "metrics.json"
+    callbacks = REGISTRY.histogram("birdwatch_audio_callback_seconds").count
+    invokes = REGISTRY.histogram("birdwatch_invoke_seconds").count
+    run_pipeline_processes(
+        "pi-01",
+        model_dir,
+        lambda: _QueueMQTT(out),
+        source=SyntheticSource(12.0, tones_hz=(3000.0,), speed=None),
+        hop_seconds=1.0,
+        analyzer_workers=2,
+        queue_size=4,
+        backpressure="block",
+        health_interval_sec=0,
+        metrics_file=metrics_file,
+        start_method="fork",
+    )
+    payloads = []
+    while len(payloads) < 3:
+        payloads.append(out.get(timeout=5))
+    # Windows ending at 3 s, 4 s, ... 12 s from two analyzers, merged into
+    # one event per species by the publisher
+    assert sorted(p.scientific_name for p in payloads) == [
+        "Species 5",
+        "Species 6",
+        "Species 7",
+    ]
+    assert all(p.window_count == 10 for p in payloads)
+    assert out.empty()
+    # The publisher reports the capture and analyzer processes' metrics too
+    metrics = json.loads(metrics_file.read_text())
+    assert metrics["birdwatch_audio_callback_seconds"]["count"] > callbacks
+    assert metrics["birdwatch_invoke_seconds"]["count"] >= invokes + 10
@@ -1,9 +1,30 @@
-"""Tests for recorder (RingBuffer, noise gate)."""
+"""Tests for recorder (RingBuffer, noise gate, analysis queue)."""
+
+import threading
+from collections.abc import Callable
 
 import numpy as np
+import pytest
 
-from birdwatch.analyzer import N_MELS, preprocess_audio
-from birdwatch.recorder import BUFFER_SAMPLES, RingBuffer
+from birdwatch.analyzer import (
+    FMAX,
+    HOP_LENGTH,
+    N_FFT,
+    N_MELS,
+    SAMPLE_RATE,
+    MelFrontend,
+    StreamingMelFrontend,
+    frame_aligned_hop,
+    preprocess_audio,
+)
+from birdwatch.recorder import (
+    BUFFER_SAMPLES,
+    AnalysisQueue,
+    RingBuffer,
+    WindowScheduler,
+    open_input_stream,
+    start_analysis_worker,
+)
 
 
 def test_ring_buffer_write_read() -> None:
@@ -24,6 +45,40 @@ def test_ring_buffer_rms() -> None:
     assert abs(ring.rms() - 0.5) < 1e-6
 
 
+def test_ring_buffer_read_into_and_segments_match_roll() -> None:
+    ring = RingBuffer()
+    data = np.arange(BUFFER_SAMPLES + 5_000, dtype=np.float32)
+    for start in range(0, data.size, 4_800):
+        ring.write(data[start : start + 4_800])
+    expected = data[-BUFFER_SAMPLES:]
+    out = np.empty(BUFFER_SAMPLES, dtype=np.float32)
+    assert ring.read_into(out) is out
+    np.testing.assert_array_equal(out, expected)
+    older, newer = ring.segments()
+    np.testing.assert_array_equal(np.concatenate([older, newer]), expected)
+    assert np.shares_memory(older, ring.segments()[0])
+
+
+def test_ring_buffer_incremental_rms_tracks_full_recompute() -> None:
+    ring = RingBuffer()
+    rng = np.random.default_rng(0)
+    for _ in range(100):  # several laps with odd block sizes
+        ring.write(rng.standard_normal(7_001).astype(np.float32) * 0.1)
+        view = ring.read()
+        assert abs(ring.rms() - float(np.sqrt(np.mean(view * view)))) < 1e-5
+
+
+def test_ring_buffer_snapshot_is_double_buffered() -> None:
+    ring = RingBuffer()
+    ring.write(np.full(100, 0.25, dtype=np.float32))
+    a = ring.snapshot()
+    ring.write(np.full(100, 0.5, dtype=np.float32))
+    b = ring.snapshot()
+    assert a is not b
+    assert a[0] == 0.25 and b[100] == 0.5  # first snapshot still intact
+    assert ring.snapshot() is a
+
+
 def test_preprocess_audio_shape() -> None:
     buf = np.random.randn(BUFFER_SAMPLES).astype(np.float32) * 0.1
     mel = preprocess_audio(buf)
@@ -31,3 +86,166 @@ def test_preprocess_audio_shape() -> None:
     assert mel.shape[0] == 1
     assert mel.shape[1] == N_MELS
     assert mel.dtype == np.float32
+
+
+def test_mel_frontend_matches_librosa() -> None:
+    import librosa
+
+    buf = np.random.default_rng(1).standard_normal(BUFFER_SAMPLES).astype(np.float32)
+    norm = buf / np.abs(buf).max()
+    mel = librosa.feature.melspectrogram(
+        y=norm,
+        sr=SAMPLE_RATE,
+        n_fft=N_FFT,
+        hop_length=HOP_LENGTH,
+        n_mels=N_MELS,
+        fmax=FMAX,
+    )
+    expected = np.log(mel + 1e-8).astype(np.float32)[np.newaxis]
+    frontend = MelFrontend()
+    out = frontend(buf)
+    assert out.shape == expected.shape
+    np.testing.assert_allclose(out, expected, atol=1e-4)
+    assert frontend(buf) is out  # preallocated output is reused
+
+
+def test_streaming_mel_reuses_frames_across_overlapping_windows() -> None:
+    rng = np.random.default_rng(2)
+    stream = (rng.standard_normal(6 * SAMPLE_RATE) * 0.1).astype(np.float32)
+    hop = round(frame_aligned_hop(1.0) * SAMPLE_RATE)
+    assert hop % HOP_LENGTH == 0
+    full, streaming = MelFrontend(), StreamingMelFrontend()
+    prev_end = None
+    for end in range(BUFFER_SAMPLES, stream.size + 1, hop):
+        window = stream[end - BUFFER_SAMPLES : end]
+        new = None if prev_end is None else end - prev_end
+        prev_end = end
+        got = streaming.update(window, new)
+        expected = full(window)
+        # Newest frames lag by n_fft/2 (3 frames); the interior is identical
+        np.testing.assert_allclose(got[..., 10:], expected[..., 7:-3], atol=1e-4)
+
+
+def _window(value: float) -> np.ndarray:
+    return np.full(4, value, dtype=np.float32)
+
+
+@pytest.mark.parametrize(
+    ("policy", "kept"),
+    [("drop_oldest", [2.0, 3.0]), ("drop_newest", [1.0, 2.0])],
+)
+def test_analysis_queue_drop_policies(policy: str, kept: list[float]) -> None:
+    queue = AnalysisQueue(maxsize=2, policy=policy)  # type: ignore[arg-type]
+    assert queue.put(_window(1.0))
+    assert queue.put(_window(2.0))
+    assert not queue.put(_window(3.0))
+    assert queue.stats.dropped == 1
+    got = [queue.get(timeout=0.1) for _ in range(2)]
+    assert [float(item[0][0]) for item in got if item is not None] == kept
+    assert queue.get(timeout=0.01) is None
+
+
+def test_analysis_queue_block_waits_for_space() -> None:
+    queue = AnalysisQueue(maxsize=1, policy="block")
+    queue.put(_window(1.0))
+    t = threading.Thread(target=queue.put, args=(_window(2.0),))
+    t.start()
+    t.join(timeout=0.05)
+    assert t.is_alive()  # producer blocked on full queue
+    assert queue.get(timeout=0.1) is not None
+    t.join(timeout=1)
+    assert not t.is_alive()
+    assert queue.stats.dropped == 0 and queue.stats.enqueued == 2
+
+
+def test_analysis_worker_drains_and_survives_errors() -> None:
+    queue = AnalysisQueue(maxsize=4)
+    seen: list[tuple[float, int]] = []
+
+    def on_window(window: np.ndarray, end_sample: int) -> None:
+        if window[0] < 0:
+            raise RuntimeError("boom")
+        seen.append((float(window[0]), end_sample))
+
+    worker = start_analysis_worker(queue, on_window)
+    for i, v in enumerate((1.0, -1.0, 2.0)):
+        queue.put(_window(v), end_sample=i)
+    queue.close()
+    worker.join(timeout=1)
+    assert seen == [(1.0, 0), (2.0, 2)]
+    assert queue.stats.processed == 2 and queue.stats.errors == 1
+
+
+def test_analysis_queue_recycles_window_buffers() -> None:
+    queue = AnalysisQueue(maxsize=1)
+    first = queue.acquire()
+    queue.put(first)
+    queue.put(queue.acquire())  # drops `first`, which returns to the pool
+    assert queue.acquire() is first
+
+
+class CapturedSource:
+    """AudioSource whose stream is never started; the test calls on_block."""
+
+    def open(
+        self, on_block: Callable[[np.ndarray, bool], None], channels: int, _n: int
+    ) -> "CapturedSource":
+        self.on_block = on_block
+        self.channels = channels
+        return self
+
+
+def test_multichannel_stream_gates_channels_and_queues_one_buffer() -> None:
+    source = CapturedSource()
+    queue = AnalysisQueue(maxsize=2, channels=4)
+    open_input_stream(
+        queue,
+        noise_floor=1e-4,
+        noise_ceiling=1.0,
+        block_duration_ms=100,
+        hop_seconds=3.0,
+        source=source,
+    )
+    assert source.channels == 4
+    rng = np.random.default_rng(0)
+    block = rng.normal(0, 0.1, (BUFFER_SAMPLES, 4)).astype(np.float32)
+    block[:, 2] = 0.0  # silent microphone
+    source.on_block(block, False)
+    item = queue.get(timeout=0)
+    assert item is not None
+    window, end_sample, channels = item
+    assert window.shape == (4, BUFFER_SAMPLES)
+    assert end_sample == BUFFER_SAMPLES and channels == (0, 1, 3)
+    for row, c in enumerate(channels):
+        np.testing.assert_array_equal(window[row], block[:, c])
+
+
+def test_analysis_worker_passes_filled_rows_and_channels() -> None:
+    queue = AnalysisQueue(maxsize=2, channels=4)
+    seen: list[tuple[tuple[int, ...], int, tuple[int, ...]]] = []
+    worker = start_analysis_worker(
+        queue, lambda rows, end, channels: seen.append((rows.shape, end, channels))
+    )
+    queue.put(queue.acquire(), 10, (1, 3))
+    queue.close()
+    worker.join(timeout=1)
+    assert seen == [((2, BUFFER_SAMPLES), 10, (1, 3))]
+
+
+def test_window_scheduler_hop_counts_samples() -> None:
+    sched = WindowScheduler(hop_seconds=1.0, window_samples=BUFFER_SAMPLES)
+    block = 4_800  # 100 ms
+    due = [sched.advance(block) for _ in range(60)]  # 6 s of audio
+    # First window at 3 s, then one per second of new audio
+    assert [i for i, d in enumerate(due) if d] == [29, 39, 49, 59]
+    assert sched.skipped_samples == 0
+
+
+def test_window_scheduler_reports_skipped_samples() -> None:
+    sched = WindowScheduler(hop_seconds=1.0)
+    assert sched.advance(BUFFER_SAMPLES)
+    # Consumer stalled for 3 s of new audio: only the latest window is due
+    assert sched.advance(3 * 48_000)
+    assert sched.skipped_samples == 2 * 48_000
+    sched.skip(sched.hop_samples)
+    assert sched.skipped_samples == 3 * 48_000
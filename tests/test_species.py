@@ -0,0 +1,48 @@
+"""Tests for birdwatch.species."""
+
+from __future__ import annotations
+
+from datetime import date
+from pathlib import Path
+
+import pytest
+
+from birdwatch.species import birdnet_week, load_species_filter
+
+LABELS = [
+    "Turdus migratorius_American Robin",
+    "Cardinalis cardinalis_Northern Cardinal",
+    "Junco hyemalis_Dark-eyed Junco",
+]
+
+
+def test_birdnet_week() -> None:
+    assert birdnet_week(date(2025, 1, 1)) == 1
+    assert birdnet_week(date(2025, 3, 10)) == 10
+    assert birdnet_week(date(2025, 12, 31)) == 48
+
+
+def test_allow_list_matches_scientific_common_or_full_label(tmp_path: Path) -> None:
+    path = tmp_path / "species.txt"
+    path.write_text("# backyard\nnorthern cardinal\nTurdus migratorius\n")
+    assert load_species_filter(path, LABELS).tolist() == [0, 1]
+    path.write_text("Turdus merula\n")
+    with pytest.raises(ValueError, match="Turdus merula"):
+        load_species_filter(path, LABELS)
+
+
+def test_occurrence_table_selects_species_for_week(tmp_path: Path) -> None:
+    path = tmp_path / "occurrence.csv"
+    weeks = ",".join(str(w) for w in range(1, 49))
+    rows = [
+        "Turdus migratorius," + ",".join(["0.5"] * 48),
+        "Junco hyemalis," + ",".join(["0.2"] * 8 + ["0"] * 40),  # winter only
+        "Sturnus vulgaris," + ",".join(["0.9"] * 48),  # not in the labels
+    ]
+    path.write_text("\n".join([f"species,{weeks}", *rows]) + "\n")
+    assert load_species_filter(path, LABELS, week=2).tolist() == [0, 2]
+    assert load_species_filter(path, LABELS, week=26).tolist() == [0]
+    assert load_species_filter(path, LABELS).tolist() == [0, 2]
+    labels_path = tmp_path / "labels.txt"
+    labels_path.write_text("\n".join(LABELS))
+    assert load_species_filter(path, labels_path, week=26).tolist() == [0]
@@ -0,0 +1,96 @@
+"""Tests for the compact detection encoding (birdwatch.wire)."""
+
+from __future__ import annotations
+
+import json
+from dataclasses import asdict
+
+import pytest
+
+from birdwatch.mqtt_client import DetectionPayload
+from birdwatch.wire import (
+    SpeciesTable,
+    decode_record,
+    encode_record,
+    encode_row,
+    pack_message,
+    row_record,
+    unpack_message,
+)
+
+
+def _payload(name: str = "Turdus migratorius", **kwargs: object) -> DetectionPayload:
+    fields: dict[str, object] = {
+        "device_id": "pi-01",
+        "species_code": name[:10].lower(),
+        "scientific_name": name,
+        "common_name": name,
+        "confidence": 0.85,
+        "timestamp": "2026-02-08T12:00:00.250+00:00",
+        "lat": None,
+        "lon": None,
+        "audio_url": None,
+        "image_url": None,
+        "end_timestamp": "2026-02-08T12:00:09.250+00:00",
+        "mean_confidence": 0.8125,
+        "window_count": 4,
+        "channel": 1,
+        **kwargs,
+    }
+    return DetectionPayload(**fields)  # type: ignore[arg-type]
+
+
+def test_record_roundtrips_and_is_much_smaller_than_json() -> None:
+    table = SpeciesTable()
+    full = _payload(
+        lat=37.123456,
+        lon=-122.654321,
+        audio_url="https://example.com/audio/pi-01/clip.flac",
+        mean_confidence=None,
+        end_timestamp=None,
+    )
+    for payload in (_payload(), full):
+        record = encode_record(payload, table)
+        assert decode_record(record, table) == asdict(payload)
+    assert len(table) == 1
+    row = encode_row(_payload(), table)
+    assert len(row) * 8 < len(json.dumps(asdict(_payload())))
+    assert decode_record(row_record(row), table) == asdict(_payload())
+    # "Z" and naive timestamps are UTC; sub-millisecond digits are dropped
+    other = _payload(timestamp="2026-02-08T12:00:00.2504Z", end_timestamp=None)
+    assert decode_record(encode_record(other, table), table)["timestamp"] == (
+        "2026-02-08T12:00:00.250+00:00"
+    )
+    with pytest.raises(ValueError):
+        encode_record(_payload(timestamp="yesterday"), table)
+    with pytest.raises(ValueError, match="version"):
+        row_record(b"\x07" + row[1:])
+    with pytest.raises(ValueError):
+        decode_record(row_record(row)[:-1], table)
+    with pytest.raises(ValueError, match="species index"):
+        decode_record(row_record(row), SpeciesTable())
+
+
+def test_packed_message_carries_the_species_it_uses() -> None:
+    table = SpeciesTable()
+    table.index(("x", "Unused species", "Unused"))
+    payloads = [_payload("Turdus migratorius"), _payload("Sitta europaea")] * 3
+    records = [encode_record(p, table) for p in payloads]
+    message = pack_message(records, table)
+    # Decodes without the table; each species name is sent once
+    assert unpack_message(message) == [asdict(p) for p in payloads]
+    assert message.count(b"Sitta europaea") == 2  # scientific and common name
+    assert b"Unused" not in message
+    batch = json.dumps({"detections": [asdict(p) for p in payloads]})
+    assert len(message) * 5 < len(batch)
+    with pytest.raises(ValueError):
+        unpack_message(message[:-3])
+    with pytest.raises(ValueError, match="version"):
+        unpack_message(b"\x02" + message[1:])
+    with pytest.raises(ValueError, match="too many records"):
+        pack_message([records[0]] * 0x10000, table)
+    with pytest.raises(ValueError, match="too long"):
+        pack_message([records[0] + bytes(0x10000)], table)
+    url = "https://example.com/" + "a" * 40_000
+    with pytest.raises(ValueError, match="too long"):
+        encode_record(_payload(audio_url=url, image_url=url), table)